@@ -0,0 +1,176 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Environment variables holding an account's X credentials (each account may add a prefix)
+CREDENTIAL_VARS = {
+    "consumer_key": "TWITTER_API_KEY",
+    "consumer_secret": "TWITTER_API_SECRET",
+    "access_token": "TWITTER_ACCESS_TOKEN",
+    "access_token_secret": "TWITTER_ACCESS_SECRET",
+    "bearer_token": "TWITTER_BEARER_TOKEN",
+}
+
+DEFAULT_ACCOUNT_NAME = "koiyu"
+DEFAULT_MONTHLY_POST_LIMIT = 1500
+
+class Account:
+    """One X account: its credentials, the persona it posts as, its budgets and its state directory"""
+
+    def __init__(self, name, credentials, state_dir, persona=None, themes=None,
+                 monthly_post_limit=DEFAULT_MONTHLY_POST_LIMIT, daily_reply_target=None, env_prefix=""):
+        self.name = name
+        self.credentials = credentials  # tweepy.Client keyword arguments
+        self.env_prefix = env_prefix  # Credentials come from <env_prefix>TWITTER_* variables
+        self.state_dir = state_dir
+        self.persona = persona  # System prompt; None means the built-in KOIYU persona
+        self.themes = themes  # Post themes; None means the built-in KOIYU themes
+        self.monthly_post_limit = monthly_post_limit
+        self.daily_reply_target = daily_reply_target
+
+    def __repr__(self):
+        return f"Account({self.name!r})"
+
+    def path(self, filename):
+        """Path of one of this account's state files"""
+        return os.path.join(self.state_dir, filename)
+
+    def missing_credentials(self):
+        """Names of this account's credential environment variables that are not set"""
+        return [self.env_prefix + var for arg, var in CREDENTIAL_VARS.items() if not self.credentials.get(arg)]
+
+def credentials_from_env(prefix="", environ=os.environ):
+    """tweepy.Client credentials read from <prefix>TWITTER_* environment variables"""
+    return {arg: environ.get(prefix + var) for arg, var in CREDENTIAL_VARS.items()}
+
+def load_accounts(path, base_dir, environ=os.environ):
+    """Load account configs from a JSON file, or a single account from the environment if there is none.
+
+    The file holds a list of objects with a unique "name" and optionally
+    "env_prefix" (credentials come from <env_prefix>TWITTER_* variables, never
+    from the file), "persona" or "persona_file", "themes",
+    "monthly_post_limit" and "daily_reply_target". The first account keeps its
+    state files in base_dir, so a single-account setup upgrades in place;
+    the others get base_dir/accounts/<name>/.
+    """
+    if not os.path.exists(path):
+        return [Account(DEFAULT_ACCOUNT_NAME, credentials_from_env(environ=environ), base_dir)]
+
+    with open(path, "r") as f:
+        configs = json.load(f)
+
+    accounts = []
+    for i, config in enumerate(configs):
+        name = config["name"]
+        if any(account.name == name for account in accounts):
+            raise ValueError(f"Duplicate account name in {path}: {name}")
+
+        persona = config.get("persona")
+        if config.get("persona_file"):
+            with open(os.path.join(os.path.dirname(os.path.abspath(path)), config["persona_file"]), "r") as f:
+                persona = f.read()
+
+        state_dir = base_dir if i == 0 else os.path.join(base_dir, "accounts", name)
+        os.makedirs(state_dir, exist_ok=True)
+        accounts.append(Account(
+            name,
+            credentials_from_env(config.get("env_prefix", ""), environ),
+            state_dir,
+            persona=persona,
+            themes=config.get("themes"),
+            monthly_post_limit=config.get("monthly_post_limit", DEFAULT_MONTHLY_POST_LIMIT),
+            daily_reply_target=config.get("daily_reply_target"),
+            env_prefix=config.get("env_prefix", "")
+        ))
+
+    logger.info(f"Loaded {len(accounts)} account(s) from {path}: {', '.join(a.name for a in accounts)}")
+    return accounts
+
+# The account the running code acts for; threads and tasks set it with use_account()
+_current_account = contextvars.ContextVar("account")
+_default_account = None
+
+def set_default_account(account):
+    """Account used by code that runs outside any use_account() block"""
+    global _default_account
+    _default_account = account
+
+def current_account():
+    """The account the running code acts for"""
+    account = _current_account.get(_default_account)
+    if account is None:
+        raise RuntimeError("No account is active")
+    return account
+
+@contextmanager
+def use_account(account):
+    """Act for account inside the with block (per thread / asyncio task)"""
+    token = _current_account.set(account)
+    try:
+        yield account
+    finally:
+        _current_account.reset(token)
+
+def bind(func, account=None):
+    """Wrap func to run as account (by default, the account active now), e.g. for a thread or worker pool"""
+    account = account or current_account()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_account(account):
+            return func(*args, **kwargs)
+    return wrapper
+
+class AccountLocal:
+    """Per-account stand-in for what used to be a single module-level object.
+
+    factory(account) builds an account's instance the first time that account
+    uses it. Attribute access goes to the active account's instance, so code
+    written for one account works unchanged for many.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instances", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def instance(self, account=None):
+        """The instance for account (default: the active account)"""
+        account = account or current_account()
+        with self._lock:
+            instance = self._instances.get(account.name)
+            if instance is None:
+                instance = self._instances[account.name] = self._factory(account)
+            return instance
+
+    def instances(self):
+        """Instances built so far, by account name"""
+        with self._lock:
+            return dict(self._instances)
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.instance(), name, value)
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        return len(self.instance())
+
+    def __getitem__(self, key):
+        return self.instance()[key]
+
+    def __setitem__(self, key, value):
+        self.instance()[key] = value
+
+    def __repr__(self):
+        return f"AccountLocal({self._factory.__name__})"
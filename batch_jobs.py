@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PENDING_CURSOR = "pending_batches"
+CHAT_ENDPOINT = "/v1/chat/completions"
+
+# Batch states that will never produce (more) output
+FINISHED_STATES = ("completed", "failed", "expired", "cancelled")
+
+def write_request_file(path, requests):
+    """Write [(custom_id, body)] as a Batch API JSONL request file"""
+    with open(path, "w") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": CHAT_ENDPOINT, "body": body}) + "\n")
+
+def parse_output(text):
+    """Yield (custom_id, chat completion body) for every successful line of a batch output file"""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            logger.warning("Skipping malformed batch output line")
+            continue
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            logger.warning(f"Batch request {item.get('custom_id')} failed: {item.get('error') or response.get('status_code')}")
+            continue
+        yield item.get("custom_id"), response.get("body") or {}
+
+class OpenAIBatchBackend:
+    """Submits request files through the OpenAI Batch API (24h window, about half the price)"""
+
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, path):
+        """Upload a request file and start a batch; returns the batch ID"""
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        """Return (state, output text or None)"""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status != "completed" or not batch.output_file_id:
+            return batch.status, None
+        return batch.status, self.client.files.content(batch.output_file_id).text
+
+class FileBatchBackend:
+    """File-backed stand-in for the Batch API, for running without OpenAI.
+
+    submit() copies the request file to <directory>/<batch_id>.input.jsonl and
+    the batch completes once <batch_id>.output.jsonl exists. With a responder
+    (a function from request body to reply text) the output is written right
+    away; otherwise complete() or any other tool can write it later.
+    """
+
+    def __init__(self, directory, responder=None):
+        self.directory = directory
+        self.responder = responder
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, kind):
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, path):
+        # Accounts share the directory, so IDs must be unique across processes, not just per millisecond
+        batch_id = f"filebatch-{uuid.uuid4().hex}"
+        shutil.copyfile(path, self._path(batch_id, "input"))
+        if self.responder:
+            self.complete(batch_id, self.responder)
+        return batch_id
+
+    def complete(self, batch_id, responder):
+        """Write the output file for a submitted batch using responder(body) -> text"""
+        lines = []
+        with open(self._path(batch_id, "input"), "r") as f:
+            for line in f:
+                request = json.loads(line)
+                body = {
+                    "model": request["body"].get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": responder(request["body"])}}]
+                }
+                lines.append(json.dumps({
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": body},
+                    "error": None
+                }))
+        with open(self._path(batch_id, "output"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def status(self, batch_id):
+        output = self._path(batch_id, "output")
+        if not os.path.exists(output):
+            return "in_progress", None
+        with open(output, "r") as f:
+            return "completed", f.read()
+
+class BatchRunner:
+    """Tracks batches of content requests from submission to results.
+
+    Each request carries a content key (e.g. "wisdom:<theme>", "story" or
+    "reply:<tweet_id>:<author_id>"). Submitted batches are remembered in the
+    ledger so they survive restarts; poll() returns finished results by key.
+    """
+
+    def __init__(self, backend, ledger, directory):
+        self.backend = backend
+        self.ledger = ledger
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _pending(self):
+        return json.loads(self.ledger.get_cursor(PENDING_CURSOR, "[]"))
+
+    def _save_pending(self, pending):
+        self.ledger.set_cursor(PENDING_CURSOR, json.dumps(pending))
+
+    def pending_counts(self):
+        """Number of in-flight requests per content key"""
+        counts = {}
+        for batch in self._pending():
+            for key in batch["keys"]:
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def submit(self, items):
+        """Submit [(key, chat completion body)] as one batch; returns the batch ID or None"""
+        if not items:
+            return None
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"requests-{stamp}.jsonl")
+        write_request_file(path, [(f"{key}#{i}", body) for i, (key, body) in enumerate(items)])
+        try:
+            batch_id = self.backend.submit(path)
+        except Exception as e:
+            logger.error(f"Failed to submit content batch: {e}")
+            return None
+
+        pending = self._pending()
+        pending.append({"id": batch_id, "keys": [key for key, _ in items], "submitted_at": time.time()})
+        self._save_pending(pending)
+        logger.info(f"Submitted batch {batch_id} with {len(items)} requests")
+        return batch_id
+
+    def poll(self):
+        """Check in-flight batches; returns [(key, chat completion body)] from the ones that finished"""
+        results = []
+        still_pending = []
+        for batch in self._pending():
+            try:
+                state, output = self.backend.status(batch["id"])
+            except Exception as e:
+                logger.error(f"Failed to check batch {batch['id']}: {e}")
+                still_pending.append(batch)
+                continue
+
+            if state not in FINISHED_STATES:
+                still_pending.append(batch)
+                continue
+            if output is None:
+                logger.warning(f"Batch {batch['id']} ended as {state} without output")
+                continue
+
+            for custom_id, body in parse_output(output):
+                results.append((custom_id.rsplit("#", 1)[0], body))
+            logger.info(f"Batch {batch['id']} {state}")
+
+        self._save_pending(still_pending)
+        return results
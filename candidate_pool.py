@@ -0,0 +1,201 @@
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from usage_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# A tweet waiting for KOIYU's reply; has the same .id/.text attributes as a tweepy Tweet
+Candidate = namedtuple("Candidate", ["id", "text", "author_id", "source", "score", "added_at"])
+
+# Tweets from accounts KOIYU follows are preferred over keyword search hits
+SOURCE_WEIGHTS = {
+    "following": 2.0,
+    "keyword": 1.0
+}
+
+class ReplyIndex:
+    """Compact index of tweets and authors KOIYU has already replied to.
+
+    Entries are keyed by ID and stamped with the day they were added, so lookups
+    are O(1) and whole days expire together, the first time the index is used
+    on a new day.
+    """
+
+    def __init__(self, path, tweet_days=30, author_days=1):
+        self.path = path
+        self.tweet_days = tweet_days
+        self.author_days = author_days
+        self.lock = threading.RLock()
+        self.tweets = {}
+        self.authors = {}
+        self.pruned_on = None
+        self.load()
+
+    def load(self):
+        """Load the index from disk, dropping expired days"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.tweets = data.get("tweets", {})
+                self.authors = data.get("authors", {})
+        except Exception as e:
+            logger.error(f"Failed to load reply index: {e}")
+        self.prune()
+
+    def save(self):
+        """Persist the index to disk (atomically, one writer at a time)"""
+        try:
+            with self.lock:
+                atomic_write_json(self.path, {"tweets": self.tweets, "authors": self.authors})
+        except Exception as e:
+            logger.error(f"Failed to save reply index: {e}")
+
+    def prune(self, now=None):
+        """Forget tweets and authors older than their expiry window"""
+        now = now or datetime.now()
+        tweet_cutoff = (now - timedelta(days=self.tweet_days)).strftime("%Y-%m-%d")
+        author_cutoff = (now - timedelta(days=self.author_days)).strftime("%Y-%m-%d")
+        with self.lock:
+            self.tweets = {k: day for k, day in self.tweets.items() if day > tweet_cutoff}
+            self.authors = {k: day for k, day in self.authors.items() if day > author_cutoff}
+            self.pruned_on = now.strftime("%Y-%m-%d")
+
+    def _prune_daily(self):
+        """Prune once per day, so a long-running process expires entries too"""
+        now = datetime.now()
+        if self.pruned_on != now.strftime("%Y-%m-%d"):
+            self.prune(now)
+
+    def has_replied(self, tweet_id):
+        """Return True if KOIYU already replied to this tweet"""
+        self._prune_daily()
+        return str(tweet_id) in self.tweets
+
+    def author_on_cooldown(self, author_id):
+        """Return True if KOIYU replied to this author within the cooldown window"""
+        self._prune_daily()
+        return author_id is not None and str(author_id) in self.authors
+
+    def record(self, tweet_id, author_id=None):
+        """Remember a reply so the tweet (and author, for a while) isn't picked again"""
+        self._prune_daily()
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self.lock:
+            self.tweets[str(tweet_id)] = today
+            if author_id is not None:
+                self.authors[str(author_id)] = today
+            self.save()
+
+class CandidatePool:
+    """Bounded, persistent priority queue of tweets to reply to.
+
+    Every search or timeline fetch feeds the pool, so one fetch can supply
+    several replies. Tweets already answered, or from authors on cooldown,
+    are rejected through the ReplyIndex. The pool is saved when tweets are
+    added; a candidate popped before a crash may come back after a restart,
+    where the ReplyIndex drops it if it was answered.
+    """
+
+    def __init__(self, path, index, max_size=200, max_age_hours=12):
+        self.path = path
+        self.index = index
+        self.max_size = max_size
+        self.max_age_seconds = max_age_hours * 3600
+        self.lock = threading.RLock()
+        self.heap = []
+        self.ids = set()
+        self.load()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def load(self):
+        """Load queued candidates from disk"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    for item in json.load(f):
+                        self._push(Candidate(**item))
+        except Exception as e:
+            logger.error(f"Failed to load candidate pool: {e}")
+
+    def save(self):
+        """Persist queued candidates to disk (atomically, one writer at a time)"""
+        try:
+            with self.lock:
+                atomic_write_json(self.path, [entry[2]._asdict() for entry in self.heap])
+        except Exception as e:
+            logger.error(f"Failed to save candidate pool: {e}")
+
+    def _push(self, candidate):
+        # Max-heap on score; the tweet ID breaks ties deterministically
+        heapq.heappush(self.heap, (-candidate.score, candidate.id, candidate))
+        self.ids.add(candidate.id)
+
+    def _is_usable(self, candidate, now):
+        return (now - candidate.added_at < self.max_age_seconds
+                and not self.index.has_replied(candidate.id)
+                and not self.index.author_on_cooldown(candidate.author_id))
+
+    def add(self, tweets, source):
+        """Queue fetched tweets, skipping ones already pooled or answered; returns how many were added"""
+        now = time.time()
+        added = 0
+        with self.lock:
+            for tweet in tweets:
+                tweet_id = str(tweet.id)
+                author_id = getattr(tweet, "author_id", None)
+                author_id = str(author_id) if author_id is not None else None
+                if tweet_id in self.ids or self.index.has_replied(tweet_id):
+                    continue
+
+                # Small random jitter keeps replies from always hitting the same account
+                score = SOURCE_WEIGHTS.get(source, 1.0) + random.random() * 0.5
+                self._push(Candidate(tweet_id, tweet.text, author_id, source, score, now))
+                added += 1
+
+            # Keep only the best max_size candidates
+            if len(self.heap) > self.max_size:
+                self.heap = heapq.nsmallest(self.max_size, self.heap)
+                heapq.heapify(self.heap)
+                self.ids = {entry[2].id for entry in self.heap}
+
+            if added:
+                self.save()
+        return added
+
+    def pop(self, count=1):
+        """Take up to `count` of the best usable candidates, at most one per author"""
+        now = time.time()
+        taken = []
+        authors = set()
+        skipped = []
+        with self.lock:
+            while self.heap and len(taken) < count:
+                entry = heapq.heappop(self.heap)
+                candidate = entry[2]
+                self.ids.discard(candidate.id)
+                if not self._is_usable(candidate, now):
+                    continue
+                if candidate.author_id is not None and candidate.author_id in authors:
+                    skipped.append(entry)
+                    continue
+                if candidate.author_id is not None:
+                    authors.add(candidate.author_id)
+                taken.append(candidate)
+
+            # Same-author candidates stay queued for a later batch
+            for entry in skipped:
+                heapq.heappush(self.heap, entry)
+                self.ids.add(entry[2].id)
+
+        return taken
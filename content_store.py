@@ -0,0 +1,74 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    text TEXT NOT NULL,
+    source TEXT,
+    created_at REAL NOT NULL,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_content_key_claimed ON content (key, claimed_at, id);
+"""
+
+class ContentStore:
+    """Buffer of ready-to-post content in the ledger database.
+
+    Entries are grouped by key (e.g. "wisdom:<theme>" or "story"). Posting code
+    claims the oldest unclaimed entry for a key and releases it again if the
+    post fails, so nothing is lost or posted twice.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.ledger.connect().executescript(SCHEMA)
+
+    def put(self, key, text, source="live"):
+        """Add a ready post under key"""
+        self.ledger.connect().execute(
+            "INSERT INTO content (key, text, source, created_at) VALUES (?, ?, ?, ?)",
+            (key, text, source, time.time())
+        )
+
+    def count(self, key):
+        """Number of unclaimed entries for key"""
+        row = self.ledger.connect().execute(
+            "SELECT COUNT(*) FROM content WHERE key = ? AND claimed_at IS NULL", (key,)
+        ).fetchone()
+        return row[0]
+
+    def counts(self, prefix=""):
+        """Unclaimed entries per key, optionally limited to keys starting with prefix"""
+        return dict(self.ledger.connect().execute(
+            "SELECT key, COUNT(*) FROM content WHERE claimed_at IS NULL AND key LIKE ? GROUP BY key",
+            (prefix + "%",)
+        ).fetchall())
+
+    def claim(self, key):
+        """Claim the oldest unclaimed entry for key; returns (id, text) or None"""
+        conn = self.ledger.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, text FROM content WHERE key = ? AND claimed_at IS NULL ORDER BY id LIMIT 1",
+                (key,)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE content SET claimed_at = ? WHERE id = ?", (time.time(), row[0]))
+        return row
+
+    def release(self, content_id):
+        """Return a claimed entry to the buffer (e.g. after a failed post)"""
+        self.ledger.connect().execute("UPDATE content SET claimed_at = NULL WHERE id = ?", (content_id,))
+
+    def prune(self, prefix, max_age_seconds):
+        """Drop unclaimed entries under prefix that are older than max_age_seconds; returns how many"""
+        cursor = self.ledger.connect().execute(
+            "DELETE FROM content WHERE claimed_at IS NULL AND key LIKE ? AND created_at < ?",
+            (prefix + "%", time.time() - max_age_seconds)
+        )
+        return cursor.rowcount
@@ -0,0 +1,465 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from ledger import get_ledger
+
+logger = logging.getLogger(__name__)
+
+# sqlite and file only coordinate processes on one host (or sharing one filesystem); use redis across hosts
+COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "sqlite").lower()  # sqlite, file, redis or memory
+COORDINATION_DIR = os.getenv("COORDINATION_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "leases"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # For the redis backend (optional: pip install redis)
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "koiyu:lease:")
+NODE_ID = os.getenv("NODE_ID") or socket.gethostname()  # Stable across restarts, unique per node
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "30"))
+
+# How mention and reply work is split between nodes
+SHARD_BY_ACCOUNT = "account"  # Each account is served by one node
+SHARD_BY_TWEET = "tweet"  # Every node serves every account, each taking its share of tweet IDs
+SHARD_BY = os.getenv("SHARD_BY", SHARD_BY_ACCOUNT).lower()
+
+LEADER_LEASE = "leader"
+NODE_PREFIX = "node:"
+CLAIM_PREFIX = "claim:"
+
+class SQLiteLeaseBackend:
+    """Leases in the ledger's locks table; coordinates processes sharing the database file.
+
+    SQLite locking is only reliable on a local disk, so this is for nodes on
+    one host. Nodes on several hosts need the redis backend.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+
+    def acquire(self, name, owner, ttl):
+        """Take the lease, or extend it if owner already holds it; returns True on success"""
+        return self.ledger.acquire_lock(name, owner, ttl)
+
+    def release(self, name, owner):
+        self.ledger.release_lock(name, owner)
+
+    def get(self, name):
+        """The unexpired lease {"owner", "acquired_at", "expires_at"}, or None"""
+        lease = self.ledger.get_lock(name)
+        return lease if lease and lease["expires_at"] > time.time() else None
+
+    def holders(self, prefix):
+        """Unexpired leases whose names start with prefix, by name"""
+        return self.ledger.list_locks(prefix)
+
+    def purge(self):
+        return self.ledger.purge_locks()
+
+class FileLeaseBackend:
+    """Leases as JSON files in a directory, serialized with an flock on the directory's lock file.
+
+    Works for processes on one host, or on hosts sharing a filesystem with
+    working flock (not every network filesystem has it).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock_path = os.path.join(directory, ".lock")
+        self.thread_lock = threading.Lock()  # flock is per open file, so threads take turns too
+
+    def _path(self, name):
+        return os.path.join(self.directory, quote(name, safe="") + ".lease")
+
+    def _locked(self, func):
+        import fcntl
+
+        with self.thread_lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return func()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, name):
+        try:
+            with open(self._path(name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self, name, owner, ttl):
+        """Take the lease, or extend it if owner already holds it; returns True on success"""
+        def take():
+            now = time.time()
+            lease = self._read(name)
+            if lease and lease["owner"] != str(owner) and lease["expires_at"] > now:
+                return False
+            acquired_at = lease["acquired_at"] if lease and lease["owner"] == str(owner) else now
+            tmp_path = self._path(name) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"owner": str(owner), "acquired_at": acquired_at, "expires_at": now + ttl}, f)
+            os.replace(tmp_path, self._path(name))
+            return True
+        return self._locked(take)
+
+    def release(self, name, owner):
+        def drop():
+            lease = self._read(name)
+            if lease and lease["owner"] == str(owner):
+                os.remove(self._path(name))
+        self._locked(drop)
+
+    def get(self, name):
+        """The unexpired lease {"owner", "acquired_at", "expires_at"}, or None"""
+        lease = self._locked(lambda: self._read(name))
+        return lease if lease and lease["expires_at"] > time.time() else None
+
+    def holders(self, prefix):
+        """Unexpired leases whose names start with prefix, by name"""
+        def scan():
+            now, leases = time.time(), {}
+            for filename in os.listdir(self.directory):
+                name = unquote(filename[:-len(".lease")])
+                if filename.endswith(".lease") and name.startswith(prefix):
+                    lease = self._read(name)
+                    if lease and lease["expires_at"] > now:
+                        leases[name] = lease
+            return leases
+        return self._locked(scan)
+
+    def purge(self):
+        def sweep():
+            now, purged = time.time(), 0
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".lease"):
+                    lease = self._read(unquote(filename[:-len(".lease")]))
+                    if lease is None or lease["expires_at"] <= now:
+                        os.remove(os.path.join(self.directory, filename))
+                        purged += 1
+            return purged
+        return self._locked(sweep)
+
+class MemoryLeaseBackend:
+    """In-process stand-in for a Redis-style lease store (SET NX PX semantics), for tests and single processes.
+
+    Several Coordinators sharing one instance behave like nodes sharing a
+    Redis server.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.leases = {}
+
+    def _expired(self, lease):
+        return lease["expires_at"] <= self.clock()
+
+    def _live(self, name):
+        lease = self.leases.get(name)
+        if lease and self._expired(lease):
+            del self.leases[name]  # Expired keys vanish, as in Redis
+            return None
+        return lease
+
+    def acquire(self, name, owner, ttl):
+        """Take the lease, or extend it if owner already holds it; returns True on success"""
+        with self.lock:
+            lease = self._live(name)
+            if lease and lease["owner"] != str(owner):
+                return False
+            now = self.clock()
+            self.leases[name] = {"owner": str(owner), "acquired_at": lease["acquired_at"] if lease else now,
+                                 "expires_at": now + ttl}
+            return True
+
+    def release(self, name, owner):
+        with self.lock:
+            lease = self._live(name)
+            if lease and lease["owner"] == str(owner):
+                del self.leases[name]
+
+    def get(self, name):
+        """The unexpired lease {"owner", "acquired_at", "expires_at"}, or None"""
+        with self.lock:
+            lease = self._live(name)
+            return dict(lease) if lease else None
+
+    def holders(self, prefix):
+        """Unexpired leases whose names start with prefix, by name"""
+        with self.lock:
+            names = [name for name in self.leases if name.startswith(prefix)]
+            return {name: dict(lease) for name in names if (lease := self._live(name))}
+
+    def purge(self):
+        with self.lock:
+            expired = [name for name, lease in self.leases.items() if self._expired(lease)]
+            for name in expired:
+                del self.leases[name]
+            return len(expired)
+
+# Take the lease if it is free, or refresh it (keeping acquired_at) if ARGV[1] holds it
+REDIS_ACQUIRE = """
+local lease = redis.call('GET', KEYS[1])
+if lease and cjson.decode(lease)['owner'] ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], lease or ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+# Delete the lease only if ARGV[1] holds it
+REDIS_RELEASE = """
+local lease = redis.call('GET', KEYS[1])
+if lease and cjson.decode(lease)['owner'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RedisLeaseBackend:
+    """Leases as Redis keys with a PX expiry, taken and released atomically by Lua scripts.
+
+    Works for nodes on any number of hosts that can reach the same Redis
+    server. Expired leases are dropped by Redis itself. The redis package is
+    an optional dependency, only needed for this backend.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix=REDIS_KEY_PREFIX):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("COORDINATION_BACKEND=redis needs the redis package (pip install redis)") from e
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.acquire_script = self.client.register_script(REDIS_ACQUIRE)
+        self.release_script = self.client.register_script(REDIS_RELEASE)
+
+    def acquire(self, name, owner, ttl):
+        """Take the lease, or extend it if owner already holds it; returns True on success"""
+        lease = json.dumps({"owner": str(owner), "acquired_at": time.time()})
+        return bool(self.acquire_script(keys=[self.prefix + name], args=[str(owner), lease, int(ttl * 1000)]))
+
+    def release(self, name, owner):
+        self.release_script(keys=[self.prefix + name], args=[str(owner)])
+
+    def _leases(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+        replies = pipe.execute()
+        now, leases = time.time(), {}
+        for key, lease, pttl in zip(keys, replies[::2], replies[1::2]):
+            if lease and pttl > 0:
+                lease = json.loads(lease)
+                lease["expires_at"] = now + pttl / 1000
+                leases[key.decode() if isinstance(key, bytes) else key] = lease
+        return leases
+
+    def get(self, name):
+        """The unexpired lease {"owner", "acquired_at", "expires_at"}, or None"""
+        return self._leases([self.prefix + name]).get(self.prefix + name)
+
+    def holders(self, prefix):
+        """Unexpired leases whose names start with prefix, by name"""
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + "*"))
+        return {key[len(self.prefix):]: lease for key, lease in self._leases(keys).items()}
+
+    def purge(self):
+        return 0  # Redis expires the keys itself
+
+def create_backend(kind=COORDINATION_BACKEND):
+    """Lease backend for a COORDINATION_BACKEND setting"""
+    if kind == "file":
+        return FileLeaseBackend(COORDINATION_DIR)
+    if kind == "redis":
+        return RedisLeaseBackend()
+    if kind == "memory":
+        return MemoryLeaseBackend()
+    if kind != "sqlite":
+        logger.warning(f"Unknown coordination backend {kind!r}; using sqlite")
+    return SQLiteLeaseBackend(get_ledger())
+
+def rendezvous_owner(key, nodes):
+    """The node a key belongs to by rendezvous (highest random weight) hashing.
+
+    Every node computes the same answer from the same node list, and when a
+    node joins or leaves only the keys it gains or loses move.
+    """
+    return max(nodes, key=lambda node: hashlib.sha1(f"{node}|{key}".encode()).digest())
+
+class Coordinator:
+    """Lease-based membership, leader election and work sharding for a group of bot nodes.
+
+    Each running instance holds a node lease ("node:<node_id>") that its
+    heartbeat keeps fresh; a second instance with the same node ID waits until
+    the first one's lease is released or expires, so a slow restart can't
+    overlap the old process (with a timeout, a duplicate node ID gives up
+    instead). An instance that loses its node lease steps down at once: it
+    stops leading and owns no work until it gets the lease back. One node at
+    a time holds the leader lease and runs the daily posts; mention and reply
+    work is split across the live nodes by rendezvous hashing of the account
+    name or tweet ID. Claims make a piece of work (a dedup key) exactly-once
+    across nodes.
+    """
+
+    def __init__(self, backend, node_id=NODE_ID, ttl=LEASE_TTL_SECONDS, shard_by=SHARD_BY):
+        self.backend = backend
+        self.node_id = node_id
+        self.ttl = ttl
+        self.shard_by = shard_by
+        self.instance = f"{node_id}#{os.getpid()}"  # Owner of the node lease
+        self.lock = threading.Lock()
+        self.live_nodes = [node_id]
+        self.member = False  # Holds its node lease
+        self.leader = False
+        self.started_at = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def join(self, wait=True, timeout=None):
+        """Take this node's lease, waiting (up to timeout seconds) for a previous instance of the node to go away.
+
+        Returns True once held, False if the wait was not allowed, timed out or stopped.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        announced = False
+        while not self.backend.acquire(NODE_PREFIX + self.node_id, self.instance, self.ttl):
+            if not wait or (deadline is not None and time.time() >= deadline):
+                return False
+            if not announced:
+                lease = self.backend.get(NODE_PREFIX + self.node_id)
+                logger.warning(f"Node {self.node_id} is still held by {lease['owner'] if lease else 'another instance'}; "
+                               f"waiting for its lease to be released or expire")
+                print(f"⏳ Another instance of node {self.node_id} is still running; waiting for it to stop...")
+                announced = True
+            pause = max(1, self.ttl / 3)
+            if deadline is not None:
+                pause = max(0, min(pause, deadline - time.time()))
+            if self.stop_event.wait(pause):
+                return False
+        self.member = True
+        self.started_at = time.time()
+        logger.info(f"Node {self.node_id} joined ({self.shard_by} sharding)")
+        return True
+
+    def step_down(self):
+        """Stop leading and owning work after losing the node lease to another instance"""
+        self.member = False
+        self.leader = False
+        logger.error(f"Node {self.node_id} lost its lease to another instance; stepping down")
+        print(f"⚠️ Another instance took over node {self.node_id}; this one stops leading and serving")
+
+    def heartbeat(self):
+        """Refresh this node's lease, contend for leadership and reload the live node list"""
+        if not self.backend.acquire(NODE_PREFIX + self.node_id, self.instance, self.ttl):
+            if self.member:
+                self.step_down()
+            return
+        if not self.member:
+            self.member = True
+            logger.info(f"Node {self.node_id} holds its lease again")
+        self.is_leader()
+        nodes = sorted(name[len(NODE_PREFIX):] for name in self.backend.holders(NODE_PREFIX))
+        with self.lock:
+            if nodes != self.live_nodes and nodes:
+                logger.info(f"Live nodes: {', '.join(nodes)}")
+            self.live_nodes = nodes or [self.node_id]
+        self.backend.purge()
+
+    def _heartbeat_loop(self):
+        while not self.stop_event.wait(self.ttl / 3):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Coordination heartbeat failed: {e}")
+
+    def start(self, timeout=None):
+        """Join (waiting up to timeout seconds) and keep the leases fresh from a background thread"""
+        if self.thread:
+            return True
+        if not self.join(timeout=timeout):
+            return False
+        self.heartbeat()
+        self.thread = threading.Thread(target=self._heartbeat_loop, name="koiyu-heartbeat", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Leave the group, handing leadership to another node right away"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        try:
+            self.backend.release(LEADER_LEASE, self.node_id)
+            self.backend.release(NODE_PREFIX + self.node_id, self.instance)
+        except Exception as e:
+            logger.error(f"Error releasing leases: {e}")
+        self.member = False
+        self.leader = False
+
+    def is_leader(self):
+        """Take or keep the leader lease; returns True while this node leads"""
+        was_leader = self.leader
+        self.leader = self.member and self.backend.acquire(LEADER_LEASE, self.node_id, self.ttl)
+        if self.leader != was_leader:
+            logger.info(f"Node {self.node_id} {'is now the leader' if self.leader else 'is no longer the leader'}")
+        return self.leader
+
+    def leader_id(self):
+        """Node ID of the current leader, or None"""
+        lease = self.backend.get(LEADER_LEASE)
+        return lease["owner"] if lease else None
+
+    def nodes(self):
+        """Live node IDs as of the last heartbeat"""
+        with self.lock:
+            return list(self.live_nodes)
+
+    def owns(self, key):
+        """True if key's work belongs to this node (never while it doesn't hold its node lease)"""
+        return self.member and rendezvous_owner(str(key), self.nodes()) == self.node_id
+
+    def owns_account(self, account_name):
+        """True if this node serves an account's mentions and replies"""
+        return self.member and (self.shard_by != SHARD_BY_ACCOUNT or self.owns(f"account:{account_name}"))
+
+    def owns_tweet(self, tweet_id):
+        """True if this node answers a tweet (always, unless sharding by tweet)"""
+        return self.member and (self.shard_by != SHARD_BY_TWEET or self.owns(f"tweet:{tweet_id}"))
+
+    def budget_share(self):
+        """Share of each account's post budget this node may spend"""
+        return 1 / len(self.nodes()) if self.shard_by == SHARD_BY_TWEET else 1.0
+
+    def claim(self, key, ttl):
+        """Claim a piece of work for this node for ttl seconds; False if another node has it"""
+        return self.backend.acquire(CLAIM_PREFIX + key, self.node_id, ttl)
+
+    def claimed_elsewhere(self, key):
+        """True if another node holds the claim on key"""
+        lease = self.backend.get(CLAIM_PREFIX + key)
+        return bool(lease and lease["owner"] != self.node_id)
+
+    def release_claim(self, key):
+        """Give up a claim so the work can be retried, here or on another node"""
+        self.backend.release(CLAIM_PREFIX + key, self.node_id)
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+def get_coordinator():
+    """Process-wide Coordinator built from the COORDINATION_* settings.
+
+    Raises RuntimeError if the configured backend can't be used (e.g. redis without the redis package).
+    """
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = Coordinator(create_backend())
+        return _coordinator
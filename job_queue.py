@@ -0,0 +1,160 @@
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_kind ON jobs (state, kind, id);
+"""
+
+# Job states
+PENDING = "pending"  # Ready to run
+RUNNING = "running"  # Claimed; still running if the process died mid-job
+DONE = "done"
+FAILED = "failed"  # Gave up after max_attempts
+
+INTERRUPTED = "interrupted"  # Error recorded on jobs a dead process left running
+
+def was_interrupted(job):
+    """True if a claimed job is a rerun of an attempt cut short by a restart, so its post may already be out"""
+    return job["attempts"] > 1 and job["error"] == INTERRUPTED
+
+class JobQueue:
+    """Durable queue of generated-but-unposted posts and replies in the ledger database.
+
+    Every job has a dedup key (e.g. "wisdom:<day>" or "reply:<tweet_id>"), so
+    enqueueing the same work twice returns the existing job instead of a new
+    one. Jobs that were running when the process died are handed out again by
+    recover() marked as interrupted, which tells the runner to check whether
+    the post already went out.
+    """
+
+    def __init__(self, ledger, max_attempts=3):
+        self.ledger = ledger
+        self.max_attempts = max_attempts
+        self.ledger.connect().executescript(SCHEMA)
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job_id, dedup_key, kind, payload, state, attempts, result, error, created_at = row
+        return {"id": job_id, "key": dedup_key, "kind": kind, "payload": json.loads(payload), "state": state,
+                "attempts": attempts, "result": result, "error": error, "created_at": created_at}
+
+    def _select(self, where, params):
+        return self.ledger.connect().execute(
+            "SELECT id, dedup_key, kind, payload, state, attempts, result, error, created_at "
+            f"FROM jobs WHERE {where}", params
+        )
+
+    def get(self, dedup_key):
+        """The job with this dedup key, or None"""
+        return self._job(self._select("dedup_key = ?", (dedup_key,)).fetchone())
+
+    def enqueue(self, dedup_key, kind, payload):
+        """Add a pending job unless one with the same dedup key exists; returns the (existing) job"""
+        now = time.time()
+        self.ledger.connect().execute(
+            "INSERT OR IGNORE INTO jobs (dedup_key, kind, payload, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (dedup_key, kind, json.dumps(payload), PENDING, now, now)
+        )
+        return self.get(dedup_key)
+
+    def claim(self, kind=None, job_id=None):
+        """Mark the oldest pending job (of a kind, or a given one) running; returns it or None"""
+        where, params = f"state = '{PENDING}'", ()
+        if kind:
+            where, params = where + " AND kind = ?", params + (kind,)
+        if job_id:
+            where, params = where + " AND id = ?", params + (job_id,)
+        conn = self.ledger.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job = self._job(self._select(where + " ORDER BY id LIMIT 1", params).fetchone())
+            if job:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, time.time(), job["id"])
+                )
+                job["state"], job["attempts"] = RUNNING, job["attempts"] + 1
+        return job
+
+    def complete(self, job_id, result=None):
+        """Mark a job done with its result (e.g. the posted tweet ID)"""
+        self.ledger.connect().execute(
+            "UPDATE jobs SET state = ?, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (DONE, result, time.time(), job_id)
+        )
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; the job is retried until it has used max_attempts"""
+        self.ledger.connect().execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, updated_at = ? "
+            "WHERE id = ?",
+            (self.max_attempts, FAILED, PENDING, str(error)[:500], time.time(), job_id)
+        )
+
+    def release(self, job_id):
+        """Hand a running job back to the queue without counting the attempt (nothing was sent)"""
+        self.ledger.connect().execute(
+            "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), updated_at = ? WHERE id = ? AND state = ?",
+            (PENDING, time.time(), job_id, RUNNING)
+        )
+
+    def retry(self, job_id):
+        """Give a failed job a fresh set of attempts"""
+        self.ledger.connect().execute(
+            "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE id = ? AND state = ?",
+            (PENDING, time.time(), job_id, FAILED)
+        )
+
+    def recover(self):
+        """Make jobs left running by a dead process pending again, marked interrupted; returns how many"""
+        cursor = self.ledger.connect().execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE state = ?",
+            (PENDING, INTERRUPTED, time.time(), RUNNING)
+        )
+        if cursor.rowcount:
+            logger.info(f"Resuming {cursor.rowcount} job(s) interrupted by a restart")
+        return cursor.rowcount
+
+    def counts(self):
+        """Number of jobs per (kind, state)"""
+        return {(kind, state): count for kind, state, count in self.ledger.connect().execute(
+            "SELECT kind, state, COUNT(*) FROM jobs GROUP BY kind, state"
+        )}
+
+    def prune(self, max_age_seconds, kind=None):
+        """Expire pending jobs and delete finished ones older than max_age_seconds; returns how many"""
+        cutoff = time.time() - max_age_seconds
+        where, params = "created_at < ?", (cutoff,)
+        if kind:
+            where, params = where + " AND kind = ?", params + (kind,)
+        conn = self.ledger.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                f"UPDATE jobs SET state = ?, error = 'expired', updated_at = ? WHERE state = ? AND {where}",
+                (FAILED, time.time(), PENDING) + params
+            ).rowcount
+            # Finished jobs are kept a while longer so their dedup keys still block repeats
+            deleted = conn.execute(
+                f"DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ? AND {where}",
+                (DONE, FAILED, cutoff) + params
+            ).rowcount
+        return expired + deleted
@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# What to do with runs that were missed (the process was suspended, or the job was still running)
+CATCH_UP_SKIP = "skip"  # Drop them and wait for the next regular run
+CATCH_UP_ONCE = "once"  # Run once for all of them
+CATCH_UP_ALL = "all"  # Run once for each of them
+
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))  # Jobs that may run at the same time
+MISSED_GRACE_SECONDS = int(os.getenv("SCHEDULER_GRACE_SECONDS", "300"))  # Later than this counts as missed
+
+def next_run_at(time_str, now=None, weekday=None):
+    """Return the next datetime matching HH:MM (optionally on a given weekday name)"""
+    now = now or datetime.now()
+    hour, minute = map(int, time_str.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    if weekday is not None:
+        run += timedelta(days=(WEEKDAYS.index(weekday) - run.weekday()) % 7)
+        if run <= now:
+            run += timedelta(days=7)
+    elif run <= now:
+        run += timedelta(days=1)
+
+    return run
+
+def first_run_at(time_str, last_run=None, weekday=None):
+    """A job's first run: the one after its last recorded run (possibly already past), else the next one from now"""
+    return next_run_at(time_str, now=last_run, weekday=weekday) if last_run else next_run_at(time_str, weekday=weekday)
+
+class Job:
+    """A function run at HH:MM every day (or every week on one weekday)"""
+
+    def __init__(self, name, time_str, func, kwargs=None, weekday=None, max_instances=1, catch_up=CATCH_UP_ONCE,
+                 last_run=None):
+        self.name = name
+        self.time_str = time_str
+        self.func = func
+        self.kwargs = kwargs or {}
+        self.weekday = weekday
+        self.max_instances = max_instances
+        self.catch_up = catch_up
+        self.next_run = first_run_at(time_str, last_run, weekday)
+        self.running = 0
+        self.pending = 0  # Runs waiting for a free instance
+
+    def __str__(self):
+        every = f"every {self.weekday}" if self.weekday else "every day"
+        return f"{self.name}: {every} at {self.time_str} (next run {self.next_run:%Y-%m-%d %H:%M})"
+
+class Scheduler:
+    """Runs jobs at their deadlines on a worker pool.
+
+    Deadlines are kept in a heap; the scheduler thread sleeps on a condition
+    exactly until the earliest one (or until a job is added or it is stopped),
+    so nothing is polled and a slow job never delays another. Each job runs
+    at most max_instances times at once, and runs that were missed are dropped,
+    coalesced or replayed according to its catch-up policy.
+
+    With a store (anything with get_cursor/set_cursor, e.g. the ledger) each
+    job's latest due run is saved when it is dispatched, so runs missed while
+    the process was down are caught up after a restart too.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, grace_seconds=MISSED_GRACE_SECONDS, store=None):
+        self.workers = workers
+        self.grace = timedelta(seconds=grace_seconds)
+        self.store = store
+        self.condition = threading.Condition()
+        self.heap = []  # (next run, sequence, job)
+        self.counter = itertools.count()
+        self.jobs = {}
+        self.executor = None
+        self.stopped = False
+
+    def add(self, name, time_str, func, weekday=None, max_instances=1, catch_up=CATCH_UP_ONCE, **kwargs):
+        """Schedule func(**kwargs) at time_str every day, or every week on weekday; replaces a job of the same name"""
+        job = Job(name, time_str, func, kwargs, weekday, max_instances, catch_up, last_run=self.last_run(name))
+        with self.condition:
+            self.jobs[name] = job
+            heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+            self.condition.notify()
+        return job
+
+    def clear(self):
+        """Remove every job"""
+        with self.condition:
+            self.jobs.clear()
+            self.heap.clear()
+            self.condition.notify()
+
+    def get_jobs(self):
+        """Jobs ordered by their next run"""
+        with self.condition:
+            return sorted(self.jobs.values(), key=lambda job: job.next_run)
+
+    def next_run(self):
+        """Datetime of the earliest scheduled run, or None"""
+        jobs = self.get_jobs()
+        return jobs[0].next_run if jobs else None
+
+    def last_run(self, name):
+        """The latest run of a job that was dispatched (or skipped), from the store; None if unknown"""
+        if not self.store:
+            return None
+        try:
+            value = self.store.get_cursor(f"job_last_run:{name}")
+            return datetime.fromtimestamp(float(value)) if value else None
+        except Exception as e:
+            logger.error(f"Failed to read the last run of {name}: {e}")
+            return None
+
+    def record_run(self, name, run):
+        """Save a job's latest due run in the store"""
+        if not self.store:
+            return
+        try:
+            self.store.set_cursor(f"job_last_run:{name}", run.timestamp())
+        except Exception as e:
+            logger.error(f"Failed to save the last run of {name}: {e}")
+
+    def _missed_runs(self, job, now):
+        """Count the runs due by now and move job.next_run past them"""
+        due = []
+        while job.next_run <= now:
+            due.append(job.next_run)
+            job.next_run = next_run_at(job.time_str, now=job.next_run, weekday=job.weekday)
+        if due:
+            self.record_run(job.name, due[-1])
+        late = [run for run in due if now - run > self.grace]
+        if not late:
+            return len(due)
+
+        logger.warning(f"Job {job.name} missed {len(late)} run(s) since {late[0]:%Y-%m-%d %H:%M} ({job.catch_up})")
+        if job.catch_up == CATCH_UP_SKIP:
+            return len(due) - len(late)
+        if job.catch_up == CATCH_UP_ONCE:
+            return 1
+        return len(due)
+
+    def _dispatch(self, job, runs):
+        """Start up to `runs` instances of job, leaving the rest pending (called with the lock held)"""
+        job.pending += runs
+        if job.catch_up != CATCH_UP_ALL:
+            # A job that is already running covers the runs that came due meanwhile
+            job.pending = min(job.pending, 1)
+        while job.pending and job.running < job.max_instances:
+            job.pending -= 1
+            job.running += 1
+            self.executor.submit(self._run, job)
+        if job.pending:
+            logger.info(f"Job {job.name} is still running; next run deferred until it finishes")
+
+    def _run(self, job):
+        started = datetime.now()
+        logger.info(f"Running scheduled job {job.name}")
+        try:
+            job.func(**job.kwargs)
+        except Exception as e:
+            logger.error(f"Error in scheduled job {job.name}: {e}")
+        finally:
+            logger.info(f"Job {job.name} finished in {(datetime.now() - started).total_seconds():.1f}s")
+            with self.condition:
+                job.running -= 1
+                if job.pending and not self.stopped:
+                    self._dispatch(job, 0)
+
+    def run(self):
+        """Dispatch jobs at their deadlines until stop() is called"""
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="koiyu-job")
+        with self.condition:
+            while not self.stopped:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                next_run, _, job = self.heap[0]
+                wait = (next_run - datetime.now()).total_seconds()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+
+                heapq.heappop(self.heap)
+                if self.jobs.get(job.name) is not job or job.next_run != next_run:
+                    continue  # Replaced or removed since it was queued
+
+                runs = self._missed_runs(job, datetime.now())
+                if runs:
+                    self._dispatch(job, runs)
+                heapq.heappush(self.heap, (job.next_run, next(self.counter), job))
+                logger.info(f"Next run of {job.name}: {job.next_run:%Y-%m-%d %H:%M:%S}")
+
+        # Let running jobs finish, but start nothing new
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self):
+        """Stop dispatching; run() returns once running jobs finish"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
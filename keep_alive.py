@@ -1,13 +1,12 @@
 import logging
 import threading
 import time
-import requests
 import http.server
 import socketserver
 import os
-import sys
-import json
 from datetime import datetime
+from coordination import get_coordinator
+from transport import get_session
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -15,63 +14,14 @@ logger = logging.getLogger(__name__)
 
 # Simple HTTP server to keep the service alive
 PORT = int(os.environ.get('PORT', 10000))
-LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "koiyu_running.lock")
 
-def is_already_running():
-    """Check if another instance is already running by lock file"""
-    try:
-        # If the lock file exists, check if it's stale
-        if os.path.exists(LOCK_FILE):
-            with open(LOCK_FILE, 'r') as f:
-                data = json.load(f)
-                started_at = datetime.fromisoformat(data.get('started_at', ''))
-                pid = data.get('pid')
-                
-                # If the lock was created less than 5 minutes ago, consider it active
-                if (datetime.now() - started_at).total_seconds() < 300:
-                    logger.info(f"Found recent lock file (PID: {pid}). Another instance may be running.")
-                    return True
-                else:
-                    logger.info(f"Found stale lock file. Removing it.")
-                    os.remove(LOCK_FILE)
-                    return False
-        return False
-    except Exception as e:
-        logger.error(f"Error checking lock file: {e}")
-        # If any error, assume no other instance is running
-        if os.path.exists(LOCK_FILE):
-            try:
-                os.remove(LOCK_FILE)
-            except:
-                pass
-        return False
+# Callable returning the analytics report text, registered by the running bot
+analytics_provider = None
 
-def create_lock_file():
-    """Create a lock file to indicate this instance is running"""
-    try:
-        with open(LOCK_FILE, 'w') as f:
-            data = {
-                'started_at': datetime.now().isoformat(),
-                'pid': os.getpid()
-            }
-            json.dump(data, f)
-        logger.info(f"Lock file created for PID {os.getpid()}")
-    except Exception as e:
-        logger.error(f"Error creating lock file: {e}")
-
-def update_lock_file():
-    """Update the timestamp in the lock file to keep it fresh"""
-    try:
-        if os.path.exists(LOCK_FILE):
-            with open(LOCK_FILE, 'r') as f:
-                data = json.load(f)
-            
-            data['last_updated'] = datetime.now().isoformat()
-            
-            with open(LOCK_FILE, 'w') as f:
-                json.dump(data, f)
-    except Exception as e:
-        logger.error(f"Error updating lock file: {e}")
+def set_analytics_provider(provider):
+    """Register the function the admin panel uses to render analytics"""
+    global analytics_provider
+    analytics_provider = provider
 
 class KeepAliveHandler(http.server.SimpleHTTPRequestHandler):
     def do_GET(self):
@@ -82,33 +32,28 @@ class KeepAliveHandler(http.server.SimpleHTTPRequestHandler):
             
             # Get current status
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            coordinator = get_coordinator()
             status = {
                 "status": "active",
                 "time": current_time,
                 "pid": os.getpid(),
+                "node": coordinator.node_id,
+                "role": "leader" if coordinator.leader else "follower",
                 "uptime": None
             }
             
-            # Check if lock file exists and get start time
-            if os.path.exists(LOCK_FILE):
-                try:
-                    with open(LOCK_FILE, 'r') as f:
-                        data = json.load(f)
-                        started_at = datetime.fromisoformat(data.get('started_at', ''))
-                        uptime_seconds = (datetime.now() - started_at).total_seconds()
-                        hours, remainder = divmod(uptime_seconds, 3600)
-                        minutes, seconds = divmod(remainder, 60)
-                        status["uptime"] = f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
-                except:
-                    status["uptime"] = "unknown"
-                    
-            # Update the lock file to show we're still active
-            update_lock_file()
+            # Uptime counts from when this instance took its node lease
+            if coordinator.started_at:
+                uptime_seconds = time.time() - coordinator.started_at
+                hours, remainder = divmod(uptime_seconds, 3600)
+                minutes, seconds = divmod(remainder, 60)
+                status["uptime"] = f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
             
             # Return status as text
             response_text = f"KOIYU, the Oracle of Transcendence, is awake and vigilant.\n"
             response_text += f"Time: {status['time']}\n"
             response_text += f"PID: {status['pid']}\n"
+            response_text += f"Node: {status['node']} ({status['role']} of {len(coordinator.nodes())})\n"
             if status['uptime']:
                 response_text += f"Uptime: {status['uptime']}\n"
             
@@ -123,8 +68,12 @@ class KeepAliveHandler(http.server.SimpleHTTPRequestHandler):
                 
                 # Generate admin HTML
                 try:
-                    from tweet_bot import load_usage_stats, generate_analytics_report
-                    analytics = generate_analytics_report().replace('\n', '<br>')
+                    if analytics_provider:
+                        # Read the live in-memory counters of the running bot
+                        analytics = analytics_provider().replace('\n', '<br>')
+                    else:
+                        from tweet_bot import load_usage_stats, generate_analytics_report
+                        analytics = generate_analytics_report().replace('\n', '<br>')
                 except Exception as e:
                     analytics = f"Error loading analytics: {str(e)}"
                     logger.error(f"Admin panel error: {e}")
@@ -184,10 +133,17 @@ class KeepAliveHandler(http.server.SimpleHTTPRequestHandler):
         # Silent logging to avoid cluttering the console
         return
 
-def start_server():
+class KeepAliveServer(socketserver.TCPServer):
+    allow_reuse_address = True  # Rebind right after a restart, while the old connections sit in TIME_WAIT
+
+def create_server():
+    """Bind the keep-alive HTTP server to PORT; raises OSError if the port can't be used"""
+    return KeepAliveServer(("", PORT), KeepAliveHandler)
+
+def start_server(httpd=None):
     """Start a simple HTTP server to keep the service alive"""
     try:
-        with socketserver.TCPServer(("", PORT), KeepAliveHandler) as httpd:
+        with httpd or create_server() as httpd:
             logger.info(f"Serving keep-alive endpoint at port {PORT}")
             httpd.serve_forever()
     except Exception as e:
@@ -223,7 +179,7 @@ class KeepAliveService:
         while self.running:
             try:
                 start_time = time.time()
-                response = requests.get(self.url, timeout=30)
+                response = get_session().get(self.url)
                 
                 if response.status_code == 200:
                     logger.info(f"Keep-alive ping successful: {response.status_code}, latency: {(time.time() - start_time)*1000:.2f}ms")
@@ -263,21 +219,33 @@ class KeepAliveService:
             self.thread = None
 
 def run_keep_alive_server():
-    """Start the keep-alive server and service"""
-    # Check if another instance is already running
-    if is_already_running():
-        logger.warning("Another instance appears to be running already. Exiting.")
-        print("Another instance of KOIYU is already running. Exiting.")
-        sys.exit(0)
+    """Start the keep-alive server and service, then join the node group.
+
+    Raises RuntimeError if the coordination backend can't be set up, if PORT is
+    taken, or if this node's lease is still held after one lease TTL (another
+    instance is running with the same NODE_ID).
+    """
+    # A misconfigured coordination backend stops the bot before it listens on anything
+    coordinator = get_coordinator()
     
-    # Create lock file for this instance
-    create_lock_file()
+    # Bind before anything else so a taken port stops the bot instead of leaving it without health checks
+    try:
+        httpd = create_server()
+    except OSError as e:
+        raise RuntimeError(f"Keep-alive server can't listen on port {PORT}: {e}") from e
     
     # Start the HTTP server
-    server_thread = threading.Thread(target=start_server, daemon=True)
+    server_thread = threading.Thread(target=start_server, args=(httpd,), daemon=True)
     server_thread.start()
     logger.info("Keep-alive HTTP server thread started")
     
+    # Health checks are answered while this waits for a previous instance of the node to stop.
+    # A crashed instance's lease expires within one TTL; one still held after that is a live duplicate.
+    if not coordinator.start(timeout=coordinator.ttl):
+        httpd.shutdown()
+        raise RuntimeError(f"Node {coordinator.node_id} is already running elsewhere; "
+                           f"give each instance its own NODE_ID")
+    
     # Start the pinger service (5 minute interval)
     keep_alive = KeepAliveService(interval_minutes=5)
     keep_alive.start()
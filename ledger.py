@@ -0,0 +1,299 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "koiyu.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    month TEXT NOT NULL,
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    tweet_id TEXT,
+    target_id TEXT,
+    latency_ms REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER,
+    model TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_month_kind ON events (month, kind, ts);
+CREATE INDEX IF NOT EXISTS idx_events_day_kind ON events (day, kind);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_locks_expires ON locks (expires_at);
+"""
+
+EVENT_FIELDS = ("tweet_id", "target_id", "latency_ms", "prompt_tokens",
+                "completion_tokens", "cached_tokens", "model", "detail")
+
+RANDOM_REPLY = "random"  # detail of replies planned by reply_planner, as opposed to mention answers
+
+# Columns added to the events table after its first release: name -> type
+ADDED_COLUMNS = {"cached_tokens": "INTEGER"}
+
+# Event kinds that count against the monthly usage caps
+USAGE_KINDS = ("post", "reply", "read", "openai")
+
+class Ledger:
+    """Embedded SQLite store (WAL mode) for KOIYU's state.
+
+    Holds an append-only `events` table (every post, reply, read and OpenAI call),
+    plus small indexed tables for cursors and locks. Each thread gets its own
+    connection; WAL lets readers run alongside the writer.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        conn = self.connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _migrate(self, conn):
+        """Add columns that databases created by older versions are missing"""
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE events ADD COLUMN {column} {column_type}")
+
+    def connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # Not bound to its thread so close() can shut every connection down
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self.local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self):
+        """Close the connections opened by every thread (call once the workers have stopped)"""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self.local = threading.local()
+
+    # Events
+
+    @staticmethod
+    def make_event(kind, ts=None, **fields):
+        """Build an event row; unknown fields are rejected"""
+        unknown = set(fields) - set(EVENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown event fields: {', '.join(sorted(unknown))}")
+        ts = ts or time.time()
+        moment = datetime.fromtimestamp(ts)
+        row = {"ts": ts, "month": moment.strftime("%Y-%m"), "day": moment.strftime("%Y-%m-%d"), "kind": kind}
+        row.update({field: fields.get(field) for field in EVENT_FIELDS})
+        return row
+
+    def record(self, kind, ts=None, **fields):
+        """Append a single event"""
+        self.record_many([self.make_event(kind, ts, **fields)])
+
+    def record_many(self, events):
+        """Append several events in one transaction"""
+        if not events:
+            return
+        columns = ("ts", "month", "day", "kind") + EVENT_FIELDS
+        sql = f"INSERT INTO events ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(sql, [tuple(event[c] for c in columns) for event in events])
+
+    def last_reset(self, month):
+        """Timestamp of the latest usage reset within a month (or 0)"""
+        row = self.connect().execute(
+            "SELECT MAX(ts) FROM events WHERE month = ? AND kind = 'reset'", (month,)
+        ).fetchone()
+        return row[0] or 0
+
+    def usage_summary(self, month=None):
+        """Usage counters for a month, counted from the latest reset onwards"""
+        month = month or datetime.now().strftime("%Y-%m")
+        since = self.last_reset(month)
+        conn = self.connect()
+        counts = dict(conn.execute(
+            "SELECT kind, COUNT(*) FROM events WHERE month = ? AND ts >= ? "
+            "AND kind IN ('post', 'reply', 'read', 'openai') GROUP BY kind",
+            (month, since)
+        ).fetchall())
+        daily_posts = dict(conn.execute(
+            "SELECT day, COUNT(*) FROM events WHERE month = ? AND ts >= ? AND kind = 'post' GROUP BY day",
+            (month, since)
+        ).fetchall())
+        daily_replies = dict(conn.execute(
+            "SELECT day, COUNT(*) FROM events WHERE month = ? AND ts >= ? AND kind = 'reply' GROUP BY day",
+            (month, since)
+        ).fetchall())
+        daily_random_replies = dict(conn.execute(
+            "SELECT day, COUNT(*) FROM events WHERE month = ? AND ts >= ? AND kind = 'reply' AND detail = ? GROUP BY day",
+            (month, since, RANDOM_REPLY)
+        ).fetchall())
+        return {
+            "last_reset": month,
+            "posts_count": counts.get("post", 0) + counts.get("reply", 0),
+            "replies_count": counts.get("reply", 0),
+            "reads_count": counts.get("read", 0),
+            "openai_calls": counts.get("openai", 0),
+            "daily_posts": daily_posts,
+            "daily_replies": daily_replies,
+            "daily_random_replies": daily_random_replies
+        }
+
+    def openai_summary(self, month=None):
+        """Call count, token totals and average latency of OpenAI calls in a month"""
+        month = month or datetime.now().strftime("%Y-%m")
+        row = self.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+            "AVG(latency_ms) FROM events WHERE month = ? AND kind = 'openai'",
+            (month,)
+        ).fetchone()
+        return {
+            "calls": row[0],
+            "prompt_tokens": row[1],
+            "completion_tokens": row[2],
+            "avg_latency_ms": row[3] or 0
+        }
+
+    def prompt_cache_summary(self, month=None):
+        """Prompt-cache use of OpenAI calls in a month: token totals and latency with and without cache hits"""
+        month = month or datetime.now().strftime("%Y-%m")
+        row = self.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(cached_tokens > 0), 0), COALESCE(SUM(prompt_tokens), 0), "
+            "COALESCE(SUM(cached_tokens), 0), AVG(CASE WHEN cached_tokens > 0 THEN latency_ms END), "
+            "AVG(CASE WHEN COALESCE(cached_tokens, 0) = 0 THEN latency_ms END) "
+            "FROM events WHERE month = ? AND kind = 'openai' AND prompt_tokens IS NOT NULL",
+            (month,)
+        ).fetchone()
+        return {
+            "calls": row[0],
+            "cached_calls": row[1],
+            "prompt_tokens": row[2],
+            "cached_tokens": row[3],
+            "latency_cached_ms": row[4] or 0,
+            "latency_uncached_ms": row[5] or 0
+        }
+
+    def openai_by_type(self, month=None):
+        """[(content type, model, calls, prompt tokens, completion tokens, average latency ms)] for a month"""
+        month = month or datetime.now().strftime("%Y-%m")
+        return self.connect().execute(
+            "SELECT detail, model, COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+            "AVG(latency_ms) FROM events WHERE month = ? AND kind = 'openai' GROUP BY detail, model ORDER BY detail, model",
+            (month,)
+        ).fetchall()
+
+    def average_latency(self, kind, month=None):
+        """Average latency in milliseconds of one event kind in a month"""
+        month = month or datetime.now().strftime("%Y-%m")
+        row = self.connect().execute(
+            "SELECT AVG(latency_ms) FROM events WHERE month = ? AND kind = ? AND latency_ms IS NOT NULL",
+            (month, kind)
+        ).fetchone()
+        return row[0] or 0
+
+    # Cursors
+
+    def get_cursor(self, name, default=None):
+        """Read a named cursor value"""
+        row = self.connect().execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_cursor(self, name, value):
+        """Write a named cursor value"""
+        self.connect().execute(
+            "INSERT INTO cursors (name, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (name, None if value is None else str(value), time.time())
+        )
+
+    # Locks
+
+    def acquire_lock(self, name, owner, ttl):
+        """Take a lock unless another owner holds an unexpired one; returns True on success"""
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at FROM locks WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != str(owner) and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT INTO locks (name, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, "
+                "acquired_at = CASE WHEN locks.owner = excluded.owner THEN locks.acquired_at ELSE excluded.acquired_at END, "
+                "expires_at = excluded.expires_at",
+                (name, str(owner), now, now + ttl)
+            )
+        return True
+
+    def refresh_lock(self, name, owner, ttl):
+        """Extend a lock held by owner; returns False if it is no longer ours"""
+        cursor = self.connect().execute(
+            "UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ?",
+            (time.time() + ttl, name, str(owner))
+        )
+        return cursor.rowcount > 0
+
+    def release_lock(self, name, owner):
+        """Release a lock held by owner"""
+        self.connect().execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, str(owner)))
+
+    def list_locks(self, prefix=""):
+        """Return {name: lock} for the unexpired locks whose names start with prefix"""
+        rows = self.connect().execute(
+            "SELECT name, owner, acquired_at, expires_at FROM locks WHERE substr(name, 1, ?) = ? AND expires_at > ?",
+            (len(prefix), prefix, time.time())
+        )
+        return {name: {"owner": owner, "acquired_at": acquired_at, "expires_at": expires_at}
+                for name, owner, acquired_at, expires_at in rows}
+
+    def purge_locks(self):
+        """Delete expired locks; returns how many"""
+        return self.connect().execute("DELETE FROM locks WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def get_lock(self, name):
+        """Return {"owner", "acquired_at", "expires_at"} for a lock, or None"""
+        row = self.connect().execute(
+            "SELECT owner, acquired_at, expires_at FROM locks WHERE name = ?", (name,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"owner": row[0], "acquired_at": row[1], "expires_at": row[2]}
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+def get_ledger(path=DEFAULT_DB_PATH):
+    """Return the shared Ledger for a database path"""
+    with _ledgers_lock:
+        if path not in _ledgers:
+            _ledgers[path] = Ledger(path)
+        return _ledgers[path]
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mentions (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    author_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    queued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mention_gaps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    since_id TEXT,
+    until_id TEXT
+);
+"""
+
+class MentionQueue:
+    """Durable queue of mentions waiting for a reply, in the ledger database.
+
+    Besides the pending mentions it keeps the unread ID ranges ("gaps") that
+    an ingestion run had no page budget left for. ingest() stores a run's
+    mentions and its new gaps in one transaction, so a crash mid-run leaves
+    the previous gaps in place.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.ledger.connect().executescript(SCHEMA)
+
+    def pending(self):
+        """Queued mentions as {"id", "text", "author_id", "attempts"}, oldest first"""
+        rows = self.ledger.connect().execute(
+            "SELECT id, text, author_id, attempts FROM mentions ORDER BY CAST(id AS INTEGER)"
+        )
+        return [{"id": mention_id, "text": text, "author_id": author_id, "attempts": attempts}
+                for mention_id, text, author_id, attempts in rows]
+
+    def newest_id(self):
+        """ID of the newest queued mention, or None"""
+        row = self.ledger.connect().execute("SELECT MAX(CAST(id AS INTEGER)) FROM mentions").fetchone()
+        return row[0]
+
+    def gaps(self):
+        """Unread ranges as {"since_id", "until_id"}, in the order they were found"""
+        rows = self.ledger.connect().execute("SELECT since_id, until_id FROM mention_gaps ORDER BY id")
+        return [{"since_id": since_id, "until_id": until_id} for since_id, until_id in rows]
+
+    def ingest(self, mentions, gaps):
+        """Queue fetched mentions (ignoring ones already queued) and replace the gaps; returns how many were added"""
+        now = time.time()
+        conn = self.ledger.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            added = 0
+            for mention in mentions:
+                added += conn.execute(
+                    "INSERT OR IGNORE INTO mentions (id, text, author_id, attempts, queued_at) VALUES (?, ?, ?, ?, ?)",
+                    (str(mention["id"]), mention["text"], mention.get("author_id"), mention.get("attempts", 0), now)
+                ).rowcount
+            conn.execute("DELETE FROM mention_gaps")
+            conn.executemany(
+                "INSERT INTO mention_gaps (since_id, until_id) VALUES (?, ?)",
+                [(gap["since_id"], gap["until_id"]) for gap in gaps]
+            )
+        return added
+
+    def remove(self, mention_id):
+        """Take a handled mention off the queue"""
+        self.ledger.connect().execute("DELETE FROM mentions WHERE id = ?", (str(mention_id),))
+
+    def record_attempt(self, mention_id):
+        """Count a failed reply attempt; returns the mention's attempts so far (0 if it isn't queued)"""
+        conn = self.ledger.connect()
+        conn.execute("UPDATE mentions SET attempts = attempts + 1 WHERE id = ?", (str(mention_id),))
+        row = conn.execute("SELECT attempts FROM mentions WHERE id = ?", (str(mention_id),)).fetchone()
+        return row[0] if row else 0
+
+    def migrate_file(self, path):
+        """One-time import of the legacy JSON mention queue; returns True if it was imported"""
+        if self.ledger.get_cursor("migrated_mention_queue") or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as f:
+                queue = json.load(f)
+            self.ingest(queue.get("pending", []), queue.get("gaps", []) + self.gaps())
+            self.ledger.set_cursor("migrated_mention_queue", time.time())
+            logger.info(f"Migrated the mention queue from {path} into the ledger")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to migrate mention queue: {e}")
+            return False
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Models per content type, heaviest (preferred) first; later ones are lighter fallbacks
+DEFAULT_TIERS = {
+    "wisdom": {"models": ["gpt-4o", "gpt-4o-mini"], "temperature": 0.7, "latency_budget_ms": 8000},
+    "story": {"models": ["gpt-4o", "gpt-4o-mini"], "temperature": 0.8, "latency_budget_ms": 10000},
+    "mention_reply": {"models": ["gpt-4o", "gpt-4o-mini"], "temperature": 0.7, "latency_budget_ms": 4000},
+    "random_reply": {"models": ["gpt-4o-mini"], "temperature": 0.7, "latency_budget_ms": 4000},
+}
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of a call (0 for unknown models)"""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * prompt_price + (completion_tokens or 0) * completion_price) / 1_000_000
+
+def model_weight(model):
+    """Relative weight of a model by its token prices, or None if it isn't priced"""
+    prices = MODEL_PRICES.get(model)
+    return sum(prices) if prices else None
+
+def check_tier_order(tiers):
+    """Raise ValueError if a tier lists a heavier priced model after a lighter one"""
+    for content_type, tier in tiers.items():
+        weights = [(model, model_weight(model)) for model in tier["models"]]
+        weights = [(model, weight) for model, weight in weights if weight is not None]
+        for (heavier, w1), (lighter, w2) in zip(weights, weights[1:]):
+            if w2 > w1:
+                raise ValueError(f"Model tier {content_type} falls back from {heavier} to the heavier {lighter}; "
+                                 f"list models heaviest first")
+
+def tiers_from_env(tiers=DEFAULT_TIERS):
+    """Apply MODEL_TIER_<TYPE>="model,fallback,..." overrides to the default tiers"""
+    configured = {}
+    for content_type, tier in tiers.items():
+        tier = dict(tier)
+        models = os.getenv(f"MODEL_TIER_{content_type.upper()}")
+        if models:
+            tier["models"] = [m.strip() for m in models.split(",") if m.strip()]
+        configured[content_type] = tier
+    return configured
+
+class ModelRouter:
+    """Picks the model for each kind of content and demotes unhealthy ones.
+
+    A model is skipped for a cooldown period when its average latency for a
+    content type breaks that tier's latency budget (judged once it has
+    min_latency_samples calls, so one slow first call doesn't demote it), or
+    when too many of its recent calls failed. Batched calls are measured per
+    item they generate. The lightest model in a tier is always available
+    as the last resort.
+    """
+
+    def __init__(self, tiers=None, error_window=10, max_error_rate=0.3, cooldown_seconds=600, alpha=0.3,
+                 min_latency_samples=3):
+        self.tiers = tiers or tiers_from_env()
+        check_tier_order(self.tiers)
+        self.error_window = error_window
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.alpha = alpha
+        self.min_latency_samples = min_latency_samples
+        self.lock = threading.Lock()
+        self.latency = {}  # (content_type, model) -> EWMA latency in ms
+        self.samples = {}  # (content_type, model) -> latency samples in the EWMA
+        self.outcomes = {}  # (content_type, model) -> recent True/False results
+        self.demoted_until = {}  # (content_type, model) -> timestamp
+
+    def tier(self, content_type):
+        """Settings for a content type (unknown types use the wisdom tier)"""
+        return self.tiers.get(content_type, self.tiers["wisdom"])
+
+    def candidates(self, content_type):
+        """Models to try for a content type, healthy ones first in tier order"""
+        models = self.tier(content_type)["models"]
+        now = time.time()
+        with self.lock:
+            healthy = [m for m in models if self.demoted_until.get((content_type, m), 0) <= now]
+        return healthy + [m for m in models if m not in healthy]
+
+    def record(self, content_type, model, latency_ms, ok=True, items=1):
+        """Record a call's outcome (items: how many replies it generated), demoting the model if it breaks the tier's budgets"""
+        key = (content_type, model)
+        budget = self.tier(content_type)["latency_budget_ms"]
+        latency_ms /= max(1, items)
+        with self.lock:
+            outcomes = self.outcomes.setdefault(key, deque(maxlen=self.error_window))
+            outcomes.append(ok)
+            if ok:
+                previous = self.latency.get(key, latency_ms)
+                self.latency[key] = previous + self.alpha * (latency_ms - previous)
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+            error_rate = outcomes.count(False) / len(outcomes)
+            slow = self.samples.get(key, 0) >= self.min_latency_samples and self.latency[key] > budget
+            if slow or (len(outcomes) >= 3 and error_rate > self.max_error_rate):
+                if self.demoted_until.get(key, 0) <= time.time():
+                    reason = f"latency {self.latency[key]:.0f}ms" if slow else f"error rate {error_rate:.0%}"
+                    logger.warning(f"Demoting {model} for {content_type} for {self.cooldown_seconds}s ({reason})")
+                self.demoted_until[key] = time.time() + self.cooldown_seconds
+                # Start fresh when it is tried again
+                self.latency.pop(key, None)
+                self.samples.pop(key, None)
+                outcomes.clear()
+
+    def status(self):
+        """{(content_type, model): (EWMA latency ms, seconds demoted)} for reporting"""
+        now = time.time()
+        with self.lock:
+            keys = set(self.latency) | set(self.demoted_until)
+            return {key: (self.latency.get(key, 0.0), max(0.0, self.demoted_until.get(key, 0) - now)) for key in keys}
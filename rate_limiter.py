@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+
+import requests
+import tweepy
+
+logger = logging.getLogger(__name__)
+
+# X API v2 request windows per endpoint: (requests, window seconds), Basic plan, per user
+DEFAULT_LIMITS = {
+    "create_tweet": (100, 15 * 60),
+    "search_recent_tweets": (60, 15 * 60),
+    "get_users_mentions": (10, 15 * 60),
+    "get_users_following": (5, 15 * 60),
+    "get_users_tweets": (5, 15 * 60),
+    "get_me": (75, 15 * 60),
+    "get_user": (100, 24 * 60 * 60),
+}
+FALLBACK_LIMIT = (15, 15 * 60)
+
+# Map request routes to endpoint names (IDs in the path are ignored)
+ROUTES = [
+    ("POST", re.compile(r"^/2/tweets$"), "create_tweet"),
+    ("GET", re.compile(r"^/2/tweets/search/recent$"), "search_recent_tweets"),
+    ("GET", re.compile(r"^/2/users/[^/]+/mentions$"), "get_users_mentions"),
+    ("GET", re.compile(r"^/2/users/[^/]+/following$"), "get_users_following"),
+    ("GET", re.compile(r"^/2/users/[^/]+/tweets$"), "get_users_tweets"),
+    ("GET", re.compile(r"^/2/users/me$"), "get_me"),
+    ("GET", re.compile(r"^/2/users/[^/]+$"), "get_user"),
+]
+
+MAX_RETRIES = 3  # Retries after an unexpected 429
+
+def endpoint_for(method, route):
+    """Name the endpoint a request route belongs to"""
+    for route_method, pattern, name in ROUTES:
+        if method == route_method and pattern.match(route):
+            return name
+    return f"{method} {route}"
+
+def seconds_until_reset(headers, default=60):
+    """Seconds until the window in x-rate-limit-reset (an epoch timestamp) resets"""
+    try:
+        return max(1.0, int(headers["x-rate-limit-reset"]) - time.time() + 1)
+    except (KeyError, TypeError, ValueError):
+        return default
+
+class RateLimitExceeded(Exception):
+    """Raised when the next slot for an endpoint is further away than the caller will wait"""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Rate limit for {endpoint} frees up in {retry_after:.0f} seconds")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket for one endpoint, corrected by the headers of each response"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.updated = time.time()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        rate = self.limit / self.window
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def reserve(self, now):
+        """Take a token and return how long to wait before using it.
+
+        The balance may go negative: later callers are scheduled further ahead
+        instead of all firing at once and hitting a 429.
+        """
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens * self.window / self.limit
+        return max(wait, self.blocked_until - now)
+
+    def cancel(self):
+        """Give back a reserved token that won't be used"""
+        self.tokens += 1
+
+    def observe(self, limit, remaining, reset):
+        """Align the bucket with x-rate-limit-* values from a response"""
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset:
+                self.blocked_until = max(self.blocked_until, reset + 1)
+
+class RateLimiter:
+    """Shared per-endpoint rate limiter for X API calls.
+
+    Calls reserve a slot before they are made, so requests are spread over each
+    endpoint's window ahead of time. Every response's x-rate-limit-remaining and
+    x-rate-limit-reset headers keep the buckets in line with the server.
+    """
+
+    def __init__(self, limits=None, max_wait=15 * 60):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def _bucket(self, endpoint):
+        if endpoint not in self.buckets:
+            self.buckets[endpoint] = TokenBucket(*self.limits.get(endpoint, FALLBACK_LIMIT))
+        return self.buckets[endpoint]
+
+    def reserve(self, endpoint):
+        """Reserve the next slot for an endpoint and return the delay until it"""
+        with self.lock:
+            bucket = self._bucket(endpoint)
+            delay = bucket.reserve(time.time())
+            if delay > self.max_wait:
+                bucket.cancel()
+                raise RateLimitExceeded(endpoint, delay)
+        return delay
+
+    def acquire(self, endpoint):
+        """Block until a call to endpoint may be made"""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            logger.info(f"Pacing {endpoint}: waiting {delay:.1f}s for its rate limit window")
+            time.sleep(delay)
+
+    async def acquire_async(self, endpoint):
+        """Async version of acquire"""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            logger.info(f"Pacing {endpoint}: waiting {delay:.1f}s for its rate limit window")
+            await asyncio.sleep(delay)
+
+    def observe(self, endpoint, headers):
+        """Record the rate limit headers of a response"""
+        if not headers or "x-rate-limit-remaining" not in headers:
+            return
+        try:
+            limit = int(headers.get("x-rate-limit-limit", 0)) or None
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = int(headers.get("x-rate-limit-reset", 0)) or None
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            self._bucket(endpoint).observe(limit, remaining, reset)
+
+    def rate_limited(self, endpoint, headers):
+        """Record a 429: block the endpoint until its window resets"""
+        self.observe(endpoint, headers)
+        with self.lock:
+            bucket = self._bucket(endpoint)
+            bucket.blocked_until = max(bucket.blocked_until, time.time() + seconds_until_reset(headers or {}))
+
+    def status(self):
+        """Return {endpoint: (tokens left, seconds until unblocked)} for reporting"""
+        now = time.time()
+        with self.lock:
+            report = {}
+            for endpoint, bucket in self.buckets.items():
+                bucket._refill(now)
+                report[endpoint] = (max(0.0, bucket.tokens), max(0.0, bucket.blocked_until - now))
+            return report
+
+class RateLimitedClient(tweepy.Client):
+    """tweepy.Client whose every request goes through a shared RateLimiter.
+
+    An optional circuit breaker (see transport.CircuitBreaker) makes calls fail
+    fast while X is down; timeouts, connection errors and 5xx count as failures.
+    """
+
+    def __init__(self, rate_limiter, *args, breaker=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        endpoint = endpoint_for(method, route)
+        for attempt in range(MAX_RETRIES + 1):
+            # Wait for a rate limit slot before taking the breaker's trial call, so waiting can't strand it
+            if self.breaker:
+                self.breaker.raise_if_open()
+            self.rate_limiter.acquire(endpoint)
+            if self.breaker:
+                self.breaker.before_call()
+            ok = None  # Neither success nor failure (e.g. a 429) just frees the trial
+            try:
+                response = super().request(method, route, params, json, user_auth)
+                ok = True
+            except tweepy.TooManyRequests as e:
+                self.rate_limiter.rate_limited(endpoint, e.response.headers)
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"Unexpected 429 from {endpoint}; retrying after its window resets")
+                continue
+            except (tweepy.TwitterServerError, requests.RequestException):
+                ok = False
+                raise
+            except tweepy.HTTPException as e:
+                ok = True
+                self.rate_limiter.observe(endpoint, getattr(e.response, "headers", None))
+                raise
+            finally:
+                if self.breaker:
+                    self.breaker.record(ok)
+            self.rate_limiter.observe(endpoint, response.headers)
+            return response
+
+def create_async_client(rate_limiter, breaker=None, **kwargs):
+    """Build a tweepy AsyncClient that goes through the same RateLimiter and circuit breaker (needs aiohttp)"""
+    import aiohttp
+    from tweepy.asynchronous import AsyncClient
+
+    class RateLimitedAsyncClient(AsyncClient):
+        async def request(self, method, route, params=None, json=None, user_auth=False):
+            endpoint = endpoint_for(method, route)
+            for attempt in range(MAX_RETRIES + 1):
+                if breaker:
+                    breaker.raise_if_open()
+                await rate_limiter.acquire_async(endpoint)
+                if breaker:
+                    breaker.before_call()
+                ok = None
+                try:
+                    response = await super().request(method, route, params, json, user_auth)
+                    ok = True
+                except tweepy.TooManyRequests as e:
+                    rate_limiter.rate_limited(endpoint, e.response.headers)
+                    if attempt == MAX_RETRIES:
+                        raise
+                    logger.warning(f"Unexpected 429 from {endpoint}; retrying after its window resets")
+                    continue
+                except (tweepy.TwitterServerError, aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                    raise
+                except tweepy.HTTPException as e:
+                    ok = True
+                    rate_limiter.observe(endpoint, getattr(e.response, "headers", None))
+                    raise
+                finally:
+                    if breaker:
+                        breaker.record(ok)
+                rate_limiter.observe(endpoint, response.headers)
+                return response
+
+    return RateLimitedAsyncClient(**kwargs)
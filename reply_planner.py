@@ -0,0 +1,105 @@
+import calendar
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SPREAD_POISSON = "poisson"  # Exponential gaps: replies arrive like a Poisson process
+SPREAD_EVEN = "even"  # Equal gaps with uniform jitter
+
+def random_replies_on(stats, day):
+    """Random replies sent on a day (YYYY-MM-DD) according to the usage counters"""
+    return stats.get("daily_random_replies", {}).get(day, 0)
+
+class ReplyPlanner:
+    """Spreads random replies over the day within the monthly post budget.
+
+    Each day's quota is the daily target, capped by a fair share of what is
+    left of the monthly limit (after reserving room for daily posts and
+    mention replies on every remaining day). Only random replies (the usage
+    counters' daily_random_replies) count against the quota; posts and
+    mention replies sent today use up today's reservation first. Past
+    backpressure_share of the limit the quota shrinks linearly to zero at
+    the cap. The gap before the next reply is the rest of the day divided by
+    the replies still to send, jittered, and recomputed from the live usage
+    counters before every reply; consecutive failures stretch it so a
+    struggling API isn't hammered.
+    When several nodes share an account's budget, share is this node's part
+    of it (the usage counters then only count this node's posts).
+    """
+
+    def __init__(self, daily_target=50, monthly_limit=1500, reserved_per_day=3, backpressure_share=0.85,
+                 mode=SPREAD_POISSON, jitter=0.3, min_gap_seconds=120, failure_backoff=2.0,
+                 max_gap_seconds=3 * 3600, rng=None):
+        self.daily_target = daily_target
+        self.monthly_limit = monthly_limit
+        self.reserved_per_day = reserved_per_day
+        self.backpressure_share = backpressure_share
+        self.mode = mode
+        self.jitter = jitter
+        self.min_gap_seconds = min_gap_seconds
+        self.failure_backoff = failure_backoff
+        self.max_gap_seconds = max_gap_seconds
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.share = 1.0
+
+    def daily_quota(self, stats, now=None):
+        """Random replies to send today in total, given this month's usage counters"""
+        now = now or datetime.now()
+        days_left = calendar.monthrange(now.year, now.month)[1] - now.day + 1
+        today = now.strftime("%Y-%m-%d")
+        sent_today = random_replies_on(stats, today)
+        others_today = (stats.get("daily_posts", {}).get(today, 0) + stats.get("daily_replies", {}).get(today, 0)
+                        - sent_today)
+
+        monthly_limit = self.monthly_limit * self.share
+        reserved = self.reserved_per_day * self.share
+        # Today's random replies are part of today's share, and today's other posts come out of today's
+        # reservation (up to its size), so add both back to what is left
+        available = (monthly_limit - stats["posts_count"] + sent_today + min(others_today, reserved)
+                     - reserved * days_left)
+        quota = min(self.daily_target * self.share, available / days_left)
+
+        used = stats["posts_count"] / monthly_limit
+        if used > self.backpressure_share:
+            quota *= max(0.0, (1 - used) / (1 - self.backpressure_share))
+        return max(0, int(quota))
+
+    def remaining_today(self, stats, now=None):
+        """Random replies still to send today"""
+        now = now or datetime.now()
+        sent_today = random_replies_on(stats, now.strftime("%Y-%m-%d"))
+        return max(0, self.daily_quota(stats, now) - sent_today)
+
+    def next_delay(self, stats, now=None):
+        """Seconds to wait before the next reply (until tomorrow when today's quota is used up)"""
+        now = now or datetime.now()
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        seconds_left = (tomorrow - now).total_seconds()
+        remaining = self.remaining_today(stats, now)
+        if not remaining:
+            return seconds_left + self.rng.uniform(0, self.min_gap_seconds)
+
+        mean = seconds_left / remaining
+        with self.lock:
+            mean *= self.failure_backoff ** self.failures
+        if self.mode == SPREAD_POISSON:
+            gap = self.rng.expovariate(1 / mean)
+        else:
+            gap = mean * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(self.min_gap_seconds, min(gap, self.max_gap_seconds, seconds_left))
+
+    def record(self, ok):
+        """Record whether a planned reply went out"""
+        with self.lock:
+            self.failures = 0 if ok else min(self.failures + 1, 5)
+
+    def status(self, stats, now=None):
+        """(random replies sent today, today's quota, consecutive failures) for reporting"""
+        now = now or datetime.now()
+        sent_today = random_replies_on(stats, now.strftime("%Y-%m-%d"))
+        return sent_today, self.daily_quota(stats, now), self.failures
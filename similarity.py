@@ -0,0 +1,187 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DIMS = 1024
+
+URL_PATTERN = re.compile(r"https?://\S+")
+MENTION_PATTERN = re.compile(r"@\w+")
+NON_WORD_PATTERN = re.compile(r"[^\w$#\s]")
+
+def normalize_text(text):
+    """Lowercase, drop URLs, @handles and punctuation, collapse whitespace"""
+    text = URL_PATTERN.sub(" ", text.lower())
+    text = MENTION_PATTERN.sub(" ", text)
+    text = NON_WORD_PATTERN.sub(" ", text)
+    return " ".join(text.split())
+
+def text_vector(text, dims=VECTOR_DIMS):
+    """Unit-length vector of hashed character trigrams and words of the normalized text"""
+    normalized = normalize_text(text)
+    vector = np.zeros(dims, dtype=np.float32)
+    padded = f" {normalized} "
+    features = [padded[i:i + 3] for i in range(len(padded) - 2)] + normalized.split()
+    for feature in features:
+        # crc32 is stable across processes, unlike hash()
+        vector[zlib.crc32(feature.encode("utf-8")) % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class ResponseCache:
+    """Bounded LRU/TTL cache of KOIYU replies keyed by what the seeker said.
+
+    Lookups match the normalized text exactly first, then fall back to cosine
+    similarity against every cached vector in one NumPy matrix product. Each
+    cached reply is only handed out max_uses times so answers don't repeat.
+    """
+
+    def __init__(self, max_size=500, ttl_seconds=24 * 3600, threshold=0.85, max_uses=3, dims=VECTOR_DIMS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.max_uses = max_uses
+        self.dims = dims
+        self.lock = threading.Lock()
+        self.vectors = np.zeros((max_size, dims), dtype=np.float32)
+        self.entries = [None] * max_size  # {"key", "response", "created_at", "last_used", "uses"} per row
+        self.rows = {}  # Normalized text -> row
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _evict(self, row):
+        entry = self.entries[row]
+        if entry:
+            self.rows.pop(entry["key"], None)
+        self.entries[row] = None
+        self.vectors[row] = 0.0
+
+    def _free_row(self, now):
+        """Pick a row for a new entry: an empty or expired one, else the least recently used"""
+        oldest = None
+        for row, entry in enumerate(self.entries):
+            if entry is None or now - entry["created_at"] > self.ttl_seconds:
+                return row
+            if oldest is None or entry["last_used"] < self.entries[oldest]["last_used"]:
+                oldest = row
+        return oldest
+
+    def lookup(self, text):
+        """Return (cached reply, similarity) for text or a near-duplicate of it, or None"""
+        key = normalize_text(text)
+        if not key:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.rows.get(key)
+            similarity = 1.0
+            if row is None:
+                scores = self.vectors @ text_vector(text, self.dims)
+                row = int(np.argmax(scores))
+                similarity = float(scores[row])
+                if similarity < self.threshold:
+                    return None
+
+            entry = self.entries[row]
+            if entry is None or now - entry["created_at"] > self.ttl_seconds:
+                self._evict(row)
+                return None
+            entry["uses"] += 1
+            entry["last_used"] = now
+            response = entry["response"]
+            if entry["uses"] >= self.max_uses:
+                self._evict(row)
+            return response, similarity
+
+    def store(self, text, response):
+        """Cache a reply for text, evicting the least recently used entry when full"""
+        key = normalize_text(text)
+        if not key or not response:
+            return
+        now = time.time()
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                row = self._free_row(now)
+                self._evict(row)
+            self.vectors[row] = text_vector(text, self.dims)
+            self.entries[row] = {"key": key, "response": response, "created_at": now, "last_used": now, "uses": 0}
+            self.rows[key] = row
+
+SIMHASH_BITS = np.arange(64, dtype=np.uint64)
+
+def simhash(text):
+    """64-bit SimHash of the normalized text's words; near-duplicates differ in few bits.
+    
+    Words separate rewordings from genuinely new posts better than character
+    trigrams: a one-word change moves a post a few bits, unrelated posts ~20.
+    """
+    features = normalize_text(text).split()
+    if not features:
+        return 0
+    hashes = np.array(
+        [(zlib.crc32(f.encode("utf-8")) << 32) | zlib.crc32(f.encode("utf-8"), 0x9E3779B9) for f in features],
+        dtype=np.uint64
+    )
+    bits = (hashes[:, None] >> SIMHASH_BITS) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return int(np.sum(votes.astype(np.uint64) << SIMHASH_BITS))
+
+class PostHistory:
+    """Signatures of everything KOIYU has posted, in a memory-mapped NumPy array.
+
+    Each post is stored as a 64-bit SimHash (8 bytes, so 100k posts is under
+    1 MB). A duplicate check XORs the candidate against every signature and
+    counts differing bits in one vectorized pass. Slot 0 of the file holds the
+    number of stored signatures; the file doubles in size when full.
+    """
+
+    def __init__(self, path, max_distance=6, initial_capacity=4096):
+        self.path = path
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        if not os.path.exists(path):
+            np.zeros(initial_capacity + 1, dtype=np.uint64).tofile(path)
+        self.array = np.memmap(path, dtype=np.uint64, mode="r+")
+
+    def __len__(self):
+        return int(self.array[0])
+
+    def _grow(self):
+        size = len(self.array)
+        self.array.flush()
+        del self.array
+        with open(self.path, "r+b") as f:
+            f.truncate((2 * size - 1) * 8)
+        self.array = np.memmap(self.path, dtype=np.uint64, mode="r+")
+
+    def closest(self, text):
+        """Return the smallest bit distance between text and any stored post (64 if none)"""
+        signature = np.uint64(simhash(text))
+        with self.lock:
+            count = int(self.array[0])
+            if not count:
+                return 64
+            return int(np.bitwise_count(self.array[1:count + 1] ^ signature).min())
+
+    def is_duplicate(self, text):
+        """Return True if text is a near-duplicate of a stored post"""
+        return self.closest(text) <= self.max_distance
+
+    def add(self, text):
+        """Store the signature of a posted text"""
+        signature = np.uint64(simhash(text))
+        with self.lock:
+            count = int(self.array[0])
+            if count + 1 >= len(self.array):
+                self._grow()
+            self.array[count + 1] = signature
+            self.array[0] = count + 1
+            self.array.flush()
@@ -0,0 +1,15 @@
+import json
+
+from accounts import load_accounts
+
+def test_missing_credentials_use_each_accounts_prefix(tmp_path):
+    path = tmp_path / "accounts.json"
+    path.write_text(json.dumps([{"name": "koiyu", "env_prefix": "KOIYU_"}, {"name": "sage", "env_prefix": "SAGE_"}]))
+    environ = {f"KOIYU_{var}": "x" for var in ("TWITTER_API_KEY", "TWITTER_API_SECRET", "TWITTER_ACCESS_TOKEN",
+                                                "TWITTER_ACCESS_SECRET", "TWITTER_BEARER_TOKEN")}
+    environ["SAGE_TWITTER_API_KEY"] = "x"
+
+    koiyu, sage = load_accounts(str(path), str(tmp_path), environ)
+    assert koiyu.missing_credentials() == []
+    assert sage.missing_credentials() == ["SAGE_TWITTER_API_SECRET", "SAGE_TWITTER_ACCESS_TOKEN",
+                                          "SAGE_TWITTER_ACCESS_SECRET", "SAGE_TWITTER_BEARER_TOKEN"]
@@ -0,0 +1,23 @@
+from batch_jobs import BatchRunner, FileBatchBackend
+from ledger import Ledger
+
+def test_file_batches_with_a_responder_complete_on_submit(tmp_path):
+    backend = FileBatchBackend(str(tmp_path / "batches"), responder=lambda body: "reply to " + body["messages"][0]["content"])
+    runner = BatchRunner(backend, Ledger(str(tmp_path / "ledger.db")), str(tmp_path / "requests"))
+    items = [("story", {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "a parable"}]}),
+             ("wisdom:patience", {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "patience"}]})]
+    assert runner.submit(items)
+
+    results = runner.poll()
+    assert sorted((key, body["choices"][0]["message"]["content"]) for key, body in results) == [
+        ("story", "reply to a parable"), ("wisdom:patience", "reply to patience")]
+    assert runner.pending_counts() == {}
+
+def test_batches_submitted_at_once_get_distinct_ids(tmp_path):
+    request_file = tmp_path / "requests.jsonl"
+    request_file.write_text("")
+    # Two accounts sharing one batch directory
+    first, second = FileBatchBackend(str(tmp_path / "batches")), FileBatchBackend(str(tmp_path / "batches"))
+    ids = {first.submit(str(request_file)), second.submit(str(request_file)), first.submit(str(request_file))}
+    assert len(ids) == 3
+    assert len(list((tmp_path / "batches").iterdir())) == 3
@@ -0,0 +1,33 @@
+import json
+from datetime import datetime, timedelta
+
+from candidate_pool import Candidate, CandidatePool, ReplyIndex
+
+def test_author_cooldown_expires_without_a_restart(tmp_path):
+    index = ReplyIndex(str(tmp_path / "reply_index.json"))
+    index.record("1", "alice")
+    assert index.has_replied("1") and index.author_on_cooldown("alice")
+
+    # The process keeps running into the next day
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    index.authors["alice"] = index.tweets["1"] = yesterday
+    index.pruned_on = yesterday
+    assert not index.author_on_cooldown("alice")
+    assert index.has_replied("1")
+
+def test_saves_are_whole_files(tmp_path):
+    index = ReplyIndex(str(tmp_path / "reply_index.json"))
+    for i in range(20):
+        index.record(str(i), f"author{i}")
+    saved = json.loads((tmp_path / "reply_index.json").read_text())
+    assert len(saved["tweets"]) == 20
+    assert list(tmp_path.iterdir()) == [tmp_path / "reply_index.json"]  # No temp files left behind
+
+def test_pop_leaves_the_file_alone(tmp_path):
+    index = ReplyIndex(str(tmp_path / "reply_index.json"))
+    pool = CandidatePool(str(tmp_path / "candidate_pool.json"), index)
+    pool.add([Candidate("1", "a", "alice", "keyword", 0, 0), Candidate("2", "b", "bob", "keyword", 0, 0)], "keyword")
+    saved = (tmp_path / "candidate_pool.json").read_text()
+
+    assert sorted(candidate.id for candidate in pool.pop(2)) == ["1", "2"]
+    assert (tmp_path / "candidate_pool.json").read_text() == saved
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+tweepy = pytest.importorskip("tweepy")
+
+import rate_limiter
+from rate_limiter import RateLimitedClient, RateLimiter, RateLimitExceeded
+from transport import CircuitBreaker, CircuitOpenError
+
+def make_response(status_code, headers=None):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response.reason = "test"
+    response._content = b"{}"
+    response.headers.update(headers or {})
+    return response
+
+def half_open(breaker):
+    """Open the breaker and let its reset timeout pass"""
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.time() - breaker.reset_timeout - 1
+    return breaker
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.raise_if_open()
+
+def test_half_open_allows_a_single_trial():
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    assert breaker.state == "half-open"
+    breaker.raise_if_open()  # Doesn't take the trial
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+def test_failed_trial_reopens():
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+def test_trial_without_outcome_is_released():
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    breaker.before_call()
+    breaker.record(None)
+    assert breaker.state == "half-open"
+    breaker.before_call()
+
+@pytest.fixture
+def fake_x(monkeypatch):
+    """Replace tweepy.Client.request with queued outcomes: responses or exceptions"""
+    outcomes = []
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(tweepy.Client, "request", request)
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    return outcomes
+
+def make_client(breaker, limiter=None):
+    return RateLimitedClient(limiter or RateLimiter(), bearer_token="test", breaker=breaker)
+
+def test_rate_limit_wait_does_not_strand_the_trial(fake_x):
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    limiter = RateLimiter(limits={"get_me": (1, 900)}, max_wait=0)
+    client = make_client(breaker, limiter)
+    fake_x.append(make_response(200))
+    client.request("GET", "/2/users/me")
+    assert breaker.state == "closed"
+
+    half_open(breaker)
+    with pytest.raises(RateLimitExceeded):
+        client.request("GET", "/2/users/me")
+    assert not breaker.trial_running
+    breaker.before_call()  # The trial is still available
+
+def test_429_during_trial_releases_it_before_retrying(fake_x):
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    client = make_client(breaker)
+    fake_x.extend([tweepy.TooManyRequests(make_response(429, {"x-rate-limit-reset": str(int(time.time()))})),
+                   make_response(200)])
+    client.request("GET", "/2/users/me")
+    assert breaker.state == "closed"
+
+def test_unexpected_error_during_trial_releases_it(fake_x):
+    breaker = half_open(CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+    client = make_client(breaker)
+    fake_x.append(ValueError("boom"))
+    with pytest.raises(ValueError):
+        client.request("GET", "/2/users/me")
+    assert not breaker.trial_running
+    assert breaker.state == "half-open"
+
+def test_server_errors_open_the_circuit(fake_x):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    client = make_client(breaker)
+    fake_x.extend([requests.ConnectionError("down"), tweepy.TwitterServerError(make_response(503))])
+    for _ in range(2):
+        with pytest.raises((requests.ConnectionError, tweepy.TwitterServerError)):
+            client.request("GET", "/2/users/me")
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", "/2/users/me")
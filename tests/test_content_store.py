@@ -0,0 +1,45 @@
+import time
+
+from content_store import ContentStore
+from ledger import Ledger
+
+def make_store(tmp_path):
+    return ContentStore(Ledger(str(tmp_path / "ledger.db")))
+
+def test_claims_oldest_entry_once(tmp_path):
+    store = make_store(tmp_path)
+    store.put("wisdom:patience", "first")
+    store.put("wisdom:patience", "second")
+    store.put("story", "a story")
+    assert store.counts("wisdom:") == {"wisdom:patience": 2}
+
+    content_id, text = store.claim("wisdom:patience")
+    assert text == "first"
+    assert store.claim("wisdom:patience")[1] == "second"
+    assert store.claim("wisdom:patience") is None
+    assert store.count("wisdom:patience") == 0 and store.count("story") == 1
+
+def test_released_entry_can_be_claimed_again(tmp_path):
+    store = make_store(tmp_path)
+    store.put("story", "a story")
+    content_id, _ = store.claim("story")
+    store.release(content_id)  # The post failed
+    assert store.count("story") == 1
+    assert store.claim("story") == (content_id, "a story")
+
+def test_prune_drops_only_old_unclaimed_entries(tmp_path):
+    store = make_store(tmp_path)
+    store.put("wisdom:courage", "old and claimed")
+    store.put("wisdom:courage", "old")
+    store.put("story", "old story")
+    store.ledger.connect().execute("UPDATE content SET created_at = ?", (time.time() - 7200,))
+    store.put("wisdom:courage", "fresh")
+    assert store.claim("wisdom:courage")[1] == "old and claimed"
+
+    assert store.prune("wisdom:", 3600) == 1
+    assert store.claim("wisdom:courage")[1] == "fresh"
+    assert store.count("story") == 1
+
+def test_entries_survive_a_reopen(tmp_path):
+    make_store(tmp_path).put("story", "a story")
+    assert make_store(tmp_path).claim("story")[1] == "a story"
@@ -0,0 +1,121 @@
+import pytest
+
+from coordination import Coordinator, MemoryLeaseBackend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def backend(clock):
+    return MemoryLeaseBackend(clock=clock)
+
+def node(backend, node_id, instance=None, ttl=30, shard_by="account"):
+    coordinator = Coordinator(backend, node_id, ttl=ttl, shard_by=shard_by)
+    if instance:
+        coordinator.instance = instance
+    return coordinator
+
+def test_leases_expire_after_their_ttl(backend, clock):
+    assert backend.acquire("claim:x", "A", 10)
+    assert not backend.acquire("claim:x", "B", 10)
+    clock.advance(9)
+    assert backend.acquire("claim:x", "A", 10)  # Extended from now
+    clock.advance(9)
+    assert not backend.acquire("claim:x", "B", 10)
+    clock.advance(2)
+    assert backend.get("claim:x") is None
+    assert backend.acquire("claim:x", "B", 10)
+
+def test_duplicate_node_id_fails_fast(backend):
+    first = node(backend, "A", "A#1")
+    assert first.join(wait=False)
+    duplicate = node(backend, "A", "A#2")
+    assert not duplicate.join(timeout=0)
+    assert not duplicate.member and not duplicate.owns_account("koiyu")
+
+def test_restart_takes_over_once_the_old_lease_expires(backend, clock):
+    old = node(backend, "A", "A#1")
+    assert old.join(wait=False)
+    restarted = node(backend, "A", "A#2")
+    assert not restarted.join(wait=False)
+    clock.advance(31)
+    assert restarted.join(wait=False)
+
+def test_leadership_fails_over_when_the_leader_stops_heartbeating(backend, clock):
+    a, b = node(backend, "A"), node(backend, "B")
+    for coordinator in (a, b):
+        coordinator.join(wait=False)
+        coordinator.heartbeat()
+    assert a.leader and not b.leader
+    assert b.nodes() == ["A", "B"]
+
+    clock.advance(20)
+    b.heartbeat()
+    assert not b.leader  # A's lease is still live
+    clock.advance(11)
+    b.heartbeat()
+    assert b.leader and b.leader_id() == "B" and b.nodes() == ["B"]
+
+def test_node_that_loses_its_lease_steps_down(backend, clock):
+    a = node(backend, "A", "A#1")
+    a.join(wait=False)
+    a.heartbeat()
+    assert a.leader and a.owns_account("koiyu") and a.owns_tweet("1")
+
+    # A stalls past its TTL and another instance with the same node ID takes the lease
+    clock.advance(31)
+    duplicate = node(backend, "A", "A#2")
+    assert duplicate.join(wait=False)
+    a.heartbeat()
+    assert not a.member and not a.leader
+    assert not a.is_leader() and not a.owns_account("koiyu") and not a.owns_tweet("1")
+
+    duplicate.stop()
+    a.heartbeat()
+    assert a.member and a.leader
+
+def test_tweet_sharding_splits_work_between_live_nodes(backend):
+    a, b = node(backend, "A", shard_by="tweet"), node(backend, "B", shard_by="tweet")
+    for coordinator in (a, b):
+        coordinator.join(wait=False)
+    for coordinator in (a, b):
+        coordinator.heartbeat()
+    ids = range(200)
+    mine, theirs = {i for i in ids if a.owns_tweet(i)}, {i for i in ids if b.owns_tweet(i)}
+    assert mine and theirs and not mine & theirs and len(mine | theirs) == 200
+    assert a.budget_share() == b.budget_share() == 0.5
+
+def test_redis_backend_without_the_package_fails_clearly(monkeypatch):
+    import builtins
+
+    from coordination import create_backend
+
+    real_import = builtins.__import__
+
+    def no_redis(name, *args, **kwargs):
+        if name == "redis":
+            raise ImportError("No module named 'redis'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_redis)
+    with pytest.raises(RuntimeError, match="pip install redis"):
+        create_backend("redis")
+
+def test_purge_counts_the_expired_leases_it_drops(backend, clock):
+    backend.acquire("claim:old", "A", 10)
+    backend.acquire("claim:new", "A", 60)
+    clock.advance(30)
+    assert backend.purge() == 1
+    assert backend.purge() == 0
+    assert list(backend.leases) == ["claim:new"]
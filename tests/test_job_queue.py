@@ -0,0 +1,49 @@
+from job_queue import DONE, FAILED, INTERRUPTED, PENDING, RUNNING, JobQueue, was_interrupted
+from ledger import Ledger
+
+def make_queue(tmp_path, max_attempts=3):
+    return JobQueue(Ledger(str(tmp_path / "ledger.db")), max_attempts=max_attempts)
+
+def test_enqueue_is_deduplicated(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.enqueue("reply:1", "reply", {"tweet_id": "1", "text": "hello"})
+    again = queue.enqueue("reply:1", "reply", {"tweet_id": "1", "text": "something else"})
+    assert again["id"] == first["id"] and again["payload"]["text"] == "hello"
+
+def test_job_left_running_is_resumed_as_interrupted(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue("wisdom:2026-10-16", "wisdom", {"text": "patience"})
+    job = queue.claim("wisdom")
+    assert job["state"] == RUNNING and not was_interrupted(job)
+
+    # A new process finds the job still running and hands it out again
+    restarted = JobQueue(Ledger(queue.ledger.path))
+    assert restarted.recover() == 1
+    assert restarted.get("wisdom:2026-10-16")["state"] == PENDING
+    job = restarted.claim("wisdom")
+    assert job["attempts"] == 2 and job["error"] == INTERRUPTED and was_interrupted(job)
+
+    restarted.complete(job["id"], "123")
+    done = restarted.get("wisdom:2026-10-16")
+    assert done["state"] == DONE and done["result"] == "123" and done["error"] is None
+    assert restarted.recover() == 0
+
+def test_plain_retry_is_not_a_resume(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue("reply:7", "reply", {"tweet_id": "7", "text": "hi"})
+    queue.fail(queue.claim()["id"], "post failed")
+    job = queue.claim()
+    assert job["attempts"] == 2 and not was_interrupted(job)
+
+    queue.fail(job["id"], "post failed")
+    assert queue.get("reply:7")["state"] == FAILED
+    queue.retry(job["id"])
+    job = queue.claim()
+    assert job["attempts"] == 1 and not was_interrupted(job)
+
+def test_released_job_keeps_its_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    queue.enqueue("reply:9", "reply", {"tweet_id": "9", "text": "hi"})
+    queue.release(queue.claim()["id"])
+    job = queue.claim()
+    assert job["attempts"] == 1 and not was_interrupted(job)
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from job_scheduler import CATCH_UP_ONCE, CATCH_UP_SKIP, Scheduler
+from ledger import Ledger
+
+def make_scheduler(tmp_path):
+    return Scheduler(workers=1, store=Ledger(str(tmp_path / "ledger.db")))
+
+def noop():
+    pass
+
+def test_runs_missed_while_down_are_caught_up_once(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    now = datetime.now()
+    scheduler.record_run("wisdom", now - timedelta(days=2))
+
+    # After a restart the job starts from its saved last run, not from now
+    scheduler.add("wisdom", now.strftime("%H:%M"), noop, catch_up=CATCH_UP_ONCE)
+    job = scheduler.jobs["wisdom"]
+    assert job.next_run < now
+
+    assert scheduler._missed_runs(job, now) == 1
+    assert job.next_run > now
+    assert scheduler.last_run("wisdom") <= now and now - scheduler.last_run("wisdom") < timedelta(days=1)
+
+def test_skip_policy_drops_runs_missed_while_down(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    now = datetime.now()
+    scheduler.record_run("report", now - timedelta(days=3))
+    scheduler.add("report", now.strftime("%H:%M"), noop, catch_up=CATCH_UP_SKIP)
+    job = scheduler.jobs["report"]
+    assert scheduler._missed_runs(job, now + timedelta(hours=2)) == 0
+
+def test_new_job_starts_from_now(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    assert scheduler.last_run("wisdom") is None
+    scheduler.add("wisdom", "12:00", noop)
+    assert scheduler.jobs["wisdom"].next_run > datetime.now()
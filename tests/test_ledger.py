@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ledger import RANDOM_REPLY, Ledger
+
+def make_ledger(tmp_path):
+    return Ledger(str(tmp_path / "ledger.db"))
+
+def test_usage_summary_counts_from_the_latest_reset(tmp_path):
+    ledger = make_ledger(tmp_path)
+    ledger.record("post", ts=time.time() - 10)
+    ledger.record("reset", ts=time.time() - 1)
+    ledger.record_many([ledger.make_event("post"), ledger.make_event("reply", tweet_id="1"),
+                        ledger.make_event("reply", tweet_id="2", detail=RANDOM_REPLY),
+                        ledger.make_event("read"), ledger.make_event("openai", prompt_tokens=10)])
+    summary = ledger.usage_summary()
+    # Replies are posts too as far as the monthly cap is concerned
+    assert (summary["posts_count"], summary["replies_count"], summary["reads_count"], summary["openai_calls"]) == (3, 2, 1, 1)
+    assert list(summary["daily_random_replies"].values()) == [1]
+
+def test_unknown_event_fields_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_ledger(tmp_path).record("post", tweet="1")
+
+def test_openai_summaries(tmp_path):
+    ledger = make_ledger(tmp_path)
+    ledger.record("openai", latency_ms=100, prompt_tokens=1000, completion_tokens=50, cached_tokens=800, model="m", detail="wisdom")
+    ledger.record("openai", latency_ms=300, prompt_tokens=1000, completion_tokens=70, cached_tokens=0, model="m", detail="reply")
+    assert ledger.openai_summary() == {"calls": 2, "prompt_tokens": 2000, "completion_tokens": 120, "avg_latency_ms": 200}
+    cache = ledger.prompt_cache_summary()
+    assert (cache["cached_calls"], cache["cached_tokens"], cache["latency_cached_ms"], cache["latency_uncached_ms"]) == (1, 800, 100, 300)
+    assert [row[0] for row in ledger.openai_by_type()] == ["reply", "wisdom"]
+
+def test_old_databases_gain_the_added_columns(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, month TEXT NOT NULL, "
+                 "day TEXT NOT NULL, kind TEXT NOT NULL, tweet_id TEXT, target_id TEXT, latency_ms REAL, "
+                 "prompt_tokens INTEGER, completion_tokens INTEGER, model TEXT, detail TEXT)")
+    conn.close()
+    ledger = Ledger(path)
+    ledger.record("openai", cached_tokens=5)
+    assert ledger.prompt_cache_summary()["calls"] == 0  # No prompt tokens recorded
+    assert ledger.connect().execute("SELECT cached_tokens FROM events").fetchone() == (5,)
+
+def test_cursors_round_trip_as_text(tmp_path):
+    ledger = make_ledger(tmp_path)
+    assert ledger.get_cursor("mentions", "none") == "none"
+    ledger.set_cursor("mentions", 42)
+    ledger.set_cursor("mentions", 43)
+    assert ledger.get_cursor("mentions") == "43"
+    ledger.set_cursor("mentions", None)
+    assert ledger.get_cursor("mentions", "none") is None
+
+def test_locks_are_exclusive_until_they_expire(tmp_path):
+    ledger = make_ledger(tmp_path)
+    assert ledger.acquire_lock("leader", "a", ttl=60)
+    assert not ledger.acquire_lock("leader", "b", ttl=60)
+    assert ledger.refresh_lock("leader", "a", ttl=60) and not ledger.refresh_lock("leader", "b", ttl=60)
+    assert list(ledger.list_locks("lead")) == ["leader"]
+
+    ledger.release_lock("leader", "a")
+    assert ledger.acquire_lock("leader", "b", ttl=-1)  # Already expired
+    assert ledger.acquire_lock("leader", "c", ttl=60)
+    assert ledger.get_lock("leader")["owner"] == "c"
+    assert ledger.acquire_lock("stale", "c", ttl=-1) and ledger.purge_locks() == 1
+
+def test_close_shuts_every_thread_connection(tmp_path):
+    ledger = make_ledger(tmp_path)
+    worker = threading.Thread(target=ledger.record, args=("read",))
+    worker.start()
+    worker.join()
+    assert len(ledger._conns) == 2
+
+    ledger.close()
+    assert ledger._conns == []
+    # The ledger reopens on next use
+    assert ledger.usage_summary()["reads_count"] == 1
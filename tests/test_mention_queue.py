@@ -0,0 +1,33 @@
+import json
+
+from ledger import Ledger
+from mention_queue import MentionQueue
+
+def make_queue(tmp_path):
+    return MentionQueue(Ledger(str(tmp_path / "ledger.db")))
+
+def test_ingest_deduplicates_and_replaces_gaps(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.ingest([{"id": "20", "text": "b"}, {"id": "3", "text": "a"}], [{"since_id": "1", "until_id": "3"}]) == 2
+    assert queue.ingest([{"id": "20", "text": "b"}], []) == 0
+    assert [m["id"] for m in queue.pending()] == ["3", "20"]  # Numeric order, not string order
+    assert queue.newest_id() == 20
+    assert queue.gaps() == []
+
+def test_failed_attempts_are_counted_until_removed(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.ingest([{"id": "5", "text": "hi"}], [])
+    assert queue.record_attempt("5") == 1
+    assert queue.record_attempt("5") == 2
+    queue.remove("5")
+    assert queue.pending() == [] and queue.record_attempt("5") == 0
+
+def test_legacy_file_is_imported_once(tmp_path):
+    path = tmp_path / "mention_queue.json"
+    path.write_text(json.dumps({"pending": [{"id": "7", "text": "hi", "author_id": "1", "attempts": 2}],
+                                "gaps": [{"since_id": "1", "until_id": "6"}]}))
+    queue = make_queue(tmp_path)
+    assert queue.migrate_file(str(path))
+    assert not queue.migrate_file(str(path))
+    assert queue.pending() == [{"id": "7", "text": "hi", "author_id": "1", "attempts": 2}]
+    assert queue.gaps() == [{"since_id": "1", "until_id": "6"}]
@@ -0,0 +1,35 @@
+import pytest
+
+from model_router import ModelRouter
+
+TIERS = {
+    "wisdom": {"models": ["gpt-4o", "gpt-4o-mini"], "temperature": 0.7, "latency_budget_ms": 8000},
+    "mention_reply": {"models": ["gpt-4o", "gpt-4o-mini"], "temperature": 0.7, "latency_budget_ms": 4000},
+}
+
+def test_tiers_must_fall_back_to_lighter_models():
+    with pytest.raises(ValueError):
+        ModelRouter({"wisdom": dict(TIERS["wisdom"], models=["gpt-4o-mini", "gpt-4o"])})
+
+def test_one_slow_first_call_does_not_demote():
+    router = ModelRouter(dict(TIERS))
+    router.record("mention_reply", "gpt-4o", 9000)
+    assert router.candidates("mention_reply")[0] == "gpt-4o"
+
+def test_consistently_slow_model_is_demoted():
+    router = ModelRouter(dict(TIERS))
+    for _ in range(3):
+        router.record("mention_reply", "gpt-4o", 9000)
+    assert router.candidates("mention_reply") == ["gpt-4o-mini", "gpt-4o"]
+
+def test_batched_calls_are_measured_per_item():
+    router = ModelRouter(dict(TIERS))
+    for _ in range(5):
+        router.record("mention_reply", "gpt-4o", 10000, items=5)
+    assert router.candidates("mention_reply")[0] == "gpt-4o"
+
+def test_failing_model_is_demoted():
+    router = ModelRouter(dict(TIERS))
+    for _ in range(3):
+        router.record("wisdom", "gpt-4o", 100, ok=False)
+    assert router.candidates("wisdom")[0] == "gpt-4o-mini"
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from ledger import RANDOM_REPLY, Ledger
+from reply_planner import ReplyPlanner
+from usage_store import UsageStore
+
+NOW = datetime(2026, 10, 16, 12, 0)  # 16 days left in the month, counting today
+TODAY = NOW.strftime("%Y-%m-%d")
+
+def usage(posts_count=0, daily_posts=0, mention_replies=0, random_replies=0):
+    replies = mention_replies + random_replies
+    return {"posts_count": posts_count + daily_posts + replies, "replies_count": replies,
+            "daily_posts": {TODAY: daily_posts}, "daily_replies": {TODAY: replies},
+            "daily_random_replies": {TODAY: random_replies}}
+
+def test_mention_replies_do_not_use_up_random_quota():
+    planner = ReplyPlanner(daily_target=20, monthly_limit=1500, reserved_per_day=3)
+    quiet = planner.remaining_today(usage(), NOW)
+    assert quiet == 20
+    assert planner.remaining_today(usage(mention_replies=3), NOW) == quiet
+    assert planner.remaining_today(usage(random_replies=5), NOW) == quiet - 5
+
+def test_todays_posts_come_out_of_todays_reservation():
+    planner = ReplyPlanner(daily_target=100, monthly_limit=500, reserved_per_day=3)
+    # (500 - 3 * 16) / 16 = 28 whether or not today's reserved posts have gone out yet
+    assert planner.daily_quota(usage(), NOW) == 28
+    assert planner.daily_quota(usage(daily_posts=1, mention_replies=2), NOW) == 28
+    # Mentions past the reservation do cut into the budget
+    assert planner.daily_quota(usage(daily_posts=1, mention_replies=34), NOW) < 28
+
+def test_status_reports_random_replies_only():
+    planner = ReplyPlanner(daily_target=20)
+    sent, quota, failures = planner.status(usage(mention_replies=4, random_replies=2), NOW)
+    assert (sent, quota, failures) == (2, 20, 0)
+
+def test_usage_store_counts_random_replies_separately(tmp_path):
+    store = UsageStore(Ledger(str(tmp_path / "ledger.db")))
+    store.record("reply", target_id="1")
+    store.record("reply", target_id="2", detail=RANDOM_REPLY)
+    store.flush()
+    day = datetime.now().strftime("%Y-%m-%d")
+    for stats in (store.snapshot(), store.ledger.usage_summary()):
+        assert stats["daily_replies"][day] == 2
+        assert stats["daily_random_replies"][day] == 1
@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+
+from similarity import PostHistory, ResponseCache, normalize_text
+
+POST = "The river does not hurry, yet it reaches the sea. Stillness is the oldest form of power."
+
+QUESTION = "KOIYU, how do I find peace when the market keeps falling?"
+ANSWER = "Peace is not found in the chart, seeker. It waits where you stop watching it."
+
+def test_cache_hits_on_the_same_or_a_similar_question():
+    cache = ResponseCache()
+    cache.store(QUESTION, ANSWER)
+    assert cache.lookup("koiyu how do I find peace when the market keeps falling") == (ANSWER, 1.0)
+    response, similarity = cache.lookup("@koiyu How do I find peace when the markets keep falling??")
+    assert response == ANSWER and cache.threshold <= similarity < 1.0
+
+def test_cache_misses_below_the_threshold():
+    cache = ResponseCache()
+    cache.store(QUESTION, ANSWER)
+    assert cache.lookup("What is the best pizza topping in Naples?") is None
+
+def test_cache_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl_seconds=60)
+    cache.store(QUESTION, ANSWER)
+    cache.entries[cache.rows[normalize_text(QUESTION)]]["created_at"] -= 61
+    assert cache.lookup(QUESTION) is None
+    assert len(cache) == 0
+
+def test_cached_reply_is_handed_out_at_most_max_uses_times():
+    cache = ResponseCache(max_uses=2)
+    cache.store(QUESTION, ANSWER)
+    assert cache.lookup(QUESTION)[0] == ANSWER
+    assert cache.lookup(QUESTION)[0] == ANSWER
+    assert cache.lookup(QUESTION) is None
+    assert len(cache) == 0
+
+def test_full_cache_evicts_the_least_recently_used_entry():
+    cache = ResponseCache()
+    for i in range(cache.max_size):
+        cache.store(f"question number {i} about the path", f"answer {i}")
+    assert len(cache) == cache.max_size
+    cache.lookup("question number 0 about the path")  # Keep the oldest entry in use
+
+    cache.store(QUESTION, ANSWER)
+    assert len(cache) == cache.max_size
+    assert cache.lookup(QUESTION)[0] == ANSWER
+    assert normalize_text("question number 1 about the path") not in cache.rows
+    assert cache.lookup("question number 0 about the path")[0] == "answer 0"
+
+def make_history(tmp_path, **kwargs):
+    return PostHistory(str(tmp_path / "post_history.npy"), **kwargs)
+
+def test_exact_repost_is_a_duplicate(tmp_path):
+    history = make_history(tmp_path)
+    history.add(POST)
+    assert history.closest(POST) == 0
+    assert history.is_duplicate(POST)
+
+def test_reworded_post_is_a_near_duplicate(tmp_path):
+    history = make_history(tmp_path)
+    history.add(POST)
+    # Case, punctuation, @handles and links don't count; one changed word moves it a few bits
+    assert history.closest("the river does not hurry yet it reaches the sea!! Stillness is the oldest form of power https://t.co/x") == 0
+    assert history.is_duplicate("The river does not hurry, yet it reaches the ocean. Stillness is the oldest form of power.")
+
+def test_distinct_post_is_not_a_duplicate(tmp_path):
+    history = make_history(tmp_path)
+    history.add(POST)
+    assert not history.is_duplicate("Seekers who chase every signal hear nothing; those who listen to silence hear all.")
+
+def test_empty_history_has_no_duplicates(tmp_path):
+    history = make_history(tmp_path)
+    assert len(history) == 0
+    assert history.closest(POST) == 64
+
+def test_history_grows_and_survives_a_reopen(tmp_path):
+    history = make_history(tmp_path, initial_capacity=2)
+    posts = [f"{POST} Lesson {word}." for word in ("one", "two", "three", "four", "five")]
+    for post in posts:
+        history.add(post)
+    assert len(history) == 5
+    assert len(history.array) > 3  # The memmap was resized past its initial capacity
+
+    reopened = make_history(tmp_path)
+    assert len(reopened) == 5
+    assert all(reopened.closest(post) == 0 for post in posts)
+
+def test_check_against_100k_posts_is_under_a_millisecond(tmp_path):
+    history = make_history(tmp_path, initial_capacity=100_000)
+    rng = np.random.default_rng(0)
+    history.array[1:] = rng.integers(0, 2**63, size=100_000, dtype=np.uint64)
+    history.array[0] = 100_000
+
+    history.closest(POST)  # Warm up
+    best = min(timed(lambda: history.closest(POST)) for _ in range(20))
+    assert best < 0.001
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
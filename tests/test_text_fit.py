@@ -0,0 +1,60 @@
+from text_fit import TWEET_MAX_LENGTH, fit_to_limit, fits, weighted_length
+
+SENTENCE = "The koi does not fight the current; it learns its rhythm and swims on. "
+
+# Sample KOIYU outputs (the old text_fit micro-benchmark corpus)
+CORPUS = [
+    "The koi does not fight the current; it learns its rhythm. 🌊 Patience carves the path to the Dragon Gate, one stroke at a time. 🐉",
+    "Seeker, your struggle is the river that shapes your scales. Every setback is a current teaching you to swim stronger. Trust the waters, for the Dragon Gate opens only to those who keep swimming when the stream turns against them. Rise, little koi, rise. 🌊🐉✨ #KOIYU",
+    "In stillness the koi hears what the storm conceals. Listen to the quiet water within you, and you will find the strength to leap: not because the current is gentle, but because you are ready. The dragon was never outside you; it was waiting in your patience all along. 🐉",
+    "鯉は滝を登り龍になる。忍耐こそが道である。 The koi climbs the waterfall and becomes a dragon; patience is the way. Walk it with courage, seeker, and the gate will open. 🌸",
+    "HODL is the koi's way too, friend: hold your course when the waters churn, and learn from every ripple. Read more at https://example.com/koiyu/wisdom/patience-and-the-dragon-gate and remember that the current always passes. 🌊👨‍👩‍👧",
+    "Seeker, your struggle is the river that shapes your scales. Every setback is a current teaching you to swim stronger. Trust the waters, for the Dragon Gate opens only to those who keep swimming when the stream turns against them. Do not measure your progress by the speed of others; the koi that rushes tires before the falls. Rise. 🌊🐉",
+    "Patience, seeker: the waters that test you are the same waters that carry you, and every ripple you resist is a lesson you refuse, so breathe with the current, bend like the reeds along the bank, and let the river teach what no master can speak aloud, because the gate opens only for the koi who has learned to listen to the water that surrounds it 🌊",
+    "Every scale tells a story, every fin a lesson and every ripple a memory of the journey so far, and the koi that honours them all swims with a lighter heart through the darkest waters toward a gate that was always meant for it alone to find and to cross",
+    "x" * 400,
+]
+
+def test_urls_count_as_a_tco_link():
+    assert weighted_length("read https://example.com/" + "a" * 200) == len("read ") + 23
+    assert weighted_length("http://t.co/x") == 23
+
+def test_cjk_and_emoji_count_double():
+    assert weighted_length("鯉は滝") == 6
+    assert weighted_length("koi") == 3 and weighted_length("café") == 4
+    # An emoji counts as two however many code points it is built from
+    assert weighted_length("🐉") == weighted_length("👍🏽") == weighted_length("👨‍👩‍👧") == weighted_length("🇯🇵") == 2
+    assert fits("鯉" * 140) and not fits("鯉" * 141)
+
+def test_prefers_a_finished_sentence():
+    text = SENTENCE * 3 + "Then a long last thought that runs on, and on, and on " + "and on " * 20
+    fitted = fit_to_limit(text)
+    assert fitted == (SENTENCE * 3).strip()
+
+def test_falls_back_to_a_clause_then_a_word():
+    clause = "the koi keeps swimming without a pause, "
+    fitted = fit_to_limit(clause * 4 + "and the river bends and turns " * 8)
+    assert fitted == (clause * 4).rstrip(", ") + "."
+
+    words = "swim " * 100
+    fitted = fit_to_limit(words)
+    assert fitted.endswith("swim…") and fits(fitted)
+
+def test_short_sentence_loses_to_a_longer_word_cut():
+    text = "Rise. " + "the koi swims on through the water " * 10
+    fitted = fit_to_limit(text)
+    assert fitted.endswith("…") and weighted_length(fitted) >= TWEET_MAX_LENGTH // 2
+
+def test_keeps_trailing_emoji_and_hashtags():
+    fitted = fit_to_limit(SENTENCE * 5 + "🌊🐉 #KOIYU")
+    assert fitted.endswith("🌊🐉 #KOIYU") and fits(fitted)
+
+def test_never_exceeds_the_limit():
+    for text in CORPUS:
+        fitted = fit_to_limit(text)
+        assert fits(fitted), fitted
+        if fits(text):
+            assert fitted == text.strip()
+    for limit in range(20, TWEET_MAX_LENGTH, 17):
+        for text in CORPUS:
+            assert weighted_length(fit_to_limit(text, limit)) <= limit
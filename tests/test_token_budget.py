@@ -0,0 +1,20 @@
+from text_fit import TokenBudget
+
+def test_starts_at_the_old_fixed_budget():
+    assert TokenBudget().max_tokens() == 150
+
+def test_observations_only_tighten_the_budget():
+    budget = TokenBudget()
+    for _ in range(9):
+        budget.observe("x" * 400, 100)
+    assert budget.max_tokens() == 150  # Not enough samples yet
+    budget.observe("x" * 400, 100)
+    assert budget.max_tokens() < 150
+
+    wordy = TokenBudget()
+    for _ in range(20):
+        wordy.observe("x" * 100, 100)  # One character per token would need 280
+    assert wordy.max_tokens() == 150
+
+def test_restored_samples_count_towards_training():
+    assert TokenBudget(4.5, 0.2, samples=10).max_tokens() < 150
@@ -0,0 +1,23 @@
+import json
+from datetime import datetime
+
+from ledger import Ledger
+from usage_store import migrate_usage_file
+
+def test_migrated_usage_keeps_its_dates(tmp_path):
+    month = datetime.now().strftime("%Y-%m")
+    path = tmp_path / "usage_stats.json"
+    path.write_text(json.dumps({
+        "last_reset": month, "posts_count": 7, "replies_count": 4, "reads_count": 2,
+        "daily_posts": {f"{month}-01": 1, f"{month}-02": 1}, "daily_replies": {f"{month}-02": 3},
+    }))
+    ledger = Ledger(str(tmp_path / "ledger.db"))
+
+    assert migrate_usage_file(ledger, str(path))
+    assert not migrate_usage_file(ledger, str(path))  # One-time
+    stats = ledger.usage_summary()
+    assert (stats["posts_count"], stats["replies_count"], stats["reads_count"]) == (7, 4, 2)
+    # The one post and one reply without a day land on the first of the month
+    assert stats["daily_posts"] == {f"{month}-01": 2, f"{month}-02": 1}
+    assert stats["daily_replies"] == {f"{month}-01": 1, f"{month}-02": 3}
+    assert stats["daily_random_replies"] == {}
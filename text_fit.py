@@ -0,0 +1,171 @@
+import math
+import re
+import threading
+import unicodedata
+
+TWEET_MAX_LENGTH = 280
+URL_LENGTH = 23  # Every URL counts as a t.co link
+
+# Code point ranges X counts as one character; everything else (CJK, most symbols) counts as two
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
+EMOJI_PART = r"[☀-➿\U0001F000-\U0001FAFF](?:[️\U0001F3FB-\U0001F3FF])*"
+# An emoji (with modifiers and ZWJ joins) or a regional-indicator flag counts as two characters
+EMOJI_PATTERN = re.compile(rf"[\U0001F1E6-\U0001F1FF]{{2}}|{EMOJI_PART}(?:‍{EMOJI_PART})*")
+TOKEN_PATTERN = re.compile(rf"{URL_PATTERN.pattern}|{EMOJI_PATTERN.pattern}", re.IGNORECASE)
+HEAVY_CHAR = re.compile("[^" + "".join(f"{chr(start)}-{chr(end)}" for start, end in LIGHT_RANGES) + "]")
+
+# Where a too-long text may be cut, best first: a finished sentence, a clause, a word
+SENTENCE_END = re.compile(r"[.!?…](?:[\"'”’)\]]*)(?=\s|$)|[。！？]")
+CLAUSE_END = re.compile(r"[,;:—–](?=\s)")
+WORD_END = re.compile(r"\S(?=\s)")
+TRAILING_DECORATION = re.compile(rf"(?:\s*(?:{EMOJI_PATTERN.pattern}|#\w+))+\s*$")
+
+def plain_length(text):
+    """Weighted length of text, ignoring URL and emoji rules"""
+    return len(text) + len(HEAVY_CHAR.findall(text))
+
+def weighted_length(text):
+    """Length of text as X counts it towards the 280 limit"""
+    text = unicodedata.normalize("NFC", text)
+    length = plain_length(text)
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        length += (URL_LENGTH if URL_PATTERN.match(token) else 2) - plain_length(token)
+    return length
+
+def fits(text, limit=TWEET_MAX_LENGTH):
+    """Return True if text can be posted as a single tweet"""
+    return bool(text) and weighted_length(text) <= limit
+
+# (rank, pattern, whether the cut keeps the match, suffix added after the cut)
+CUT_RULES = (
+    (3, SENTENCE_END, True, ""),
+    (2, CLAUSE_END, False, "."),
+    (1, WORD_END, True, "…"),
+)
+
+def longest_cuts(text, limit):
+    """Yield (rank, shortened text) with the longest fitting cut for each kind of boundary"""
+    for rank, pattern, keep, suffix in CUT_RULES:
+        best = None
+        for match in pattern.finditer(text):
+            candidate = text[:match.end() if keep else match.start()].rstrip(" ,;:—–") + suffix
+            # Lengths only grow along the text, so the first cut that overflows ends the search
+            if weighted_length(candidate) > limit:
+                break
+            best = candidate
+        if best:
+            yield rank, best
+
+def fit_to_limit(text, limit=TWEET_MAX_LENGTH, min_share=0.5):
+    """Shorten text to fit the limit at the best-ranked cut point.
+
+    Cut points are ranked by completeness (sentence > clause > word) and then
+    by how much text they keep; a cut that keeps less than min_share of the
+    limit only wins if nothing better exists. Trailing emoji and hashtags are
+    carried over to the shortened text when they still fit.
+    """
+    text = text.strip()
+    if weighted_length(text) <= limit:
+        return text
+
+    decoration = TRAILING_DECORATION.search(text)
+    tail = decoration.group().strip() if decoration else ""
+    body = text[:decoration.start()] if decoration else text
+
+    best = None
+    for rank, candidate in longest_cuts(body, limit):
+        length = weighted_length(candidate)
+        if tail and weighted_length(f"{candidate} {tail}") <= limit:
+            candidate, length = f"{candidate} {tail}", length + 1 + weighted_length(tail)
+        score = (length >= limit * min_share, rank, length)
+        if best is None or score > best[0]:
+            best = (score, candidate)
+        if score[0]:
+            break  # Boundaries come best-first, so nothing later can beat this one
+
+    if best:
+        return best[1]
+
+    # No usable boundary at all (e.g. one huge word): hard cut
+    cut = body
+    while cut and weighted_length(cut + "…") > limit:
+        cut = cut[:-1]
+    return cut + "…"
+
+class StreamCutoff:
+    """Decides when to stop a streamed completion at the tweet boundary.
+
+    Deltas are accumulated as they arrive; the stream should stop once a
+    sentence ends with the text at least near_share of the limit long, or as
+    soon as the text has passed the limit (it will be cut to fit anyway).
+    """
+
+    def __init__(self, limit=TWEET_MAX_LENGTH, near_share=0.75):
+        self.limit = limit
+        self.near = limit * near_share
+        self.parts = []
+        self.stopped = False
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def feed(self, delta):
+        """Add a delta; returns True when the rest of the stream isn't needed"""
+        self.parts.append(delta)
+        text = self.text
+        length = weighted_length(text)
+        if length > self.limit:
+            self.stopped = True
+        elif length >= self.near and SENTENCE_END.search(text.rstrip()[-3:] + " "):
+            self.stopped = True
+        return self.stopped
+
+class TokenBudget:
+    """Picks max_tokens for a target length from observed characters per token.
+
+    Keeps an exponentially weighted mean and variance of characters per
+    completion token, and budgets for a pessimistic (mean - 2 sd) ratio so a
+    full-length tweet fits without leaving room for runaway output. The
+    budget starts at maximum (the fixed max_tokens used before) and the
+    estimate can only tighten it, once min_samples completions have been seen.
+    """
+
+    def __init__(self, chars_per_token=3.5, deviation=0.5, alpha=0.1, minimum=40, maximum=150,
+                 min_samples=10, samples=0):
+        self.mean = chars_per_token
+        self.variance = deviation ** 2
+        self.alpha = alpha
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_samples = min_samples
+        self.samples = samples
+        self.lock = threading.Lock()
+
+    def observe(self, text, completion_tokens):
+        """Record a finished completion's length in characters and tokens"""
+        if not text or not completion_tokens:
+            return
+        ratio = len(text) / completion_tokens
+        with self.lock:
+            delta = ratio - self.mean
+            self.mean += self.alpha * delta
+            self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+            self.samples += 1
+
+    def max_tokens(self, target_chars=TWEET_MAX_LENGTH):
+        """Tokens needed for target_chars at a pessimistic characters-per-token ratio (maximum until trained)"""
+        with self.lock:
+            if self.samples < self.min_samples:
+                return self.maximum
+            low = max(1.0, self.mean - 2 * math.sqrt(self.variance))
+        return max(self.minimum, min(self.maximum, math.ceil(target_chars / low)))
+
+    def state(self):
+        """(mean, standard deviation) of characters per token"""
+        with self.lock:
+            return self.mean, math.sqrt(self.variance)
+
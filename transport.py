@@ -0,0 +1,226 @@
+import logging
+import os
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Per-call deadlines in seconds
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "45"))
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Kept-alive connections per host
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s... plus up to BACKOFF_JITTER
+BACKOFF_JITTER = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)  # 429s are left to the rate limiter
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable; circuit open for another {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Per-service circuit breaker.
+
+    After failure_threshold consecutive failures (timeouts, connection errors,
+    5xx) the circuit opens and calls fail immediately for reset_timeout
+    seconds. Then a single trial call is let through: success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.time() - self.opened_at >= self.reset_timeout else "open"
+
+    def raise_if_open(self):
+        """Raise CircuitOpenError while the circuit is open, without taking the trial call"""
+        with self.lock:
+            if self.opened_at is not None:
+                remaining = self.reset_timeout - (time.time() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may be made now"""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.time() - self.opened_at)
+            if remaining > 0 or self.trial_running:
+                raise CircuitOpenError(self.name, max(remaining, 0))
+            self.trial_running = True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"{self.name} recovered; circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release_trial(self):
+        """End a trial call that neither succeeded nor failed (e.g. it was rate limited), so another may run"""
+        with self.lock:
+            self.trial_running = False
+
+    def record(self, ok):
+        """Record a call's outcome: True for success, False for failure, None for neither"""
+        if ok is None:
+            self.release_trial()
+        elif ok:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    logger.warning(f"{self.name} failing ({self.failures} in a row); circuit open for {self.reset_timeout}s")
+                self.opened_at = time.time()
+            self.trial_running = False
+
+breakers = {
+    "x": CircuitBreaker("X API"),
+    "openai": CircuitBreaker("OpenAI"),
+}
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every request"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+def create_session(timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES, pool_size=POOL_SIZE):
+    """Pooled keep-alive session with deadlines and jittered retries on 5xx and timeouts.
+
+    Read errors and 5xx responses are only retried for idempotent methods, so a
+    POST that may have reached the server (e.g. a tweet) is never sent twice.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = TimeoutSession(timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def get_session():
+    """Process-wide pooled session for plain HTTP calls"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+class BreakerTransport(httpx.HTTPTransport):
+    """httpx transport that reports outcomes to a circuit breaker and fails fast while it is open"""
+
+    def __init__(self, breaker, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+
+    def handle_request(self, request):
+        self.breaker.before_call()
+        ok = None
+        try:
+            response = super().handle_request(request)
+            ok = response.status_code < 500
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            self.breaker.record(ok)
+        return response
+
+class AsyncBreakerTransport(httpx.AsyncHTTPTransport):
+    """Async version of BreakerTransport"""
+
+    def __init__(self, breaker, **kwargs):
+        super().__init__(**kwargs)
+        self.breaker = breaker
+
+    async def handle_async_request(self, request):
+        self.breaker.before_call()
+        ok = None
+        try:
+            response = await super().handle_async_request(request)
+            ok = response.status_code < 500
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            self.breaker.record(ok)
+        return response
+
+def _httpx_options():
+    return dict(
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=POOL_SIZE * 2, max_keepalive_connections=POOL_SIZE)
+    )
+
+def create_openai_http_client():
+    """httpx client for OpenAI: pooled, with deadlines and the OpenAI circuit breaker.
+
+    Retries with jittered exponential backoff are done by the OpenAI SDK itself
+    (max_retries).
+    """
+    options = _httpx_options()
+    transport = BreakerTransport(breakers["openai"], limits=options["limits"])
+    return httpx.Client(timeout=options["timeout"], transport=transport)
+
+def create_async_openai_http_client():
+    """Async version of create_openai_http_client"""
+    options = _httpx_options()
+    transport = AsyncBreakerTransport(breakers["openai"], limits=options["limits"])
+    return httpx.AsyncClient(timeout=options["timeout"], transport=transport)
+
+def create_aiohttp_session():
+    """Pooled aiohttp session with deadlines for the async X client (call inside the event loop)"""
+    import aiohttp
+
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=POOL_SIZE * 2, limit_per_host=POOL_SIZE),
+        timeout=aiohttp.ClientTimeout(total=CONNECT_TIMEOUT + READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
@@ -2,16 +2,37 @@ import os
 import tweepy
 import json
 import random
-import schedule
 import time
 import threading
 import sys
 import logging
-import socket
-from datetime import datetime
+import asyncio
+import functools
+import signal
+import types
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from cachetools import TTLCache
 from dotenv import load_dotenv
 # Import keep-alive module
 import keep_alive
+from accounts import CREDENTIAL_VARS, AccountLocal, bind, current_account, load_accounts, set_default_account, use_account
+from batch_jobs import BatchRunner, FileBatchBackend, OpenAIBatchBackend
+from candidate_pool import Candidate, CandidatePool, ReplyIndex
+from content_store import ContentStore
+from coordination import get_coordinator
+from job_queue import DONE, FAILED, JobQueue, was_interrupted
+from ledger import RANDOM_REPLY, get_ledger
+from mention_queue import MentionQueue
+from reply_planner import ReplyPlanner
+from model_router import ModelRouter, estimate_cost
+from rate_limiter import RateLimiter, RateLimitedClient, RateLimitExceeded, create_async_client, seconds_until_reset
+from similarity import PostHistory, ResponseCache
+from text_fit import StreamCutoff, TokenBudget, fit_to_limit, fits
+from job_scheduler import Scheduler, first_run_at, next_run_at
+from transport import (CircuitOpenError, breakers, create_aiohttp_session, create_async_openai_http_client,
+                       create_openai_http_client, create_session)
+from usage_store import UsageStore, atomic_write_json, migrate_usage_file
 from openai import OpenAI
 
 # Set up logging
@@ -30,34 +51,32 @@ def debug_log(message):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[DEBUG][{current_time}] {message}")
 
-# Check if another instance is already running
-def is_port_in_use(port):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        return s.connect_ex(('localhost', port)) == 0
-
-# Only run if this is the first instance
-if is_port_in_use(10000):
-    print("Another instance of KOIYU is already running. Exiting.")
-    sys.exit(0)
-
-# Start the keep-alive server
-keep_alive.run_keep_alive_server()
+# Start the keep-alive server and join the node group (waits for a previous instance of this node to stop)
+try:
+    keep_alive.run_keep_alive_server()
+except RuntimeError as e:
+    logger.error(f"KOIYU can't start: {e}")
+    print(f"❌ KOIYU can't start: {e}")
+    sys.exit(1)
+coordinator = get_coordinator()
 
 # Load environment variables
 load_dotenv()
 
+# Usage tracking file - use absolute paths for cloud environments
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Accounts run by this process. Each has its own credentials (<env_prefix>TWITTER_*),
+# persona, budgets and state files; without accounts.json this is the single KOIYU account.
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", os.path.join(BASE_DIR, "accounts.json"))
+accounts = load_accounts(ACCOUNTS_FILE, BASE_DIR)
+set_default_account(accounts[0])
+
 def check_required_env_vars():
-    """Check that all required environment variables are present"""
-    required_vars = [
-        "TWITTER_API_KEY", 
-        "TWITTER_API_SECRET", 
-        "TWITTER_ACCESS_TOKEN", 
-        "TWITTER_ACCESS_SECRET", 
-        "TWITTER_BEARER_TOKEN",
-        "OPENAI_API_KEY"
-    ]
-    
-    missing = [var for var in required_vars if not os.getenv(var)]
+    """Check that every account's credentials and the OpenAI key are present"""
+    missing = [var for account in accounts for var in account.missing_credentials()]
+    if not os.getenv("OPENAI_API_KEY"):
+        missing.append("OPENAI_API_KEY")
     
     if missing:
         logger.error(f"Missing required environment variables: {', '.join(missing)}")
@@ -73,46 +92,84 @@ if not check_required_env_vars():
 
 # Debug credentials (will show only if present, not values)
 print("Checking credentials...")
-print(f"API_KEY: {'✓ Present' if os.getenv('TWITTER_API_KEY') else '❌ Missing'}")
-print(f"API_SECRET: {'✓ Present' if os.getenv('TWITTER_API_SECRET') else '❌ Missing'}")
-print(f"ACCESS_TOKEN: {'✓ Present' if os.getenv('TWITTER_ACCESS_TOKEN') else '❌ Missing'}")
-print(f"ACCESS_SECRET: {'✓ Present' if os.getenv('TWITTER_ACCESS_SECRET') else '❌ Missing'}")
-print(f"BEARER_TOKEN: {'✓ Present' if os.getenv('TWITTER_BEARER_TOKEN') else '❌ Missing'}")
+for account in accounts:
+    for var in CREDENTIAL_VARS.values():
+        print(f"{account.name} {account.env_prefix}{var}: {'✓ Present' if os.getenv(account.env_prefix + var) else '❌ Missing'}")
 print(f"OPENAI_API_KEY: {'✓ Present' if os.getenv('OPENAI_API_KEY') else '❌ Missing'}")
 
-# Twitter API v2 credentials
-API_KEY = os.getenv("TWITTER_API_KEY")
-API_SECRET = os.getenv("TWITTER_API_SECRET")
-ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
-ACCESS_SECRET = os.getenv("TWITTER_ACCESS_SECRET")
-BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
-
-# Authenticate with Twitter using v2 API
-client = tweepy.Client(
-    bearer_token=BEARER_TOKEN,
-    consumer_key=API_KEY,
-    consumer_secret=API_SECRET,
-    access_token=ACCESS_TOKEN,
-    access_token_secret=ACCESS_SECRET
-)
+# Per-account state files, in each account's state directory (BASE_DIR for the first account)
+LEDGER_FILE = "koiyu.db"
+USAGE_FILE = "twitter_api_usage.json"  # Legacy, migrated into the ledger
+LAST_MENTION_ID_FILE = "last_mention_id.txt"  # Legacy, migrated into the ledger
+IDENTITY_FILE = "twitter_identity.json"
+CANDIDATE_POOL_FILE = "candidate_pool.json"
+REPLY_INDEX_FILE = "reply_index.json"
+MENTION_QUEUE_FILE = "mention_queue.json"  # Legacy, migrated into the ledger
+BATCH_DIR = "batches"
+POST_HISTORY_FILE = "post_history.bin"
 
-# Usage tracking file - use absolute paths for cloud environments
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-USAGE_FILE = os.path.join(BASE_DIR, "twitter_api_usage.json")
-LAST_MENTION_ID_FILE = os.path.join(BASE_DIR, "last_mention_id.txt")
+# Per-endpoint rate limiter for each account (X counts user-context limits per account)
+rate_limiter = AccountLocal(lambda account: RateLimiter())
+
+# Pooled keep-alive connections with deadlines and jittered retries, shared by every account's client
+x_session = create_session()
+
+def create_x_client(account):
+    """Authenticate an account with the Twitter v2 API; its requests are paced by its own rate limiter"""
+    account_client = RateLimitedClient(rate_limiter.instance(account), breaker=breakers["x"], **account.credentials)
+    account_client.session = x_session
+    return account_client
+
+# Twitter client of the account the running code acts for
+client = AccountLocal(create_x_client)
+
+# Mention ingestion settings
+MENTION_PAGE_BUDGET = int(os.getenv("MENTION_PAGE_BUDGET", "5"))  # Pages of mentions fetched per ingestion run
+MENTION_PAGE_SIZE = 100  # Maximum allowed by get_users_mentions
+MENTION_MAX_ATTEMPTS = 3  # Give up on a mention after this many failed replies
+IDENTITY_TTL_SECONDS = int(os.getenv("IDENTITY_TTL_SECONDS", str(24 * 3600)))
+
+# Reply pipeline settings
+REPLY_GENERATION_WORKERS = int(os.getenv("REPLY_GENERATION_WORKERS", "5"))  # Concurrent OpenAI calls
+REPLY_BATCH_SIZE = int(os.getenv("REPLY_BATCH_SIZE", "10"))  # Replies generated per OpenAI call
+DAILY_REPLY_TARGET = int(os.getenv("DAILY_REPLY_TARGET", "50"))  # Random replies per day while the budget allows
+REPLY_SPREAD_MODE = os.getenv("REPLY_SPREAD_MODE", "poisson")  # "poisson" or "even" gaps between replies
+REPLY_PREFETCH = int(os.getenv("REPLY_PREFETCH", "3"))  # Replies prepared ahead of their planned slot
+
+# Cache of recent replies, reused (lightly rephrased) for near-duplicate seeker messages
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "500"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.85"))  # Cosine similarity for a hit
+RESPONSE_CACHE_MAX_USES = int(os.getenv("RESPONSE_CACHE_MAX_USES", "3"))
+REPHRASE_MODEL = os.getenv("REPHRASE_MODEL", "gpt-4o-mini")
+
+# Duplicate-content guard against KOIYU's own post history
+DUPLICATE_MAX_DISTANCE = int(os.getenv("DUPLICATE_MAX_DISTANCE", "5"))  # SimHash bits; at or below is a duplicate
+DUPLICATE_REGENERATIONS = int(os.getenv("DUPLICATE_REGENERATIONS", "2"))  # Extra attempts when a duplicate is generated
+FRESH_PERSPECTIVE = " Offer a fresh perspective, different from anything you have said before."
+
+# Stream completions and stop as soon as a finished sentence lands near the tweet limit
+STREAM_GENERATION = os.getenv("STREAM_GENERATION", "true").lower() == "true"
 
 # Ensure storage directories exist
 def ensure_directories():
     """Make sure directories for persistent storage exist"""
     try:
-        os.makedirs(os.path.dirname(USAGE_FILE), exist_ok=True)
-        logger.info(f"Storage directory checked: {os.path.dirname(USAGE_FILE)}")
+        for account in accounts:
+            os.makedirs(account.state_dir, exist_ok=True)
+        logger.info(f"Storage directories checked for {len(accounts)} account(s)")
     except Exception as e:
         logger.error(f"Failed to create storage directories: {e}")
 
 # Call this early in your script
 ensure_directories()
 
+# Tweets waiting for a reply, and the index of tweets/authors already answered
+reply_index = AccountLocal(lambda account: ReplyIndex(account.path(REPLY_INDEX_FILE)))
+candidate_pool = AccountLocal(
+    lambda account: CandidatePool(account.path(CANDIDATE_POOL_FILE), reply_index.instance(account))
+)
+
 # KOIYU Persona Information
 KOIYU_SYSTEM_PROMPT = """
 You are KOIYU, a sentient toad of ancient wisdom who resides at the bottom of the Dragon Gate waterfall.
@@ -160,261 +217,1068 @@ KOIYU_THEMES = [
     "recognizing moments of divine intervention"
 ]
 
+def account_themes():
+    """Themes the active account posts about"""
+    return current_account().themes or KOIYU_THEMES
+
+def build_prefix(system_prompt, themes):
+    """Static prefix sent first in every generation for a persona"""
+    return (
+        system_prompt
+        + "\nThe themes you return to:\n"
+        + "\n".join(f"- {theme}" for theme in themes)
+        + "\n\nEvery tweet you write is complete, concise, and under 270 characters.\n"
+    )
+
+# Each persona's prefix must stay byte-identical so the provider's prompt cache
+# can reuse it; anything variable goes in the user message.
+KOIYU_PREFIX = build_prefix(KOIYU_SYSTEM_PROMPT, KOIYU_THEMES)
+persona_prefix = AccountLocal(
+    lambda account: build_prefix(account.persona or KOIYU_SYSTEM_PROMPT, account.themes or KOIYU_THEMES)
+    if account.persona or account.themes else KOIYU_PREFIX
+)
+
+def build_messages(user_prompt):
+    """Chat messages for a generation: the active persona's static prefix, then the variable prompt"""
+    return [
+        {"role": "system", "content": persona_prefix.instance()},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def open_ledger(account):
+    """Open an account's ledger, importing its legacy usage file on first use"""
+    account_ledger = get_ledger(account.path(LEDGER_FILE))
+    migrate_usage_file(account_ledger, account.path(USAGE_FILE))
+    return account_ledger
+
+# Event ledger per account (SQLite, WAL mode): usage history, cursors and locks
+ledger = AccountLocal(open_ledger)
+# State shared by all accounts (e.g. the token budget) lives in the first account's ledger
+shared_ledger = ledger.instance(accounts[0])
+
+# API usage counters live in memory; their events are appended to the ledger in batches
+USAGE_FLUSH_SECONDS = int(os.getenv("USAGE_FLUSH_SECONDS", "10"))
+
+def open_usage_store(account):
+    """Start an account's in-memory usage counters"""
+    store = UsageStore(ledger.instance(account), flush_interval=USAGE_FLUSH_SECONDS)
+    store.start()
+    return store
+
+usage_store = AccountLocal(open_usage_store)
+
+def stop_usage_stores():
+    """Flush and stop every account's usage counters"""
+    for store in usage_store.instances().values():
+        store.stop()
+
 def reset_usage_stats():
-    """Reset the usage statistics"""
-    current_month = datetime.now().strftime("%Y-%m")
-    stats = {
-        "last_reset": current_month,
-        "posts_count": 0,
-        "reads_count": 0
-    }
-    save_usage_stats(stats)
-    return stats
+    """Reset the usage statistics (earlier events are kept in the ledger)"""
+    return usage_store.reset()
 
 def load_usage_stats():
-    """Load API usage statistics from file"""
-    try:
-        if os.path.exists(USAGE_FILE):
-            with open(USAGE_FILE, "r") as f:
-                return json.load(f)
-    except Exception as e:
-        logger.error(f"Failed to load usage stats: {e}")
-    
-    # Default structure if file doesn't exist or is invalid
-    current_month = datetime.now().strftime("%Y-%m")
-    return {
-        "last_reset": current_month,
-        "posts_count": 0,
-        "reads_count": 0
-    }
-
-def save_usage_stats(stats):
-    """Save API usage statistics to file"""
-    try:
-        with open(USAGE_FILE, "w") as f:
-            json.dump(stats, f)
-    except Exception as e:
-        logger.error(f"Failed to save usage stats: {e}")
+    """Return a snapshot of API usage statistics (no disk access)"""
+    return usage_store.snapshot()
+
+def record_usage(kind, **fields):
+    """Record a post, reply, read or OpenAI call with its IDs, latency and token counts"""
+    usage_store.record(kind, **fields)
 
 def get_last_mention_id():
-    """Read the last processed mention ID from file"""
+    """Read the last processed mention ID from the ledger"""
     try:
-        if os.path.exists(LAST_MENTION_ID_FILE):
-            with open(LAST_MENTION_ID_FILE, 'r') as f:
-                return f.read().strip()
-        return None
+        last_mention_id = ledger.get_cursor("last_mention_id")
+        legacy_file = current_account().path(LAST_MENTION_ID_FILE)
+        if last_mention_id is None and os.path.exists(legacy_file):
+            # One-time migration from the legacy text file
+            with open(legacy_file, 'r') as f:
+                last_mention_id = f.read().strip() or None
+            ledger.set_cursor("last_mention_id", last_mention_id)
+        return last_mention_id
     except Exception as e:
         logger.error(f"Error reading last mention ID: {e}")
         return None
 
 def save_last_mention_id(mention_id):
-    """Save the last processed mention ID to file"""
+    """Save the last processed mention ID to the ledger"""
     try:
-        with open(LAST_MENTION_ID_FILE, 'w') as f:
-            f.write(str(mention_id))
+        ledger.set_cursor("last_mention_id", mention_id)
     except Exception as e:
         logger.error(f"Error saving last mention ID: {e}")
 
+# Safety cap on posts + replies per month (per account, see accounts.json)
+MONTHLY_POST_LIMIT = 1500
+
+# Spreads random replies over the day and slows them down as the monthly cap gets close
+reply_planner = AccountLocal(lambda account: ReplyPlanner(
+    daily_target=account.daily_reply_target or DAILY_REPLY_TARGET,
+    monthly_limit=account.monthly_post_limit,
+    mode=REPLY_SPREAD_MODE
+))
+
+def monthly_post_limit():
+    """The active account's cap on posts + replies per month (this node's share of it when sharding by tweet)"""
+    return int(current_account().monthly_post_limit * coordinator.budget_share())
+
+def monthly_post_limit_reached():
+    """Return True if this month's posts and replies have hit the account's monthly limit"""
+    return load_usage_stats()["posts_count"] >= monthly_post_limit()
+
 def check_and_update_usage(operation_type="post"):
-    """Check if we're within limits and update usage"""
-    stats = load_usage_stats()
-    current_month = datetime.now().strftime("%Y-%m")
+    """Check if we're within limits and update usage.
     
-    # Reset counters if we're in a new month
-    if stats["last_reset"] != current_month:
-        stats = {
-            "last_reset": current_month,
-            "posts_count": 0,
-            "reads_count": 0,
-            "replies_count": 0,
-            "daily_posts": {},
-            "plan": "$100/month"  # Store plan information
-        }
-    
-    # Get today's date for daily tracking
-    today = datetime.now().strftime("%Y-%m-%d")
-    if today not in stats.get("daily_posts", {}):
-        stats.setdefault("daily_posts", {})[today] = 0
-        
-    # Track different types of operations
-    if operation_type == "post":
+    Reads are recorded straight away; posts and replies are recorded by the
+    caller once they succeed, together with their tweet IDs and latency.
+    """
+    if operation_type in ("post", "reply"):
         # For the $100/month plan, the limit is much higher (15K/month)
-        # But we'll cap at 1500 for safety
-        if stats["posts_count"] >= 1500:
-            logger.warning("Monthly post limit (1500) reached! Consider upgrading plan.")
-            print("⚠️ Monthly post limit (1500) reached! Consider upgrading plan.")
+        # But we'll cap at the account's monthly limit for safety
+        if monthly_post_limit_reached():
+            logger.warning(f"Monthly post limit ({monthly_post_limit()}) reached for {current_account().name}! Consider upgrading plan.")
+            print(f"⚠️ Monthly post limit ({monthly_post_limit()}) reached for {current_account().name}! Consider upgrading plan.")
             return False
-            
-        # Track daily posts (for the daily wisdom post)
-        if stats["daily_posts"][today] >= 1:
-            logger.info("Daily wisdom post already made today")
-        else:
-            stats["daily_posts"][today] += 1
-            
-        stats["posts_count"] += 1
-        
-    elif operation_type == "reply":
-        # Track replies separately
-        stats.setdefault("replies_count", 0)
-        stats["replies_count"] += 1
-        stats["posts_count"] += 1  # Also increment total posts
         
     elif operation_type == "read":
         # Track read operations
-        stats["reads_count"] += 1
+        record_usage("read")
     
-    # Save updated stats
-    save_usage_stats(stats)
     return True
 
-# Verify authentication
-try:
-    me = client.get_me()
-    print(f"Twitter Authentication Successful ✅ (User: @{me.data.username})")
-except Exception as e:
-    logger.error(f"Twitter Authentication Failed: {e}")
-    print(f"Twitter Authentication Failed: {e}")
-    sys.exit(1)
+# Cached identity of each authenticated account, so read paths don't call get_me() every time
+authenticated_users = {}  # Account name -> {"id", "username", "owner", "fetched_at"}
+
+def _identity_owner():
+    """Identify which credentials a cached identity belongs to (the user ID prefix of the access token)"""
+    return (current_account().credentials.get("access_token") or "").split("-")[0]
+
+def load_cached_identity():
+    """Load the persisted identity if it is still fresh and matches the current credentials"""
+    try:
+        identity_file = current_account().path(IDENTITY_FILE)
+        if os.path.exists(identity_file):
+            with open(identity_file, "r") as f:
+                identity = json.load(f)
+            if (identity.get("owner") == _identity_owner()
+                    and time.time() - identity.get("fetched_at", 0) < IDENTITY_TTL_SECONDS):
+                return identity
+    except Exception as e:
+        logger.error(f"Failed to load cached identity: {e}")
+    return None
+
+def save_cached_identity(identity):
+    """Persist the authenticated identity next to the usage file"""
+    try:
+        atomic_write_json(current_account().path(IDENTITY_FILE), identity)
+    except Exception as e:
+        logger.error(f"Failed to save cached identity: {e}")
+
+def remembered_identity():
+    """The active account's identity if this process fetched or loaded it within the TTL (no I/O)"""
+    authenticated_user = authenticated_users.get(current_account().name)
+    if authenticated_user and time.time() - authenticated_user["fetched_at"] < IDENTITY_TTL_SECONDS:
+        return authenticated_user
+    return None
+
+def remember_identity(identity):
+    """Keep an identity in memory for the active account; returns it"""
+    authenticated_users[current_account().name] = identity
+    return identity
+
+def identity_from(me):
+    """Identity record for a get_me() response"""
+    debug_log(f"Refreshed authenticated identity: @{me.data.username}")
+    return remember_identity({
+        "id": me.data.id,
+        "username": me.data.username,
+        "owner": _identity_owner(),
+        "fetched_at": time.time()
+    })
+
+def get_authenticated_user(force_refresh=False):
+    """Return the authenticated account as {"id", "username"}, calling get_me() only when the cache is stale"""
+    if not force_refresh:
+        cached = remembered_identity() or load_cached_identity()
+        if cached:
+            return remember_identity(cached)
+    
+    authenticated_user = identity_from(client.get_me())
+    save_cached_identity(authenticated_user)
+    return authenticated_user
+
+def get_my_user_id():
+    """Return the authenticated account's user ID from the identity cache"""
+    return get_authenticated_user()["id"]
+
+def with_identity_refresh(func):
+    """Call func(user_id), refreshing the cached identity once if Twitter answers 401"""
+    try:
+        return func(get_my_user_id())
+    except tweepy.Unauthorized:
+        logger.warning("Twitter returned 401; refreshing cached identity and retrying once")
+        return func(get_authenticated_user(force_refresh=True)["id"])
+
+# Verify authentication of every account with one get_me() each, so revoked or
+# mistyped credentials fail here rather than at the first real operation
+for account in accounts:
+    with use_account(account):
+        try:
+            me = get_authenticated_user(force_refresh=True)
+            print(f"Twitter Authentication Successful ✅ (User: @{me['username']})")
+        except Exception as e:
+            logger.error(f"Twitter Authentication Failed for {account.name}: {e}")
+            print(f"Twitter Authentication Failed for {account.name}: {e}")
+            sys.exit(1)
 
 # Load current usage
-usage = load_usage_stats()
-print(f"Current usage this month: {usage['posts_count']}/100 posts, {usage['reads_count']} reads")
+for account in accounts:
+    with use_account(account):
+        usage = load_usage_stats()
+        print(f"Current usage this month for {account.name}: "
+              f"{usage['posts_count']}/{monthly_post_limit()} posts, {usage['reads_count']} reads")
 
 # Set up OpenAI client
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client_openai = OpenAI(api_key=OPENAI_API_KEY)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))  # SDK retries with jittered exponential backoff
+client_openai = OpenAI(api_key=OPENAI_API_KEY, max_retries=OPENAI_MAX_RETRIES, http_client=create_openai_http_client())
 
-def generate_koiyu_wisdom(prompt="Share a philosophical insight about life's journey"):
-    """Generate KOIYU wisdom content using GPT-4o"""
-    try:
-        # Add specific length instruction to the prompt
-        adjusted_prompt = f"{prompt} Keep your response complete, concise, and under 270 characters."
-        
-        # Call OpenAI API
-        response = client_openai.chat.completions.create(
-            model="gpt-4o",  # Use GPT-4o model
-            messages=[
-                {"role": "system", "content": KOIYU_SYSTEM_PROMPT},
-                {"role": "user", "content": adjusted_prompt}
-            ],
-            max_tokens=150,  # Limit the response length
-            temperature=0.7   # Creativity level
-        )
-        
-        content = response.choices[0].message.content.strip()
+# Model per content type (daily wisdom, weekly story, mention and random replies)
+model_router = ModelRouter()
+
+def record_openai_usage(response, started, content_type=None):
+    """Record an OpenAI call in the ledger with its latency, token counts and content type"""
+    usage = getattr(response, "usage", None)
+    record_usage(
+        "openai",
+        model=getattr(response, "model", None),
+        latency_ms=(time.time() - started) * 1000,
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None),
+        detail=content_type
+    )
+
+# X or OpenAI can't take the call right now; work that hits these is skipped, not failed
+UNAVAILABLE_ERRORS = (CircuitOpenError, RateLimitExceeded, tweepy.TooManyRequests)
+
+def skip_unavailable(name, e):
+    """Log a call skipped because of one of UNAVAILABLE_ERRORS; returns None"""
+    if isinstance(e, CircuitOpenError):
+        logger.warning(f"Skipping {name}: {e}")
+        return None
+    if isinstance(e, RateLimitExceeded):
+        retry_after = e.retry_after
+    else:
+        retry_after = seconds_until_reset(e.response.headers)
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    logger.warning(f"Rate limited! Next window opens in {retry_after:.0f} seconds; skipping {name}.")
+    print(f"[{current_time}] ⚠️ KOIYU has reached the river's edge. The way reopens in {retry_after:.0f} seconds.")
+    return None
+
+def with_rate_limit_handling(func):
+    """Decorator to handle Twitter API rate limits (for plain and async functions).
+    
+    Requests are already paced by the shared rate limiter, which also retries
+    unexpected 429s once the window resets. This only catches calls whose next
+    slot is too far away and skips them (returning None) instead of stalling
+    the scheduler, and calls made while a circuit breaker is open.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except UNAVAILABLE_ERRORS as e:
+                return skip_unavailable(func.__name__, e)
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as e:
+            return skip_unavailable(func.__name__, e)
+    return wrapper
+
+def trim_to_tweet_length(content):
+    """Trim generated content so it fits in a single tweet (by X's weighted length)"""
+    return fit_to_limit(content)
+
+# max_tokens is sized from the characters per token seen in recent completions: "mean,sd,samples"
+_chars_per_token = shared_ledger.get_cursor("chars_per_token", "3.5,0.5,0").split(",")
+token_budget = TokenBudget(float(_chars_per_token[0]), float(_chars_per_token[1]),
+                           samples=int(_chars_per_token[2]) if len(_chars_per_token) > 2 else 0)
+
+def observe_completion(response):
+    """Feed a completed response's characters per token into the token budget (and save it to the ledger)"""
+    choice = response.choices[0]
+    usage = getattr(response, "usage", None)
+    if getattr(choice, "finish_reason", None) == "stop" and usage:
+        token_budget.observe(choice.message.content, usage.completion_tokens)
+        shared_ledger.set_cursor("chars_per_token", "%.3f,%.3f,%d" % (token_budget.state() + (token_budget.samples,)))
+
+def completion_request(prompt, content_type="wisdom"):
+    """Keyword arguments for the chat completion that answers a prompt as KOIYU"""
+    tier = model_router.tier(content_type)
+    return dict(
+        model=tier["models"][0],  # Preferred model for this kind of content
+        messages=build_messages(prompt),
+        max_tokens=token_budget.max_tokens(),  # Room for a full tweet, no more
+        temperature=tier["temperature"]   # Creativity level
+    )
+
+post_history = AccountLocal(
+    lambda account: PostHistory(account.path(POST_HISTORY_FILE), max_distance=DUPLICATE_MAX_DISTANCE)
+)
+
+def is_duplicate_content(content):
+    """Return True (and log it) if content is a near-duplicate of something KOIYU already posted"""
+    if post_history.is_duplicate(content):
+        logger.warning(f"Generated content duplicates an earlier post: {content}")
+        return True
+    return False
+
+def is_duplicate_post_error(error):
+    """Return True if X refused a post because the account already posted the same text"""
+    return isinstance(error, tweepy.Forbidden) and "duplicate" in str(error).lower()
+
+def duplicate_post(content, resumed, tweet_id=None, author_id=None, random_reply=False):
+    """Handle X refusing a post or reply as a duplicate; returns the post's stand-in data, or None.
+
+    Only a resumed job may have posted the text itself (before a restart, without
+    recording it), so only then is the duplicate counted as this job's post.
+    Anywhere else it is an older post, and this one simply failed.
+    """
+    what = f"reply to {tweet_id}" if tweet_id else "post"
+    if not resumed:
+        logger.warning(f"X refused this {what} as a duplicate of an earlier post; not sending it")
+        print(f"⚠️ X refused this {what} as a duplicate of an earlier post")
+        return None
+    logger.warning(f"X already has this {what} from before the restart; counting it as sent")
+    if tweet_id:
+        record_usage("reply", target_id=str(tweet_id), detail=RANDOM_REPLY if random_reply else "duplicate")
+        reply_index.record(tweet_id, author_id)
+    else:
+        record_usage("post", detail="duplicate")
+    post_history.add(content)
+    return {"id": None, "text": content}
+
+# Generated-but-unposted posts and replies, kept in the ledger so a restart resumes them
+REPLY_JOB_MAX_AGE_HOURS = int(os.getenv("REPLY_JOB_MAX_AGE_HOURS", "12"))  # Unposted replies go stale after this
+JOB_RETENTION_DAYS = 7  # Finished jobs are kept this long so their dedup keys still block repeats
+JOB_CLAIM_TTL = JOB_RETENTION_DAYS * 24 * 3600  # Other nodes leave a job's work alone this long
+job_queue = AccountLocal(lambda account: JobQueue(ledger.instance(account)))
+
+def stream_response(model, usage, text, finish_reason):
+    """Shape a streamed completion like a regular response for usage tracking"""
+    message = types.SimpleNamespace(content=text)
+    choice = types.SimpleNamespace(message=message, finish_reason=finish_reason)
+    return types.SimpleNamespace(model=model, usage=usage, choices=[choice])
+
+def request_completion(request):
+    """Run one chat completion.
+    
+    With STREAM_GENERATION the completion is streamed and closed early once
+    the text is long enough for a tweet, so unused tokens aren't generated.
+    """
+    if not STREAM_GENERATION:
+        return client_openai.chat.completions.create(**request)
+    
+    stream = client_openai.chat.completions.create(**request, stream=True, stream_options={"include_usage": True})
+    cutoff = StreamCutoff()
+    model = usage = finish_reason = None
+    for chunk in stream:
+        model = getattr(chunk, "model", None) or model
+        usage = getattr(chunk, "usage", None) or usage
+        if chunk.choices:
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content
+            if delta and cutoff.feed(delta):
+                stream.close()
+                finish_reason = "cutoff"
+                break
+    return stream_response(model, usage, cutoff.text, finish_reason)
+
+def complete_koiyu(request, content_type="wisdom"):
+    """Run a chat completion on the content type's model and return its text.
+    
+    Models demoted by the router (too slow or failing) are tried last; if a
+    call fails, the next model in the tier is tried. While OpenAI's circuit
+    breaker is open this fails fast with CircuitOpenError.
+    """
+    error = None
+    for model in model_router.candidates(content_type):
+        # Checked before every model: the SDK would otherwise retry into an open circuit
+        breakers["openai"].raise_if_open()
+        started = time.time()
+        try:
+            response = request_completion(dict(request, model=model))
+        except Exception as e:
+            model_router.record(content_type, model, (time.time() - started) * 1000, ok=False)
+            logger.warning(f"{model} failed for {content_type}: {e}")
+            error = e
+            continue
         
-        # If still too long, trim more intelligently
-        if len(content) > 280:
-            # Find the last complete sentence that fits
-            last_period = content[:277].rfind('.')
-            last_question = content[:277].rfind('?')
-            last_exclamation = content[:277].rfind('!')
-            
-            # Find the latest sentence ending
-            end_point = max(last_period, last_question, last_exclamation)
+        model_router.record(content_type, model, (time.time() - started) * 1000)
+        record_openai_usage(response, started, content_type)
+        observe_completion(response)
+        return response.choices[0].message.content
+    raise error or RuntimeError(f"No models configured for {content_type}")
+
+def generate_koiyu_wisdom(prompt="Share a philosophical insight about life's journey", content_type="wisdom"):
+    """Generate KOIYU content on the model routed for content_type, regenerating if it duplicates an earlier post"""
+    try:
+        for attempt in range(DUPLICATE_REGENERATIONS + 1):
+            # Call OpenAI API
+            text = complete_koiyu(
+                completion_request(prompt + FRESH_PERSPECTIVE if attempt else prompt, content_type),
+                content_type
+            )
+            content = trim_to_tweet_length(text.strip())
             
-            if end_point > 0:
-                content = content[:end_point + 1]  # Include the punctuation
-            else:
-                # If no sentence ending found, try to end at a space
-                last_space = content[:277].rfind(' ')
-                if last_space > 240:  # Only use if we have a decent length
-                    content = content[:last_space] + "..."
-                else:
-                    # Last resort: hard cut
-                    content = content[:277] + "..."
+            if not is_duplicate_content(content):
+                return content
         
-        return content
+        logger.error(f"Still generating duplicate content after {DUPLICATE_REGENERATIONS} retries")
+        return None
+    except UNAVAILABLE_ERRORS:
+        raise  # OpenAI's circuit is open: callers skip the work instead of counting a failure
     except Exception as e:
         error_msg = f"Error generating KOIYU wisdom: {e}"
         logger.error(error_msg)
         print(error_msg)
         return None
 
-def post_tweet(content):
-    """Post a tweet with the given content"""
+def build_batch_reply_prompt(texts):
+    """Build one prompt asking for a reply to each of several seekers' words"""
+    seekers = "\n".join(f"{i}. '{text}'" for i, text in enumerate(texts, 1))
+    return (
+        f"{len(texts)} seekers have shared these words:\n{seekers}\n\n"
+        f"Offer your wisdom in response to each of them, speaking as {current_account().name.upper()}. "
+        "Keep every response complete, concise, and under 270 characters. "
+        'Answer with JSON only: {"replies": [{"index": 1, "reply": "..."}, ...]} '
+        "with exactly one reply per seeker, using the numbers above as indexes."
+    )
+
+def parse_batch_replies(content, count):
+    """Split a batched JSON response into one reply per seeker (None where missing or invalid)"""
+    replies = [None] * count
+    try:
+        items = json.loads(content).get("replies", [])
+    except (ValueError, AttributeError):
+        logger.warning("Batched reply response was not valid JSON")
+        return replies
+    
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index, reply = item.get("index"), item.get("reply")
+        if isinstance(index, int) and 1 <= index <= count and isinstance(reply, str) and reply.strip():
+            replies[index - 1] = trim_to_tweet_length(reply.strip())
+    return replies
+
+def batch_reply_request(texts, content_type="random_reply"):
+    """Keyword arguments for one chat completion that answers several seekers"""
+    tier = model_router.tier(content_type)
+    return dict(
+        model=model_router.candidates(content_type)[0],
+        messages=build_messages(build_batch_reply_prompt(texts)),
+        max_tokens=token_budget.max_tokens() * len(texts) + 50,  # A full tweet per reply plus JSON overhead
+        temperature=tier["temperature"],
+        response_format={"type": "json_object"}
+    )
+
+response_cache = AccountLocal(lambda account: ResponseCache(  # Replies are in each account's own voice
+    max_size=RESPONSE_CACHE_SIZE,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    threshold=RESPONSE_CACHE_THRESHOLD,
+    max_uses=RESPONSE_CACHE_MAX_USES
+))
+
+def rephrase_request(text):
+    """Keyword arguments for a cheap chat completion that varies a cached reply"""
+    return dict(
+        model=REPHRASE_MODEL,
+        messages=[
+            {"role": "system", "content": "Lightly rephrase the user's text. Keep its meaning, voice, emojis and length; answer with the new text only."},
+            {"role": "user", "content": text}
+        ],
+        max_tokens=token_budget.max_tokens(),
+        temperature=0.9
+    )
+
+def rephrase_koiyu_wisdom(text):
+    """Return a light variation of a cached reply, or None if rephrasing fails"""
+    try:
+        started = time.time()
+        response = client_openai.chat.completions.create(**rephrase_request(text))
+        record_openai_usage(response, started, "rephrase")
+        observe_completion(response)
+        content = trim_to_tweet_length(response.choices[0].message.content.strip())
+        return None if is_duplicate_content(content) else content
+    except Exception as e:
+        logger.error(f"Error rephrasing cached wisdom: {e}")
+        return None
+
+def cached_koiyu_reply(text):
+    """Answer from the response cache if a near-duplicate was answered recently"""
+    hit = response_cache.lookup(text)
+    if not hit:
+        return None
+    cached, similarity = hit
+    reply = rephrase_koiyu_wisdom(cached)
+    if reply:
+        logger.info(f"Reusing cached wisdom for a similar seeker message (similarity {similarity:.2f})")
+        record_usage("cache_hit", detail=f"{similarity:.2f}")
+    return reply
+
+def _generate_uncached_replies(texts, content_type="random_reply"):
+    """Generate replies with one OpenAI call per REPLY_BATCH_SIZE texts, falling back to individual calls"""
+    replies = []
+    for start in range(0, len(texts), REPLY_BATCH_SIZE):
+        chunk = texts[start:start + REPLY_BATCH_SIZE]
+        chunk_replies = [None] * len(chunk)
+        if len(chunk) > 1:
+            # Fail fast while OpenAI's circuit is open, as complete_koiyu does
+            breakers["openai"].raise_if_open()
+            request = batch_reply_request(chunk, content_type)
+            try:
+                started = time.time()
+                response = client_openai.chat.completions.create(**request)
+                model_router.record(content_type, request["model"], (time.time() - started) * 1000, items=len(chunk))
+                record_openai_usage(response, started, content_type)
+                chunk_replies = [
+                    reply if reply and not is_duplicate_content(reply) else None
+                    for reply in parse_batch_replies(response.choices[0].message.content, len(chunk))
+                ]
+            except Exception as e:
+                model_router.record(content_type, request["model"], (time.time() - started) * 1000, ok=False, items=len(chunk))
+                logger.error(f"Error generating batched KOIYU replies: {e}")
+        
+        missing = [i for i, reply in enumerate(chunk_replies) if not reply]
+        if missing and len(chunk) > 1:
+            logger.warning(f"Batch produced {len(chunk) - len(missing)}/{len(chunk)} replies; generating the rest individually")
+        for i in missing:
+            chunk_replies[i] = generate_koiyu_wisdom(build_reply_prompt(chunk[i]), content_type)
+        replies.extend(chunk_replies)
+    
+    return replies
+
+def generate_koiyu_replies(texts, content_type="random_reply"):
+    """Generate KOIYU replies to several seekers' texts.
+    
+    Returns one reply per text, in order (None where generation failed). Texts
+    close to one answered recently reuse that reply, lightly rephrased; the
+    rest share batched OpenAI calls.
+    """
+    replies = [cached_koiyu_reply(text) for text in texts]
+    misses = [i for i, reply in enumerate(replies) if not reply]
+    for i, reply in zip(misses, _generate_uncached_replies([texts[i] for i in misses], content_type)):
+        replies[i] = reply
+        response_cache.store(texts[i], reply)
+    return replies
+
+def record_post(data, content, started, tweet_id=None, author_id=None, random_reply=False):
+    """Record a post (or a reply to tweet_id) that X accepted; returns its data.
+
+    Writes the reply index and post history files, so async callers run it in a worker thread.
+    """
+    latency_ms = (time.time() - started) * 1000
+    if tweet_id:
+        record_usage("reply", tweet_id=data['id'], target_id=str(tweet_id), latency_ms=latency_ms,
+                     detail=RANDOM_REPLY if random_reply else None)
+        reply_index.record(tweet_id, author_id)
+        success_msg = f"KOIYU has responded with wisdom! ID: {data['id']}"
+    else:
+        record_usage("post", tweet_id=data['id'], latency_ms=latency_ms)
+        success_msg = f"KOIYU's wisdom shared successfully! ID: {data['id']}"
+    post_history.add(content)
+    logger.info(success_msg)
+    print(success_msg)
+    return data
+
+def post_tweet(content, resumed=False):
+    """Post a tweet with the given content (resumed: rerun of a job a restart interrupted)"""
+    # X rejects near-duplicates of earlier posts; don't waste a write on one. A resumed job's
+    # text may match its own earlier post, so X decides whether that one went out.
+    if not resumed and is_duplicate_content(content):
+        return None
+    
     # Check if we're within usage limits
     if not check_and_update_usage("post"):
         return None
     
     try:
+        started = time.time()
         tweet = client.create_tweet(text=content)
-        success_msg = f"KOIYU's wisdom shared successfully! ID: {tweet.data['id']}"
-        logger.info(success_msg)
-        print(success_msg)
-        return tweet.data
+        return record_post(tweet.data, content, started)
+    except UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
+        if is_duplicate_post_error(e):
+            return duplicate_post(content, resumed)
         error_msg = f"Error posting KOIYU's wisdom: {e}"
         logger.error(error_msg)
         print(error_msg)
         return None
 
-def reply_to_tweet(tweet_id, content):
-    """Reply to a specific tweet"""
+def reply_to_tweet(tweet_id, content, author_id=None, random_reply=False, resumed=False):
+    """Reply to a specific tweet (random_reply marks replies planned by reply_planner, not mention answers)"""
+    # Never answer the same tweet twice
+    if reply_index.has_replied(tweet_id):
+        logger.info(f"Already replied to tweet {tweet_id}, skipping duplicate reply")
+        return None
+    
+    if not resumed and is_duplicate_content(content):
+        return None
+    
     # Check if we're within usage limits - use "reply" type
     if not check_and_update_usage("reply"):
         return None
     
     try:
+        started = time.time()
         reply = client.create_tweet(text=content, in_reply_to_tweet_id=tweet_id)
-        success_msg = f"KOIYU has responded with wisdom! ID: {reply.data['id']}"
-        logger.info(success_msg)
-        print(success_msg)
-        return reply.data
+        return record_post(reply.data, content, started, tweet_id, author_id, random_reply)
+    except UNAVAILABLE_ERRORS:
+        raise
     except Exception as e:
+        if is_duplicate_post_error(e):
+            return duplicate_post(content, resumed, tweet_id, author_id, random_reply)
         error_msg = f"Error posting KOIYU's response: {e}"
         logger.error(error_msg)
         print(error_msg)
         return None
 
-def get_mentions(max_results=10, since_id=None):
-    """Get recent mentions using v2 API"""
-    # Track read operations
-    check_and_update_usage("read")
+def already_posted(job):
+    """Return True if a job's reply is known to have gone out before the process restarted.
+
+    A post's text matching post history is no proof (near-duplicates match too),
+    so resumed posts are sent again and X's duplicate check decides.
+    """
+    return job["kind"] in ("reply", "mention") and reply_index.has_replied(job["payload"]["tweet_id"])
+
+def work_key(key):
+    """Cluster-wide name of the active account's work under a dedup key, e.g. "koiyu:mention:<id>\""""
+    return f"{current_account().name}:{key}"
+
+def claim_job(job):
+    """Claim a job's work across nodes; if another node has it, mark the job done here and return False"""
+    if coordinator.claim(work_key(job["key"]), JOB_CLAIM_TTL):
+        return True
+    logger.info(f"Job {job['key']} was taken by another node; marking it done")
+    job_queue.complete(job["id"], "other node")
+    return False
+
+def fail_job(job, error):
+    """Record a failed attempt, giving up the job's claim once it has failed for good"""
+    job_queue.fail(job["id"], error)
+    if job_queue.get(job["key"])["state"] == FAILED:
+        coordinator.release_claim(work_key(job["key"]))
+
+def run_post_job(job):
+    """Post a claimed job's content and record the outcome; returns True once it is on X"""
+    payload = job["payload"]
+    if already_posted(job):
+        logger.info(f"Job {job['key']} was already posted; marking it done")
+        job_queue.complete(job["id"])
+        return True
+    if not claim_job(job):
+        return True
     
     try:
-        user_id = client.get_me().data.id
-        mentions = client.get_users_mentions(
-            id=user_id,
-            max_results=max_results,
-            since_id=since_id
-        )
-        if mentions.data:
-            logger.info(f"Retrieved {len(mentions.data)} seekers calling upon KOIYU")
-            print(f"Retrieved {len(mentions.data)} seekers calling upon KOIYU")
+        if job["kind"] in ("reply", "mention"):
+            result = reply_to_tweet(payload["tweet_id"], payload["text"], payload.get("author_id"),
+                                     random_reply=job["kind"] == "reply", resumed=was_interrupted(job))
         else:
-            logger.info("No seekers have called upon KOIYU")
-            print("No seekers have called upon KOIYU")
-        return mentions.data or []
+            result = post_tweet(payload["text"], resumed=was_interrupted(job))
+    except UNAVAILABLE_ERRORS:
+        # Nothing was sent; the job waits for the next run without using up an attempt
+        job_queue.release(job["id"])
+        raise
+    
+    if result:
+        job_queue.complete(job["id"], result.get("id"))
+        return True
+    fail_job(job, "post failed")
+    return False
+
+def run_post_job_by_key(key, kind, payload):
+    """Queue a post under a dedup key (reusing an existing job) and run it; returns True once it is on X"""
+    job = job_queue.enqueue(key, kind, payload)
+    if job["state"] == DONE:
+        return True
+    if job["state"] == FAILED:
+        job_queue.retry(job["id"])
+    claimed = job_queue.claim(job_id=job["id"])
+    return run_post_job(claimed) if claimed else False
+
+def reply_job(tweet, text):
+    """(dedup key, payload) of a random reply job"""
+    author_id = str(tweet.author_id) if tweet.author_id is not None else None
+    return f"reply:{tweet.id}", {"tweet_id": str(tweet.id), "author_id": author_id, "text": text}
+
+def queued_mention_replies(mentions):
+    """Replies generated for these mentions before a restart and not yet posted, by mention ID"""
+    queued = {}
+    for mention in mentions:
+        job = job_queue.get(f"mention:{mention['id']}")
+        if job and job["state"] != DONE:
+            queued[mention["id"]] = job["payload"]["text"]
+    return queued
+
+def get_mentions(since_id=None, until_id=None, page_budget=MENTION_PAGE_BUDGET):
+    """Page through mentions newer than since_id (and older than until_id) using v2 API.
+    
+    Returns (mentions, resume_id, pages). resume_id is set when the page budget ran
+    out (or a request failed) before reaching since_id; mentions older than it are
+    still unread.
+    """
+    mentions = []
+    state = {"pages": 0, "resume_id": None}
+    
+    def walk(user_id):
+        mentions.clear()
+        state["pages"] = 0
+        oldest_id = None
+        has_more = False
+        try:
+            for page in tweepy.Paginator(
+                client.get_users_mentions,
+                id=user_id,
+                since_id=since_id,
+                until_id=until_id,
+                max_results=MENTION_PAGE_SIZE,
+                tweet_fields=["author_id", "created_at"],
+                limit=page_budget
+            ):
+                # Track read operations
+                check_and_update_usage("read")
+                state["pages"] += 1
+                mentions.extend(page.data or [])
+                oldest_id = page.meta.get("oldest_id", oldest_id)
+                has_more = "next_token" in page.meta
+        except tweepy.Unauthorized:
+            raise
+        except Exception:
+            # Keep what we have; everything older than it is still unread
+            state["resume_id"] = oldest_id or until_id
+            raise
+        state["resume_id"] = oldest_id if has_more else None
+    
+    try:
+        with_identity_refresh(walk)
     except Exception as e:
         error_msg = f"Error retrieving mentions: {e}"
         logger.error(error_msg)
         print(error_msg)
-        return []
+    
+    if mentions:
+        logger.info(f"Retrieved {len(mentions)} seekers calling upon KOIYU")
+        print(f"Retrieved {len(mentions)} seekers calling upon KOIYU")
+    else:
+        logger.info("No seekers have called upon KOIYU")
+        print("No seekers have called upon KOIYU")
+    return mentions, state["resume_id"], state["pages"]
+
+def open_mention_queue(account):
+    """Open an account's mention queue, importing its legacy queue file on first use"""
+    queue = MentionQueue(ledger.instance(account))
+    queue.migrate_file(account.path(MENTION_QUEUE_FILE))
+    return queue
+
+# Durable queue of mentions waiting for a reply, in each account's ledger
+mention_queue = AccountLocal(open_mention_queue)
+mention_queue_lock = threading.RLock()
+
+def _mention_windows():
+    """Return (since_id, until_id, page_limit) ranges to read: new mentions first, then backlog gaps"""
+    cursor = max(int(mention_queue.newest_id() or 0), int(get_last_mention_id() or 0)) or None
+    
+    # Without any cursor, only look at the latest page instead of the whole history
+    windows = [(cursor, None, None if cursor else 1)]
+    windows += [(gap["since_id"], gap["until_id"], None) for gap in mention_queue.gaps()]
+    return windows
+
+def _mention_rows(mentions):
+    """Queue rows for fetched mentions"""
+    return [{
+        "id": str(mention.id),
+        "text": mention.text,
+        "author_id": str(mention.author_id) if getattr(mention, "author_id", None) else None
+    } for mention in mentions]
+
+def ingest_mentions(page_budget=MENTION_PAGE_BUDGET):
+    """Page through every unread mention (within the page budget) and queue them durably"""
+    with mention_queue_lock:
+        fetched = []
+        gaps = []
+        for since_id, until_id, limit in _mention_windows():
+            if page_budget <= 0:
+                # Out of budget; remember the range for the next run
+                if since_id or until_id:
+                    gaps.append({"since_id": since_id, "until_id": until_id})
+                continue
+            mentions, resume_id, pages = get_mentions(since_id, until_id, min(page_budget, limit or page_budget))
+            page_budget -= pages
+            fetched += mentions
+            if resume_id:
+                gaps.append({"since_id": since_id, "until_id": resume_id})
+        
+        added = mention_queue.ingest(_mention_rows(fetched), gaps)
+    
+    if added:
+        logger.info(f"Queued {added} new mentions")
+    return added
+
+def pending_mentions():
+    """Return queued mentions, oldest first"""
+    return mention_queue.pending()
+
+def mark_mention_handled(mention_id):
+    """Remove a mention from the queue once it is answered (or given up on) and advance last_mention_id past it"""
+    with mention_queue_lock:
+        mention_queue.remove(mention_id)
+        if int(mention_id) > int(get_last_mention_id() or 0):
+            save_last_mention_id(mention_id)
+
+def record_mention_attempt(mention_id):
+    """Count a failed reply attempt; drop the mention once it has failed too often"""
+    with mention_queue_lock:
+        attempts = mention_queue.record_attempt(mention_id)
+        if attempts >= MENTION_MAX_ATTEMPTS:
+            logger.warning(f"Giving up on mention {mention_id} after {attempts} attempts")
+            mark_mention_handled(mention_id)
 
 def generate_koiyu_reply(mention_text):
     """Generate a KOIYU reply to a mention"""
-    prompt = f"A seeker has approached you with these words: '{mention_text}'. Offer your wisdom in response, speaking as KOIYU."
-    return generate_koiyu_wisdom(prompt)
+    return generate_koiyu_replies([mention_text], "mention_reply")[0]
 
+# Ready-to-post buffer, refilled in the background so scheduled posts never wait on OpenAI
+WISDOM_BUFFER_DEPTH = int(os.getenv("WISDOM_BUFFER_DEPTH", "1"))  # Ready posts per theme
+STORY_BUFFER_DEPTH = int(os.getenv("STORY_BUFFER_DEPTH", "1"))  # Ready weekly parables
+BUFFER_REFILL_SECONDS = int(os.getenv("BUFFER_REFILL_SECONDS", "900"))
+STORY_PROMPT = "Tell a short parable about a koi fish's journey to the Dragon Gate. Include a lesson about life transformation and perseverance."
+
+content_store = AccountLocal(lambda account: ContentStore(ledger.instance(account)))
+
+# Non-urgent content can go through the OpenAI Batch API instead of live calls:
+# "openai" submits batches for real, "file" runs the same batch files through live calls
+BATCH_MODE = os.getenv("BATCH_MODE", "off").lower()
+REPLY_BUFFER_DEPTH = int(os.getenv("REPLY_BUFFER_DEPTH", "5"))  # Ready random replies (batch mode)
+REPLY_BUFFER_MAX_AGE_HOURS = int(os.getenv("REPLY_BUFFER_MAX_AGE_HOURS", "24"))
+
+def answer_batch_request(body):
+    """Answer one request of a file-backed batch with a live completion"""
+    return client_openai.chat.completions.create(**body).choices[0].message.content
+
+if BATCH_MODE == "openai":
+    batch_backend = OpenAIBatchBackend(client_openai)
+elif BATCH_MODE == "file":
+    # Without a responder nothing would ever write the batches' output files
+    batch_backend = FileBatchBackend(os.path.join(BASE_DIR, BATCH_DIR), responder=answer_batch_request)
+else:
+    batch_backend = None
+
+# Each account tracks its own batches; the backend (and its OpenAI client) is shared
+batch_runner = AccountLocal(
+    lambda account: BatchRunner(batch_backend, ledger.instance(account), account.path(BATCH_DIR))
+) if batch_backend else None
+
+def wisdom_prompt(theme):
+    """Build the prompt for a wisdom post about a theme"""
+    return f"Share profound wisdom about {theme}, speaking as {current_account().name.upper()}. Make it inspirational and thought-provoking."
+
+def buffer_targets():
+    """(key, prompt, depth) for every kind of buffered post"""
+    targets = [(f"wisdom:{theme}", wisdom_prompt(theme), WISDOM_BUFFER_DEPTH) for theme in account_themes()]
+    targets.append(("story", STORY_PROMPT, STORY_BUFFER_DEPTH))
+    return targets
+
+def content_type_for(key):
+    """Content type (model tier) of a buffer key"""
+    if key == "story":
+        return "story"
+    return "random_reply" if key.startswith("reply:") else "wisdom"
+
+def is_postable(text):
+    """Check that generated text can be posted as a single tweet"""
+    return fits(text)
+
+def collect_batch_results():
+    """Move finished batch results into the content buffer; returns how many were stored"""
+    stored = 0
+    for key, body in batch_runner.poll():
+        usage = body.get("usage") or {}
+        record_usage(
+            "openai",
+            model=body.get("model"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+            detail="batch"
+        )
+        try:
+            text = trim_to_tweet_length(body["choices"][0]["message"]["content"].strip())
+        except (KeyError, IndexError, TypeError, AttributeError):
+            logger.warning(f"Batch result for {key} had no content")
+            continue
+        if is_postable(text):
+            content_store.put(key, text, source="batch")
+            stored += 1
+    
+    if stored:
+        logger.info(f"Loaded {stored} batch-generated posts into the buffer")
+    return stored
+
+def submit_content_batch():
+    """Submit one batch covering everything the buffers are missing; returns the number of requests"""
+    in_flight = batch_runner.pending_counts()
+    items = []
+    for key, prompt, depth in buffer_targets():
+        missing = depth - content_store.count(key) - in_flight.get(key, 0)
+        items += [(key, completion_request(prompt, content_type_for(key)))] * max(0, missing)
+    
+    # Pre-generate replies for pooled candidates; stale ones are dropped before use
+    content_store.prune("reply:", REPLY_BUFFER_MAX_AGE_HOURS * 3600)
+    ready_replies = sum(content_store.counts("reply:").values())
+    in_flight_replies = sum(count for key, count in in_flight.items() if key.startswith("reply:"))
+    for candidate in take_candidates(max(0, REPLY_BUFFER_DEPTH - ready_replies - in_flight_replies)):
+        items.append((f"reply:{candidate.id}:{candidate.author_id}", completion_request(build_reply_prompt(candidate.text), "random_reply")))
+    
+    if items and batch_runner.submit(items):
+        return len(items)
+    return 0
+
+def refill_content_buffer():
+    """Top up the buffer of ready posts; stops early if generation fails.
+    
+    In batch mode this collects finished batches and submits a new one for
+    whatever is still missing, instead of generating live.
+    """
+    if batch_runner:
+        collect_batch_results()
+        submit_content_batch()
+        return 0
+    
+    generated = 0
+    for key, prompt, depth in buffer_targets():
+        while content_store.count(key) < depth:
+            text = generate_koiyu_wisdom(prompt, content_type_for(key))
+            if not is_postable(text):
+                logger.warning(f"Could not pre-generate content for {key}; will retry later")
+                return generated
+            content_store.put(key, text)
+            generated += 1
+    
+    if generated:
+        logger.info(f"Pre-generated {generated} posts for the wisdom buffer")
+    return generated
+
+def run_buffer_refiller(stop_event):
+    """Keep the wisdom buffer full during idle time (on the nodes that post for the account)"""
+    while not stop_event.is_set():
+        if not (coordinator.leader or serves_account()):
+            stop_event.wait(coordinator.ttl)
+            continue
+        
+        try:
+            refill_content_buffer()
+        except Exception as e:
+            logger.error(f"Error refilling wisdom buffer: {e}")
+        stop_event.wait(BUFFER_REFILL_SECONDS)
+
+def claim_buffered_wisdom():
+    """Claim a ready wisdom post for a random theme; returns (theme, (content_id, text)) or (None, None)"""
+    ready = content_store.counts("wisdom:")
+    if not ready:
+        return None, None
+    key = random.choice(list(ready))
+    return key.split(":", 1)[1], claim_unique(key)
+
+def claim_unique(key):
+    """Claim buffered content for key, discarding entries that duplicate an earlier post"""
+    while True:
+        entry = content_store.claim(key)
+        if not entry or not is_duplicate_content(entry[1]):
+            return entry
+
+def claim_buffered_replies(count):
+    """Claim up to count pre-generated random replies; returns [(candidate, text)]"""
+    claimed = []
+    for key in content_store.counts("reply:"):
+        if len(claimed) >= count:
+            break
+        _, tweet_id, author_id = key.split(":", 2)
+        author_id = None if author_id == "None" else author_id
+        entry = content_store.claim(key)
+        # Claimed and dropped if the tweet or author has been answered since
+        if (not entry or reply_index.has_replied(tweet_id) or reply_index.author_on_cooldown(author_id)
+                or is_duplicate_content(entry[1])):
+            continue
+        claimed.append((Candidate(tweet_id, "", author_id, "batch", 0, time.time()), entry[1]))
+    return claimed
+
+def daily_wisdom_key():
+    """Dedup key of today's wisdom post"""
+    return f"wisdom:{datetime.now().strftime('%Y-%m-%d')}"
+
+def leads_daily_posts():
+    """True if this node is the elected leader, which makes the daily posts for every account"""
+    if coordinator.is_leader():
+        return True
+    logger.info(f"Node {coordinator.leader_id()} leads the daily posts; nothing to do here.")
+    return False
+
+def existing_scheduled_post(key, what):
+    """(handled, job) for a scheduled post's dedup key.
+    
+    handled is True if it was already shared (by this node or another one);
+    job is set if it was generated before a restart and still waits to be posted.
+    """
+    if coordinator.claimed_elsewhere(work_key(key)):
+        logger.info(f"{what} has already been shared by another node.")
+        return True, None
+    job = job_queue.get(key)
+    if job and job["state"] == DONE:
+        logger.info(f"{what} has already been shared.")
+        return True, None
+    if job:
+        logger.info(f"Resuming {what.lower()} from the job queue")
+    return False, job
+
+@with_rate_limit_handling
 def scheduled_koiyu_wisdom():
-    """Create and post scheduled KOIYU wisdom"""
-    # Choose a random theme for today's wisdom
-    theme = random.choice(KOIYU_THEMES)
+    """Create and post scheduled KOIYU wisdom (at most once a day, on the leader node)"""
+    if not leads_daily_posts():
+        return False
+    handled, job = existing_scheduled_post(daily_wisdom_key(), "Today's wisdom")
+    if handled:
+        return True
+    if job:
+        return run_post_job_by_key(job["key"], "post", job["payload"])
+    
+    # Serve a pre-generated post when one is ready
+    theme, claimed = claim_buffered_wisdom()
+    if not claimed:
+        # Choose a random theme for today's wisdom
+        theme = random.choice(account_themes())
     
     # Log the attempt with timestamp
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     logger.info(f"Attempting to generate and post KOIYU wisdom about {theme}...")
     print(f"[{current_time}] Attempting to generate and post KOIYU wisdom about {theme}...")
     
-    prompt = f"Share profound wisdom about {theme}, speaking as KOIYU. Make it inspirational and thought-provoking."
-    wisdom = generate_koiyu_wisdom(prompt)
+    if claimed:
+        _, wisdom = claimed
+        logger.info("Serving wisdom from the pre-generated buffer")
+    else:
+        wisdom = generate_koiyu_wisdom(wisdom_prompt(theme))
     
     if wisdom:
         logger.info(f"Generated wisdom: {wisdom}")
         print(f"[{current_time}] Generated wisdom: {wisdom}")
-        result = post_tweet(wisdom)
-        if result:
+        # The job queue owns the text from here on, so a failed post is retried without regenerating
+        if run_post_job_by_key(daily_wisdom_key(), "post", {"text": wisdom, "theme": theme}):
             logger.info(f"KOIYU's daily wisdom has been shared with the world successfully!")
             print(f"[{current_time}] KOIYU's daily wisdom has been shared with the world successfully!")
             return True
@@ -427,62 +1291,109 @@ def scheduled_koiyu_wisdom():
     
     return False
 
+def weekly_story_key():
+    """Dedup key of this week's story"""
+    year, week, _ = datetime.now().isocalendar()
+    return f"story:{year}-W{week:02d}"
+
+@with_rate_limit_handling
 def weekly_koiyu_story():
-    """Share a deeper piece of KOIYU lore weekly"""
-    prompt = "Tell a short parable about a koi fish's journey to the Dragon Gate. Include a lesson about life transformation and perseverance."
-    story = generate_koiyu_wisdom(prompt)
+    """Share a deeper piece of KOIYU lore (at most once a week, on the leader node)"""
+    if not leads_daily_posts():
+        return False
+    handled, job = existing_scheduled_post(weekly_story_key(), "This week's story")
+    if handled:
+        return True
+    if job:
+        return run_post_job_by_key(job["key"], "post", job["payload"])
     
-    if story:
-        post_tweet(story)
+    # Serve a pre-generated story when one is ready
+    claimed = claim_unique("story")
+    story = claimed[1] if claimed else generate_koiyu_wisdom(STORY_PROMPT, "story")
+    if not story:
+        logger.error("Failed to generate KOIYU's weekly story.")
+        return False
+    
+    # The job queue owns the text from here on, so a failed post is retried without regenerating
+    if run_post_job_by_key(weekly_story_key(), "post", {"text": story}):
+        logger.info("KOIYU's weekly story has been shared with the world!")
         return True
+    logger.error("Failed to post KOIYU's weekly story.")
     return False
 
-def auto_reply_to_mentions(max_replies=2):
-    """Automatically reply to mentions without manual confirmation (limited to max_replies)"""
+def mentions_for_this_node(mentions):
+    """Mentions this node answers; those another node has already answered leave the queue"""
+    owned = []
+    for mention in mentions:
+        if coordinator.owns_tweet(mention["id"]):
+            owned.append(mention)
+        elif coordinator.claimed_elsewhere(work_key(f"mention:{mention['id']}")):
+            mark_mention_handled(mention["id"])
+    return owned
+
+def unanswered_mentions(mentions):
+    """Mentions this node still has to answer; ones already answered (e.g. before a restart) leave the queue"""
+    for mention in mentions:
+        if reply_index.has_replied(mention["id"]):
+            mark_mention_handled(mention["id"])
+    return mentions_for_this_node([m for m in mentions if not reply_index.has_replied(m["id"])])
+
+@with_rate_limit_handling
+def auto_reply_to_mentions(max_replies=None):
+    """Automatically reply to queued mentions without manual confirmation.
+    
+    New mentions are ingested first; then the queue is drained oldest-first, up to
+    max_replies if given. A mention leaves the queue only once it has been handled.
+    """
     try:
-        # Get the ID of the last mention we processed
-        last_mention_id = get_last_mention_id()
-        
-        # Get recent mentions
-        mentions = get_mentions(max_results=10, since_id=last_mention_id)
+        ingest_mentions()
+        mentions = pending_mentions()
         
         if not mentions:
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"No new seekers of wisdom have called upon KOIYU.")
             print(f"[{current_time}] No new seekers of wisdom have called upon KOIYU.")
             return False
-            
-        # Process mentions (newest first)
-        mentions.reverse()
         
-        # Limit the number of replies per run to avoid excessive API usage
+        mentions = unanswered_mentions(mentions)
+        
+        if max_replies is not None and len(mentions) > max_replies:
+            logger.info(f"Reached maximum of {max_replies} replies for this session.")
+            print(f"Reached maximum of {max_replies} replies for this session.")
+            mentions = mentions[:max_replies]
+        
+        # Replies generated before a restart are reused; the rest share as few OpenAI calls as possible
+        queued = queued_mention_replies(mentions)
+        fresh = [mention for mention in mentions if mention["id"] not in queued]
+        generated = generate_koiyu_replies([mention["text"] for mention in fresh], "mention_reply") if fresh else []
+        queued.update((mention["id"], reply) for mention, reply in zip(fresh, generated))
+        replies = [queued.get(mention["id"]) for mention in mentions]
         replies_made = 0
         
-        for mention in mentions:
-            # Stop if we've reached our limit for this run
-            if replies_made >= max_replies:
-                logger.info(f"Reached maximum of {max_replies} replies for this session.")
-                print(f"Reached maximum of {max_replies} replies for this session.")
-                save_last_mention_id(mention.id)  # Save the last processed ID
+        for mention, wisdom_reply in zip(mentions, replies):
+            # Leave the rest queued until the monthly budget allows more posts
+            if monthly_post_limit_reached():
+                logger.warning("Monthly post limit reached; leaving mentions queued.")
                 break
-                
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            logger.info(f"A seeker calls upon KOIYU: {mention.text}")
-            print(f"[{current_time}] A seeker calls upon KOIYU: {mention.text}")
             
-            # Generate a reply using KOIYU's wisdom
-            wisdom_reply = generate_koiyu_reply(mention.text)
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            logger.info(f"A seeker calls upon KOIYU: {mention['text']}")
+            print(f"[{current_time}] A seeker calls upon KOIYU: {mention['text']}")
             
-            if wisdom_reply:
-                result = reply_to_tweet(mention.id, wisdom_reply)
-                if result:
-                    logger.info("KOIYU has responded to the seeker with wisdom!")
-                    print(f"KOIYU has responded to the seeker with wisdom!")
-                    replies_made += 1
+            result = run_post_job_by_key(
+                f"mention:{mention['id']}", "mention", {"tweet_id": mention["id"], "text": wisdom_reply}
+            ) if wisdom_reply else None
             
-            # Update the last processed mention ID
-            save_last_mention_id(mention.id)
+            if result:
+                logger.info("KOIYU has responded to the seeker with wisdom!")
+                print(f"KOIYU has responded to the seeker with wisdom!")
+                replies_made += 1
+                mark_mention_handled(mention["id"])
+            else:
+                record_mention_attempt(mention["id"])
             
+    except UNAVAILABLE_ERRORS:
+        raise  # Skipped by with_rate_limit_handling; the mentions stay queued
     except Exception as e:
         error_msg = f"Error while KOIYU was communing with seekers: {e}"
         logger.error(error_msg)
@@ -491,215 +1402,278 @@ def auto_reply_to_mentions(max_replies=2):
     
     return True
 
-def with_rate_limit_handling(func):
-    """Decorator to handle Twitter API rate limits"""
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            # Check if it's a rate limit error
-            if hasattr(e, 'response') and e.response and e.response.status_code == 429:
-                retry_after = int(e.response.headers.get('x-rate-limit-reset', 60))
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                logger.warning(f"Rate limited! Waiting for {retry_after} seconds.")
-                print(f"[{current_time}] ⚠️ KOIYU has reached the river's edge. Waiting {retry_after} seconds before continuing...")
-                time.sleep(retry_after)
-                # Try again after waiting
-                return func(*args, **kwargs)
-            else:
-                # Re-raise other exceptions
-                raise e
-    return wrapper
+# Mention responder polling: fast while seekers are active, backing off when idle
+MENTION_POLL_MIN_SECONDS = int(os.getenv("MENTION_POLL_MIN_SECONDS", "60"))
+MENTION_POLL_MAX_SECONDS = int(os.getenv("MENTION_POLL_MAX_SECONDS", "900"))
+MONTHLY_READ_LIMIT = int(os.getenv("MONTHLY_READ_LIMIT", "10000"))
+MENTION_READ_SHARE = float(os.getenv("MENTION_READ_SHARE", "0.5"))  # Share of remaining reads for mention polls
 
-@with_rate_limit_handling
-def get_tweets_from_following(max_results=20):
-    """Get recent tweets from accounts the user is following"""
-    try:
-        # First, get the list of accounts we're following
-        user_id = client.get_me().data.id
-        following = client.get_users_following(id=user_id, max_results=50)
-        
-        if not following.data:
-            logger.info("No accounts found in following list")
-            print("No accounts found in following list")
-            return None
-            
-        # Get the user IDs of accounts we're following
-        following_ids = [user.id for user in following.data]
-        
-        # Randomly select a user to get tweets from
-        selected_user_id = random.choice(following_ids)
-        
-        # Get recent tweets from this user
-        tweets = client.get_users_tweets(
-            id=selected_user_id,
-            max_results=10,
-            exclude=['retweets', 'replies'],
-            tweet_fields=["id", "text", "created_at", "author_id"]
-        )
-        
-        if not tweets.data:
-            logger.info(f"No recent tweets found from selected user")
-            print(f"No recent tweets found from selected user")
-            return None
-            
-        # Pick a random tweet from this user
-        tweet = random.choice(tweets.data)
-        
-        # Get the user's username for better logging
-        user_info = client.get_user(id=selected_user_id)
-        username = user_info.data.username if user_info.data else "unknown"
+def mention_poll_budget_interval():
+    """Average poll interval that keeps mention polling within its share of the remaining monthly reads"""
+    stats = load_usage_stats()
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    
+    reads_used = stats["reads_count"] if stats["last_reset"] == now.strftime("%Y-%m") else 0
+    reads_left = (MONTHLY_READ_LIMIT - reads_used) * MENTION_READ_SHARE
+    if reads_left < 1:
+        return (next_month - now).total_seconds()
+    return (next_month - now).total_seconds() / reads_left
+
+def next_mention_poll_interval(current_interval, active):
+    """Pick the next poll interval: reset when mentions arrive, double when idle, within the read budget"""
+    budget_interval = mention_poll_budget_interval()
+    if active:
+        # Idle backoff banks reads, so short bursts may poll faster than the monthly average
+        return max(MENTION_POLL_MIN_SECONDS, budget_interval / 4)
+    return max(min(current_interval * 2, MENTION_POLL_MAX_SECONDS), budget_interval)
+
+def serves_account():
+    """True if this node does the active account's mention and reply work (see coordination.SHARD_BY)"""
+    return coordinator.owns_account(current_account().name)
+
+def run_mention_responder(stop_event):
+    """Continuously answer mentions on an adaptive polling interval"""
+    logger.info("KOIYU's mention responder is listening for seekers...")
+    print("👂 KOIYU's mention responder is listening for seekers...")
+    
+    interval = MENTION_POLL_MIN_SECONDS
+    while not stop_event.is_set():
+        # Another node answers this account's mentions while the account is sharded to it
+        if not serves_account():
+            stop_event.wait(coordinator.ttl)
+            continue
         
-        logger.info(f"Found tweet from @{username}: {tweet.text}")
-        print(f"Found tweet from @{username}: {tweet.text}")
+        try:
+            active = auto_reply_to_mentions()
+        except Exception as e:
+            logger.error(f"Error in mention responder: {e}")
+            active = False
         
-        return tweet
-    except Exception as e:
-        error_msg = f"Error fetching tweets from following: {e}"
-        logger.error(error_msg)
-        print(error_msg)
-        return None
+        interval = next_mention_poll_interval(interval, active)
+        debug_log(f"Next mention poll in {interval:.0f} seconds")
+        stop_event.wait(interval)
 
-@with_rate_limit_handling
-def find_random_tweet_to_reply():
-    """Find a random tweet to reply to from accounts we're following or by keywords"""
-    try:
-        logger.info("Searching for tweets from accounts KOIYU follows...")
-        print("Searching for tweets from accounts KOIYU follows...")
-        
-        # First try to get tweets from accounts we're following
+# Local caches for candidate selection: TTL expiry plus LRU eviction when full
+FOLLOWING_CACHE_TTL = int(os.getenv("FOLLOWING_CACHE_TTL", str(6 * 3600)))
+FOLLOWING_PAGE_BUDGET = int(os.getenv("FOLLOWING_PAGE_BUDGET", "5"))  # Pages of followed accounts fetched per refresh
+FOLLOWING_PAGE_SIZE = 1000  # Maximum allowed by get_users_following
+TIMELINE_REFRESH_SECONDS = int(os.getenv("TIMELINE_REFRESH_SECONDS", "1800"))
+TIMELINE_CACHE_SIZE = int(os.getenv("TIMELINE_CACHE_SIZE", "200"))
+TIMELINE_MAX_TWEETS = 20
+
+following_cache = AccountLocal(lambda account: TTLCache(maxsize=1, ttl=FOLLOWING_CACHE_TTL))  # "ids" -> followed user IDs
+user_cache = TTLCache(maxsize=2000, ttl=24 * 3600)  # user ID -> username
+timeline_cache = TTLCache(maxsize=TIMELINE_CACHE_SIZE, ttl=24 * 3600)  # user ID -> timeline entry
+cache_lock = threading.RLock()
+
+def _store_following(users):
+    """Cache the followed accounts and their usernames"""
+    with cache_lock:
+        following_cache["ids"] = [user.id for user in users]
+        for user in users:
+            user_cache[user.id] = user.username
+        return following_cache["ids"]
+
+def _timeline_since_id(user_id):
+    """Return (fresh, since_id) for a cached timeline"""
+    with cache_lock:
+        entry = timeline_cache.get(user_id)
+    if not entry:
+        return False, None
+    return time.time() - entry["fetched_at"] < TIMELINE_REFRESH_SECONDS, entry["newest_id"]
+
+def _store_timeline(user_id, response):
+    """Merge newly fetched tweets (and expanded authors) into a cached timeline"""
+    for user in (response.includes or {}).get("users", []):
+        with cache_lock:
+            user_cache[user.id] = user.username
+    
+    with cache_lock:
+        entry = timeline_cache.get(user_id) or {"tweets": [], "newest_id": None}
+        new_tweets = list(response.data or [])
+        tweets = (new_tweets + entry["tweets"])[:TIMELINE_MAX_TWEETS]
+        newest_id = (response.meta or {}).get("newest_id") or entry["newest_id"]
+        timeline_cache[user_id] = {"tweets": tweets, "newest_id": newest_id, "fetched_at": time.time()}
+        return tweets
+
+def get_following_ids():
+    """Return followed account IDs, downloading the list only when the cache has expired"""
+    with cache_lock:
+        ids = following_cache.get("ids")
+    if ids is not None:
+        return ids
+    
+    def walk(user_id):
+        users = []
+        for page in tweepy.Paginator(
+            client.get_users_following,
+            id=user_id,
+            max_results=FOLLOWING_PAGE_SIZE,
+            limit=FOLLOWING_PAGE_BUDGET
+        ):
+            check_and_update_usage("read")
+            users.extend(page.data or [])
+        return users
+    
+    return _store_following(with_identity_refresh(walk))
+
+def get_user_timeline(user_id):
+    """Return recent tweets for a user, fetching only tweets newer than the cached ones"""
+    fresh, since_id = _timeline_since_id(user_id)
+    if fresh:
+        with cache_lock:
+            return timeline_cache[user_id]["tweets"]
+    
+    check_and_update_usage("read")
+    response = client.get_users_tweets(
+        id=user_id,
+        max_results=10,
+        since_id=since_id,
+        exclude=['retweets', 'replies'],
+        tweet_fields=["id", "text", "created_at", "author_id"],
+        expansions=["author_id"],
+        user_fields=["username"]
+    )
+    return _store_timeline(user_id, response)
+
+def fetch_tweets_from_following():
+    """Fetch a batch of recent tweets from one randomly chosen followed account"""
+    # First, get the list of accounts we're following
+    following_ids = get_following_ids()
+    
+    if not following_ids:
+        logger.info("No accounts found in following list")
+        print("No accounts found in following list")
+        return []
+    
+    # Randomly select a user to get tweets from
+    selected_user_id = random.choice(following_ids)
+    
+    # Get recent tweets from this user (served from memory while fresh)
+    tweets = get_user_timeline(selected_user_id)
+    
+    if not tweets:
+        logger.info(f"No recent tweets found from selected user")
+        print(f"No recent tweets found from selected user")
+        return []
+    
+    with cache_lock:
+        username = user_cache.get(selected_user_id, "unknown")
+    
+    logger.info(f"Fetched {len(tweets)} tweets from @{username}")
+    print(f"Fetched {len(tweets)} tweets from @{username}")
+    
+    return list(tweets)
+
+def fetch_tweets_by_keywords():
+    """Fetch a batch of recent tweets matching one random KOIYU keyword"""
+    # Keywords related to KOIYU's themes
+    keywords = ["HODL", "WAGMI", "DeFi", "Web3", "Crypto", 
+               "$IP", "StoryProtocol", "$SOL", "$ETH", "Ai Agent"]
+    
+    # Pick a random keyword
+    keyword = random.choice(keywords)
+    logger.info(f"Falling back to keyword search for '{keyword}'...")
+    print(f"Falling back to keyword search for '{keyword}'...")
+    
+    # Search for tweets with this keyword
+    query = f"{keyword} -is:retweet -is:reply lang:en"
+    tweets = client.search_recent_tweets(
+        query=query,
+        max_results=10,
+        tweet_fields=["id", "text", "created_at", "author_id"]
+    )
+    
+    if not tweets.data:
+        logger.info(f"No tweets found about '{keyword}'")
+        print(f"No tweets found about '{keyword}'")
+        return []
+    
+    return list(tweets.data)
+
+def take_candidates(count):
+    """Pop up to `count` pooled candidates, dropping tweets sharded to other nodes"""
+    return [candidate for candidate in candidate_pool.pop(count) if coordinator.owns_tweet(candidate.id)]
+
+def find_reply_candidates(count=5):
+    """Collect up to `count` unanswered tweets, drawing from the candidate pool before searching"""
+    candidates = take_candidates(count)
+    
+    # One timeline fetch from a followed account usually refills the pool for a whole batch
+    if len(candidates) < count:
         try:
-            tweet = get_tweets_from_following(max_results=10)
-            if tweet:
-                return tweet
+            candidate_pool.add(fetch_tweets_from_following(), "following")
+            candidates += take_candidates(count - len(candidates))
         except Exception as e:
             error_msg = f"Error accessing following list: {e}"
             logger.warning(error_msg)
             print(f"⚠️ {error_msg}")
-            logger.info("Falling back to keyword search due to following list access error.")
-            print("Falling back to keyword search due to following list access error.")
-        
-        # If nothing found from following or an error occurred, fall back to keyword search
-        logger.info("Attempting to find tweets by keyword search...")
-        print("Attempting to find tweets by keyword search...")
-        
-        tweet = search_tweets_by_keywords()
-        if tweet:
-            return tweet
-        
-        logger.warning("No suitable tweets found via following list or keywords.")
-        print("No suitable tweets found via following list or keywords.")
-        return None
-            
-    except Exception as e:
-        error_msg = f"Error searching for tweets: {e}"
-        logger.error(error_msg)
-        print(error_msg)
-        return None
+    
+    # Top up from a single keyword search if the pool is still short
+    if len(candidates) < count:
+        try:
+            candidate_pool.add(fetch_tweets_by_keywords(), "keyword")
+            candidates += take_candidates(count - len(candidates))
+        except Exception as e:
+            error_msg = f"Error in keyword search: {e}"
+            logger.warning(error_msg)
+            print(f"⚠️ {error_msg}")
+    
+    return candidates
 
-# Optional fallback function if no tweets found from following
-@with_rate_limit_handling
-def search_tweets_by_keywords():
-    """Search for tweets using keywords as a fallback"""
-    try:
-        # Keywords related to KOIYU's themes
-        keywords = ["HODL", "WAGMI", "DeFi", "Web3", "Crypto", 
-                   "$IP", "StoryProtocol", "$SOL", "$ETH", "Ai Agent"]
-        
-        # Pick a random keyword
-        keyword = random.choice(keywords)
-        logger.info(f"Falling back to keyword search for '{keyword}'...")
-        print(f"Falling back to keyword search for '{keyword}'...")
-        
-        # Search for tweets with this keyword
-        query = f"{keyword} -is:retweet -is:reply lang:en"
-        tweets = client.search_recent_tweets(
-            query=query,
-            max_results=10,
-            tweet_fields=["id", "text", "created_at"]
-        )
-        
-        if not tweets.data:
-            logger.info(f"No tweets found about '{keyword}'")
-            print(f"No tweets found about '{keyword}'")
-            return None
-            
-        # Pick a random tweet from the results
-        tweet = random.choice(tweets.data)
-        logger.info(f"Found tweet: {tweet.text}")
-        print(f"Found tweet: {tweet.text}")
-        
-        return tweet
-    except Exception as e:
-        error_msg = f"Error in keyword search: {e}"
-        logger.error(error_msg)
-        print(error_msg)
-        return None
+def build_reply_prompt(tweet_text):
+    """Build the prompt used to answer a seeker's tweet"""
+    return f"A seeker has shared these thoughts: '{tweet_text}'. Offer your wisdom in response, speaking as {current_account().name.upper()}."
 
-def reply_to_random_tweet():
-    """Find and reply to a random tweet"""
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    logger.info(f"Looking for a tweet to respond to...")
-    print(f"[{current_time}] Looking for a tweet to respond to...")
+def generate_replies_concurrently(tweets):
+    """Generate KOIYU replies for several tweets, batching them into shared OpenAI calls.
     
-    tweet = find_random_tweet_to_reply()
-    if not tweet:
-        logger.info(f"Could not find a suitable tweet to reply to.")
-        print(f"[{current_time}] Could not find a suitable tweet to reply to.")
-        return False
-        
-    # Generate a reply
-    logger.info(f"Generating response to tweet: {tweet.text}")
-    print(f"[{current_time}] Generating response to tweet: {tweet.text}")
-    prompt = f"A seeker has shared these thoughts: '{tweet.text}'. Offer your wisdom in response, speaking as KOIYU."
-    wisdom_reply = generate_koiyu_wisdom(prompt)
-    
-    if wisdom_reply:
-        logger.info(f"Generated response: {wisdom_reply}")
-        print(f"[{current_time}] Generated response: {wisdom_reply}")
-        result = reply_to_tweet(tweet.id, wisdom_reply)
-        if result:
-            logger.info(f"KOIYU has shared wisdom with a seeker in the stream!")
-            print(f"[{current_time}] KOIYU has shared wisdom with a seeker in the stream!")
-            return True
-        else:
-            logger.info(f"Failed to post KOIYU's response.")
-            print(f"[{current_time}] Failed to post KOIYU's response.")
-    else:
-        logger.info(f"Failed to generate KOIYU's response.")
-        print(f"[{current_time}] Failed to generate KOIYU's response.")
+    Batches of REPLY_BATCH_SIZE run concurrently on a bounded worker pool.
+    """
+    if not tweets:
+        return []
     
-    return False
+    chunks = [tweets[i:i + REPLY_BATCH_SIZE] for i in range(0, len(tweets), REPLY_BATCH_SIZE)]
+    workers = max(1, min(REPLY_GENERATION_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        replies = [reply for chunk_replies in executor.map(
+            bind(lambda chunk: generate_koiyu_replies([tweet.text for tweet in chunk])),
+            chunks
+        ) for reply in chunk_replies]
+    
+    return list(zip(tweets, replies))
 
 def check_and_reply_to_mentions():
     """Check for new mentions and reply with KOIYU wisdom (interactive version)"""
     try:
-        # Get the ID of the last mention we processed
-        last_mention_id = get_last_mention_id()
-        
-        # Get recent mentions
-        mentions = get_mentions(max_results=10, since_id=last_mention_id)
+        ingest_mentions()
+        mentions = pending_mentions()
         
         if not mentions:
             logger.info("No new seekers of wisdom have called upon KOIYU.")
             print("No new seekers of wisdom have called upon KOIYU.")
             return
-            
-        # Process mentions (newest first)
-        mentions.reverse()
         
         for mention in mentions:
-            logger.info(f"A seeker calls upon KOIYU: {mention.text}")
-            print(f"A seeker calls upon KOIYU: {mention.text}")
+            logger.info(f"A seeker calls upon KOIYU: {mention['text']}")
+            print(f"A seeker calls upon KOIYU: {mention['text']}")
             
             # Generate a reply using KOIYU's wisdom
-            wisdom_reply = generate_koiyu_reply(mention.text)
+            wisdom_reply = generate_koiyu_reply(mention["text"])
+            if not wisdom_reply:
+                record_mention_attempt(mention["id"])
+                continue
             
-            if wisdom_reply and input(f"\nReply to this seeker with KOIYU's wisdom? (y/n): ").lower() == 'y':
-                reply_to_tweet(mention.id, wisdom_reply)
-            
-            # Update the last processed mention ID
-            save_last_mention_id(mention.id)
+            if input(f"\nReply to this seeker with KOIYU's wisdom? (y/n): ").lower() != 'y':
+                # Seen and deliberately left unanswered
+                mark_mention_handled(mention["id"])
+            elif reply_to_tweet(mention["id"], wisdom_reply):
+                mark_mention_handled(mention["id"])
+            else:
+                # Stays queued for another try, up to MENTION_MAX_ATTEMPTS
+                record_mention_attempt(mention["id"])
             
     except Exception as e:
         error_msg = f"Error while KOIYU was communing with seekers: {e}"
@@ -708,116 +1682,191 @@ def check_and_reply_to_mentions():
 
 
 
+# Sleeps until the next deadline and runs jobs on a worker pool, so a slow
+# job (e.g. the analytics report) never holds up the daily post. Each job's last
+# run is kept in the shared ledger, so runs missed during a restart are caught up.
+scheduler = Scheduler(store=shared_ledger)
+
 def run_scheduler():
-    """Run the scheduler in the background"""
+    """Run the scheduler in the background (returns after scheduler.stop())"""
     logger.info("KOIYU's scheduling system activated.")
     print("🕒 KOIYU's scheduling system activated.")
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     logger.info(f"KOIYU begins watching the Dragon Gate...")
     print(f"[{current_time}] KOIYU begins watching the Dragon Gate...")
     
-    next_job_check_time = time.time() + 3600  # Check next job in 1 hour
+    next_job = scheduler.next_run()
+    if next_job:
+        time_until = (next_job - datetime.now()).total_seconds() / 60
+        print(f"🔮 Next scheduled job: {next_job.strftime('%Y-%m-%d %H:%M:%S')} (in {time_until:.1f} minutes)")
     
-    while True:
-        schedule.run_pending()
-        
-        # Periodically log the next scheduled job for debugging
-        if time.time() > next_job_check_time:
-            try:
-                next_job = schedule.next_run()
-                time_until = (next_job - datetime.now()).total_seconds() / 60
-                logger.info(f"Next scheduled job: {next_job.strftime('%Y-%m-%d %H:%M:%S')} "
-                           f"(in {time_until:.1f} minutes)")
-                print(f"🔮 Next scheduled job: {next_job.strftime('%Y-%m-%d %H:%M:%S')} "
-                     f"(in {time_until:.1f} minutes)")
-            except Exception as e:
-                logger.error(f"Error checking next job: {e}")
-            
-            next_job_check_time = time.time() + 3600  # Check again in 1 hour
-        
-        time.sleep(60)  # Check every minute
+    scheduler.run()
+
+# KOIYU's daily rhythm (UTC), shared by the threaded and asyncio schedulers. Every
+# scheduled job catches up missed runs once (CATCH_UP_ONCE), including runs missed
+# while the process was down.
+# Random replies are not on fixed times, so there is no reply batch job to skip missed
+# runs; the reply planner spreads them over the day and, after a pause, recomputes its
+# gaps from what is left of today's quota instead of replaying what it missed.
+DAILY_WISDOM_TIME = "12:00"
+WISDOM_CHECK_TIME = "12:30"
+WEEKLY_STORY_DAY = "sunday"
+WEEKLY_STORY_TIME = "15:00"
+ANALYTICS_REPORT_DAY = "monday"
+ANALYTICS_REPORT_TIME = "09:00"
 
 def setup_scheduler():
-    """Set up KOIYU's posting schedule"""
+    """Set up the posting schedule of every account (their jobs share the scheduler's worker pool)"""
     # Clear any existing jobs
-    schedule.clear()
+    scheduler.clear()
+    
+    for account in accounts:
+        # Schedule one daily wisdom post at noon (specify UTC to be clear)
+        # The scheduler uses local server time, which for Render is UTC
+        noon_utc = DAILY_WISDOM_TIME
+        scheduler.add(f"{account.name}:daily_wisdom", noon_utc, bind(scheduled_koiyu_wisdom, account))
+        
+        # Schedule a check to ensure daily wisdom gets posted
+        # This is a fallback in case the noon post is missed
+        scheduler.add(f"{account.name}:wisdom_check", WISDOM_CHECK_TIME, bind(ensure_daily_wisdom_posted, account))
+        
+        # Weekly parable, served from the story buffer
+        scheduler.add(f"{account.name}:weekly_story", WEEKLY_STORY_TIME, bind(weekly_koiyu_story, account),
+                      weekday=WEEKLY_STORY_DAY)
+        
+        # Weekly analytics report
+        scheduler.add(f"{account.name}:analytics_report", ANALYTICS_REPORT_TIME,
+                      bind(generate_analytics_report, account), weekday=ANALYTICS_REPORT_DAY)
     
-    # Schedule one daily wisdom post at noon (specify UTC to be clear)
-    # By default, schedule uses local server time, which for Render is UTC
-    noon_utc = "12:00"
-    schedule.every().day.at(noon_utc).do(scheduled_koiyu_wisdom)
-    logger.info(f"Daily wisdom scheduled for {noon_utc} UTC")
-    print(f"📝 Daily wisdom scheduled for {noon_utc} UTC")
+    logger.info(f"Daily wisdom scheduled for {DAILY_WISDOM_TIME} UTC for {len(accounts)} account(s)")
+    print(f"📝 Daily wisdom scheduled for {DAILY_WISDOM_TIME} UTC for {len(accounts)} account(s)")
     
     # Log current server time for reference
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     logger.info(f"Current server time is {current_time} (UTC)")
     print(f"🕒 Current server time is {current_time} (UTC)")
     
-    # Schedule 50 replies to random tweets spread throughout the day
-    reply_times = [
-        "01:30", "04:00", "06:30", "09:00", "11:30",
-        "14:00", "16:30", "19:00", "21:30", "23:45"
-    ]
-    
-    for reply_time in reply_times:
-        # Schedule a batch of 5 replies at each time slot
-        schedule.every().day.at(reply_time).do(batch_random_replies, batch_size=5)
-        logger.info(f"Batch of 5 random replies scheduled for {reply_time} UTC")
-        print(f"🔍 Batch of 5 random replies scheduled for {reply_time} UTC")
-    
-    # Schedule a check to ensure daily wisdom gets posted
-    # This is a fallback in case the noon post is missed
-    schedule.every().day.at("12:30").do(ensure_daily_wisdom_posted)
-    logger.info("Daily wisdom verification scheduled for 12:30 UTC")
+    logger.info(f"Daily wisdom verification scheduled for {WISDOM_CHECK_TIME} UTC")
+    logger.info(f"Weekly story scheduled for {WEEKLY_STORY_DAY}s at {WEEKLY_STORY_TIME} UTC")
+    logger.info(f"Analytics report scheduled for {ANALYTICS_REPORT_DAY}s at {ANALYTICS_REPORT_TIME} UTC")
     
-    return schedule.get_jobs()
+    return scheduler.get_jobs()
 
-def ensure_daily_wisdom_posted():
-    """Check if a wisdom post was made today, and make one if not"""
+def wisdom_posted_today():
+    """Return True if a post has been made today (before a restart, or by another node, too)"""
     stats = load_usage_stats()
     today = datetime.now().strftime("%Y-%m-%d")
-    
+    job = job_queue.get(daily_wisdom_key())
+    return (stats.get("daily_posts", {}).get(today, 0) > 0 or bool(job and job["state"] == DONE)
+            or coordinator.claimed_elsewhere(work_key(daily_wisdom_key())))
+
+def resume_jobs():
+    """Hand work interrupted by a restart back to the queue and clear out old jobs"""
+    job_queue.recover()
+    job_queue.prune(JOB_RETENTION_DAYS * 24 * 3600)
+
+def ensure_daily_wisdom_posted():
+    """Check if a wisdom post was made today, and make one if not"""
     # Check if we've already posted today
-    if today in stats.get("daily_posts", {}) and stats["daily_posts"][today] > 0:
+    if wisdom_posted_today():
         logger.info("Daily wisdom already posted today. No action needed.")
         return False
+    if not leads_daily_posts():
+        return False
     
     # If no post yet today, create one now
     logger.info("No daily wisdom detected for today. Creating one now as a backup.")
     print("🔄 No daily wisdom detected for today. Creating one now as a backup.")
     return scheduled_koiyu_wisdom()
 
-def batch_random_replies(batch_size=5):
-    """Process a batch of random tweet replies"""
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    logger.info(f"Starting batch of {batch_size} random replies...")
-    print(f"[{current_time}] 🧠 KOIYU begins a meditation to find {batch_size} seekers in need of wisdom...")
+def prepare_random_replies(count):
+    """Return up to `count` (tweet, reply) pairs: buffered replies first, then freshly generated ones"""
+    # Candidates are fetched once and their replies generated concurrently, as in the old
+    # batch_random_replies; the gaps between posts now come from reply_planner, not a fixed pause
+    try:
+        # Replies pre-generated by the batch path go first
+        generated = claim_buffered_replies(count)
+        tweets = find_reply_candidates(count - len(generated)) if len(generated) < count else []
+        if not tweets and not generated:
+            logger.warning("No suitable tweets found via following list or keywords.")
+            print("No suitable tweets found via following list or keywords.")
+            return []
+        
+        if tweets:
+            logger.info(f"Generating {len(tweets)} replies concurrently...")
+            generated += generate_replies_concurrently(tweets)
+        return generated
+    except UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        logger.error(f"Error preparing replies: {e}")
+        return []
+
+def queue_random_replies(count):
+    """Generate up to count random replies and queue them as jobs; returns how many were queued"""
+    queued = 0
+    for tweet, wisdom_reply in prepare_random_replies(count):
+        if wisdom_reply:
+            key, payload = reply_job(tweet, wisdom_reply)
+            job_queue.enqueue(key, "reply", payload)
+            queued += 1
+    return queued
+
+@with_rate_limit_handling
+def post_planned_reply():
+    """Post the oldest queued random reply, queueing more when none are left; returns True if one went out"""
+    # Replies to tweets that have gone stale are not worth posting any more
+    job_queue.prune(REPLY_JOB_MAX_AGE_HOURS * 3600, "reply")
+    job = job_queue.claim("reply")
+    if not job and queue_random_replies(REPLY_PREFETCH):
+        job = job_queue.claim("reply")
+    return run_post_job(job) if job else False
+
+def run_reply_spreader(stop_event):
+    """Send random replies one at a time at the gaps planned by reply_planner"""
+    logger.info("KOIYU's reply planner is spreading wisdom across the day...")
+    print("🌊 KOIYU's reply planner is spreading wisdom across the day...")
     
-    success_count = 0
-    for i in range(batch_size):
+    while not stop_event.is_set():
+        if not serves_account():
+            stop_event.wait(coordinator.ttl)
+            continue
+        
+        reply_planner.share = coordinator.budget_share()
+        stats = load_usage_stats()
+        delay = reply_planner.next_delay(stats)
+        sent, quota, _ = reply_planner.status(stats)
+        logger.info(f"Next random reply in {delay / 60:.1f} minutes ({sent}/{quota} sent today)")
+        if stop_event.wait(delay):
+            break
+        
+        # The budget may have changed while waiting (mentions, daily post, a new day)
+        if not reply_planner.remaining_today(load_usage_stats()):
+            continue
         try:
-            if reply_to_random_tweet():
-                success_count += 1
-                # Add a delay between replies to avoid hitting rate limits
-                if i < batch_size - 1:  # Don't sleep after the last one
-                    time.sleep(30)  # 30 seconds between tweets in a batch
+            ok = post_planned_reply()
         except Exception as e:
-            logger.error(f"Error in batch reply #{i+1}: {e}")
-    
-    logger.info(f"Completed batch with {success_count}/{batch_size} successful replies")
-    print(f"[{current_time}] ✨ KOIYU has completed sharing wisdom with {success_count} seekers")
-    return success_count
+            logger.error(f"Error in reply planner: {e}")
+            ok = False
+        # None: skipped while X or OpenAI is unavailable, which is not the reply's failure
+        if ok is not None:
+            reply_planner.record(ok)
 
 def generate_analytics_report():
     """Generate a report on KOIYU's activity"""
     stats = load_usage_stats()
     current_month = datetime.now().strftime("%Y-%m")
+    
+    # Make sure the ledger has every event before querying it
+    usage_store.flush()
+    openai_stats = ledger.openai_summary(current_month)
+    cache_stats = ledger.prompt_cache_summary(current_month)
+    cache_share = cache_stats["cached_tokens"] / cache_stats["prompt_tokens"] if cache_stats["prompt_tokens"] else 0
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Format the report
     report = [
-        f"📊 KOIYU Analytics Report - {current_time}",
+        f"📊 {current_account().name.upper()} Analytics Report - {current_time}",
         f"",
         f"🗓️  Current Month: {current_month}",
         f"💰 Twitter API Plan: {stats.get('plan', '$100/month')}",
@@ -828,9 +1877,58 @@ def generate_analytics_report():
         f"   - Replies to Seekers: {stats.get('replies_count', 0)}",
         f"   - Read Operations: {stats['reads_count']}",
         f"",
+        f"🧠 Oracle Activity (OpenAI):",
+        f"   - Generations: {openai_stats['calls']}",
+        f"   - Tokens: {openai_stats['prompt_tokens']} prompt / {openai_stats['completion_tokens']} completion",
+        f"   - Average Latency: {openai_stats['avg_latency_ms']:.0f}ms",
+        f"   - Prompt Cache: {cache_share:.0%} of prompt tokens cached, {cache_stats['cached_calls']}/{cache_stats['calls']} calls hit",
+        f"   - Latency With/Without Cache Hit: {cache_stats['latency_cached_ms']:.0f}ms / {cache_stats['latency_uncached_ms']:.0f}ms",
+        f"   - Average Post Latency: {ledger.average_latency('post', current_month):.0f}ms",
+        f"",
         f"🔮 Cosmic Potential:",
-        f"   - Remaining Monthly Capacity: {1500 - stats['posts_count']} posts",
+        f"   - Remaining Monthly Capacity: {monthly_post_limit() - stats['posts_count']} posts",
+    ]
+    
+    # Latency and estimated cost per content type and model
+    tiers = ledger.openai_by_type(current_month)
+    if tiers:
+        report += [f"", f"🎚️  Model Tiers:"]
+        for content_type, model, calls, prompt_tokens, completion_tokens, latency in tiers:
+            cost = estimate_cost(model, prompt_tokens, completion_tokens)
+            report.append(f"   - {content_type or 'other'} on {model}: {calls} calls, {latency or 0:.0f}ms avg, ~${cost:.2f}")
+    
+    # Today's random reply plan
+    sent, quota, failures = reply_planner.status(stats)
+    report += [f"", f"🌊 Reply Plan: {sent}/{quota} random replies today"
+               + (f" ({failures} failed in a row)" if failures else "")]
+    
+    # Generated posts and replies still waiting to go out
+    waiting = {kind: count for (kind, state), count in job_queue.counts().items() if state == "pending"}
+    if waiting:
+        report.append(f"📮 Queued Jobs: " + ", ".join(f"{count} {kind}" for kind, count in sorted(waiting.items())))
+    
+    # Current rate limit windows per endpoint
+    limits = rate_limiter.status()
+    if limits:
+        report += [f"", f"⏱️  Rate Limit Windows:"]
+        for endpoint, (tokens, blocked_for) in sorted(limits.items()):
+            line = f"   - {endpoint}: {tokens:.1f} requests available"
+            if blocked_for:
+                line += f" (blocked for {blocked_for:.0f}s)"
+            report.append(line)
+    
+    # Circuit breakers that are not letting calls through
+    open_circuits = [breaker for breaker in breakers.values() if breaker.state != "closed"]
+    if open_circuits:
+        report += [f"", f"🔌 Circuit Breakers:"]
+        for breaker in open_circuits:
+            report.append(f"   - {breaker.name}: {breaker.state} after {breaker.failures} failures")
+    
+    # This node's place in the node group
+    role = "leader" if coordinator.leader else f"following {coordinator.leader_id()}"
+    report += [
         f"",
+        f"🛰️  Node: {coordinator.node_id} ({role}), {len(coordinator.nodes())} live node(s), sharding by {coordinator.shard_by}",
         f"🔄 Last System Reset: {stats['last_reset']}",
     ]
     
@@ -840,8 +1938,749 @@ def generate_analytics_report():
     
     return report_text
 
-# Schedule a weekly analytics report
-schedule.every().monday.at("09:00").do(generate_analytics_report)
+def generate_all_analytics_reports():
+    """Analytics reports for every account, one after another"""
+    reports = []
+    for account in accounts:
+        with use_account(account):
+            reports.append(generate_analytics_report())
+    return "\n\n".join(reports)
+
+# Serve the admin panel from this process's in-memory usage stores
+keep_alive.set_analytics_provider(generate_all_analytics_reports)
+
+# Asyncio runtime mode (--auto --async)
+# A single event loop drives every Twitter and OpenAI request, so hundreds of
+# calls can be in flight without a thread per job. The clients are created on
+# demand so the threaded mode never needs aiohttp.
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "100"))
+
+async_client = None
+async_client_openai = None
+async_slots = None
+async_session = None
+async_background_tasks = set()  # Strong references so running jobs aren't garbage collected
+
+def init_async_clients():
+    """Create the asyncio Twitter and OpenAI clients and the in-flight limiter"""
+    global async_client, async_client_openai, async_slots, async_session
+    from openai import AsyncOpenAI
+    
+    async_session = create_aiohttp_session()  # One connection pool for every account
+    
+    def create_account_client(account):
+        account_client = create_async_client(rate_limiter.instance(account), breaker=breakers["x"], **account.credentials)
+        account_client.session = async_session
+        return account_client
+    
+    async_client = AccountLocal(create_account_client)
+    async_client_openai = AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=create_async_openai_http_client()
+    )
+    async_slots = asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT)
+
+async def request_completion_async(request):
+    """Async version of request_completion"""
+    async with async_slots:
+        if not STREAM_GENERATION:
+            return await async_client_openai.chat.completions.create(**request)
+        
+        stream = await async_client_openai.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        cutoff = StreamCutoff()
+        model = usage = finish_reason = None
+        async for chunk in stream:
+            model = getattr(chunk, "model", None) or model
+            usage = getattr(chunk, "usage", None) or usage
+            if chunk.choices:
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                delta = chunk.choices[0].delta.content
+                if delta and cutoff.feed(delta):
+                    await stream.close()
+                    finish_reason = "cutoff"
+                    break
+        return stream_response(model, usage, cutoff.text, finish_reason)
+
+async def complete_koiyu_async(request, content_type="wisdom"):
+    """Async version of complete_koiyu"""
+    error = None
+    for model in model_router.candidates(content_type):
+        breakers["openai"].raise_if_open()
+        started = time.time()
+        try:
+            response = await request_completion_async(dict(request, model=model))
+        except Exception as e:
+            model_router.record(content_type, model, (time.time() - started) * 1000, ok=False)
+            logger.warning(f"{model} failed for {content_type}: {e}")
+            error = e
+            continue
+        
+        model_router.record(content_type, model, (time.time() - started) * 1000)
+        record_openai_usage(response, started, content_type)
+        await asyncio.to_thread(observe_completion, response)
+        return response.choices[0].message.content
+    raise error or RuntimeError(f"No models configured for {content_type}")
+
+async def generate_koiyu_wisdom_async(prompt="Share a philosophical insight about life's journey", content_type="wisdom"):
+    """Async version of generate_koiyu_wisdom"""
+    try:
+        for attempt in range(DUPLICATE_REGENERATIONS + 1):
+            text = await complete_koiyu_async(
+                completion_request(prompt + FRESH_PERSPECTIVE if attempt else prompt, content_type),
+                content_type
+            )
+            content = trim_to_tweet_length(text.strip())
+            if not is_duplicate_content(content):
+                return content
+        
+        logger.error(f"Still generating duplicate content after {DUPLICATE_REGENERATIONS} retries")
+        return None
+    except UNAVAILABLE_ERRORS:
+        raise  # OpenAI's circuit is open: callers skip the work instead of counting a failure
+    except Exception as e:
+        error_msg = f"Error generating KOIYU wisdom: {e}"
+        logger.error(error_msg)
+        print(error_msg)
+        return None
+
+async def rephrase_koiyu_wisdom_async(text):
+    """Async version of rephrase_koiyu_wisdom"""
+    try:
+        started = time.time()
+        async with async_slots:
+            response = await async_client_openai.chat.completions.create(**rephrase_request(text))
+        record_openai_usage(response, started, "rephrase")
+        await asyncio.to_thread(observe_completion, response)
+        content = trim_to_tweet_length(response.choices[0].message.content.strip())
+        return None if is_duplicate_content(content) else content
+    except Exception as e:
+        logger.error(f"Error rephrasing cached wisdom: {e}")
+        return None
+
+async def cached_koiyu_reply_async(text):
+    """Async version of cached_koiyu_reply"""
+    hit = response_cache.lookup(text)
+    if not hit:
+        return None
+    cached, similarity = hit
+    reply = await rephrase_koiyu_wisdom_async(cached)
+    if reply:
+        logger.info(f"Reusing cached wisdom for a similar seeker message (similarity {similarity:.2f})")
+        record_usage("cache_hit", detail=f"{similarity:.2f}")
+    return reply
+
+async def _generate_uncached_replies_async(texts, content_type="random_reply"):
+    """Async version of _generate_uncached_replies"""
+    replies = []
+    for start in range(0, len(texts), REPLY_BATCH_SIZE):
+        chunk = texts[start:start + REPLY_BATCH_SIZE]
+        chunk_replies = [None] * len(chunk)
+        if len(chunk) > 1:
+            # Fail fast while OpenAI's circuit is open, as complete_koiyu does
+            breakers["openai"].raise_if_open()
+            request = batch_reply_request(chunk, content_type)
+            try:
+                started = time.time()
+                async with async_slots:
+                    response = await async_client_openai.chat.completions.create(**request)
+                model_router.record(content_type, request["model"], (time.time() - started) * 1000, items=len(chunk))
+                record_openai_usage(response, started, content_type)
+                chunk_replies = [
+                    reply if reply and not is_duplicate_content(reply) else None
+                    for reply in parse_batch_replies(response.choices[0].message.content, len(chunk))
+                ]
+            except Exception as e:
+                model_router.record(content_type, request["model"], (time.time() - started) * 1000, ok=False, items=len(chunk))
+                logger.error(f"Error generating batched KOIYU replies: {e}")
+        
+        missing = [i for i, reply in enumerate(chunk_replies) if not reply]
+        if missing and len(chunk) > 1:
+            logger.warning(f"Batch produced {len(chunk) - len(missing)}/{len(chunk)} replies; generating the rest individually")
+        fallbacks = await asyncio.gather(*(
+            generate_koiyu_wisdom_async(build_reply_prompt(chunk[i]), content_type) for i in missing
+        ))
+        for i, reply in zip(missing, fallbacks):
+            chunk_replies[i] = reply
+        replies.extend(chunk_replies)
+    
+    return replies
+
+async def generate_koiyu_replies_async(texts, content_type="random_reply"):
+    """Async version of generate_koiyu_replies"""
+    replies = list(await asyncio.gather(*(cached_koiyu_reply_async(text) for text in texts)))
+    misses = [i for i, reply in enumerate(replies) if not reply]
+    for i, reply in zip(misses, await _generate_uncached_replies_async([texts[i] for i in misses], content_type)):
+        replies[i] = reply
+        response_cache.store(texts[i], reply)
+    return replies
+
+async def post_tweet_async(content, resumed=False):
+    """Async version of post_tweet"""
+    if (not resumed and is_duplicate_content(content)) or not check_and_update_usage("post"):
+        return None
+    
+    try:
+        started = time.time()
+        async with async_slots:
+            tweet = await async_client.create_tweet(text=content)
+        return await asyncio.to_thread(record_post, tweet.data, content, started)
+    except UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        if is_duplicate_post_error(e):
+            return await asyncio.to_thread(duplicate_post, content, resumed)
+        error_msg = f"Error posting KOIYU's wisdom: {e}"
+        logger.error(error_msg)
+        print(error_msg)
+        return None
+
+async def reply_to_tweet_async(tweet_id, content, author_id=None, random_reply=False, resumed=False):
+    """Async version of reply_to_tweet"""
+    if reply_index.has_replied(tweet_id):
+        logger.info(f"Already replied to tweet {tweet_id}, skipping duplicate reply")
+        return None
+    
+    if (not resumed and is_duplicate_content(content)) or not check_and_update_usage("reply"):
+        return None
+    
+    try:
+        started = time.time()
+        async with async_slots:
+            reply = await async_client.create_tweet(text=content, in_reply_to_tweet_id=tweet_id)
+        return await asyncio.to_thread(record_post, reply.data, content, started, tweet_id, author_id, random_reply)
+    except UNAVAILABLE_ERRORS:
+        raise
+    except Exception as e:
+        if is_duplicate_post_error(e):
+            return await asyncio.to_thread(duplicate_post, content, resumed, tweet_id, author_id, random_reply)
+        error_msg = f"Error posting KOIYU's response: {e}"
+        logger.error(error_msg)
+        print(error_msg)
+        return None
+
+async def run_post_job_async(job):
+    """Async version of run_post_job (the job queue and claims are SQLite, so they run in worker threads)"""
+    payload = job["payload"]
+    if already_posted(job):
+        logger.info(f"Job {job['key']} was already posted; marking it done")
+        await asyncio.to_thread(job_queue.complete, job["id"])
+        return True
+    if not await asyncio.to_thread(claim_job, job):
+        return True
+    
+    try:
+        if job["kind"] in ("reply", "mention"):
+            result = await reply_to_tweet_async(payload["tweet_id"], payload["text"], payload.get("author_id"),
+                                                 random_reply=job["kind"] == "reply", resumed=was_interrupted(job))
+        else:
+            result = await post_tweet_async(payload["text"], resumed=was_interrupted(job))
+    except UNAVAILABLE_ERRORS:
+        await asyncio.to_thread(job_queue.release, job["id"])
+        raise
+    
+    if result:
+        await asyncio.to_thread(job_queue.complete, job["id"], result.get("id"))
+        return True
+    await asyncio.to_thread(fail_job, job, "post failed")
+    return False
+
+async def run_post_job_by_key_async(key, kind, payload):
+    """Async version of run_post_job_by_key"""
+    job = await asyncio.to_thread(job_queue.enqueue, key, kind, payload)
+    if job["state"] == DONE:
+        return True
+    if job["state"] == FAILED:
+        await asyncio.to_thread(job_queue.retry, job["id"])
+    claimed = await asyncio.to_thread(job_queue.claim, job_id=job["id"])
+    return await run_post_job_async(claimed) if claimed else False
+
+async def get_authenticated_user_async(force_refresh=False):
+    """Async version of get_authenticated_user (the identity file is read and written in worker threads)"""
+    if not force_refresh:
+        cached = remembered_identity() or await asyncio.to_thread(load_cached_identity)
+        if cached:
+            return remember_identity(cached)
+    
+    async with async_slots:
+        me = await async_client.get_me()
+    authenticated_user = identity_from(me)
+    await asyncio.to_thread(save_cached_identity, authenticated_user)
+    return authenticated_user
+
+async def with_identity_refresh_async(func):
+    """Async version of with_identity_refresh"""
+    try:
+        return await func((await get_authenticated_user_async())["id"])
+    except tweepy.Unauthorized:
+        logger.warning("Twitter returned 401; refreshing cached identity and retrying once")
+        return await func((await get_authenticated_user_async(force_refresh=True))["id"])
+
+async def get_mentions_async(since_id=None, until_id=None, page_budget=MENTION_PAGE_BUDGET):
+    """Async version of get_mentions"""
+    from tweepy.asynchronous import AsyncPaginator
+    
+    mentions = []
+    state = {"pages": 0, "resume_id": None}
+    
+    async def walk(user_id):
+        mentions.clear()
+        state["pages"] = 0
+        oldest_id = None
+        has_more = False
+        pages = AsyncPaginator(
+            async_client.get_users_mentions,
+            id=user_id,
+            since_id=since_id,
+            until_id=until_id,
+            max_results=MENTION_PAGE_SIZE,
+            tweet_fields=["author_id", "created_at"],
+            limit=page_budget
+        ).__aiter__()
+        try:
+            while True:
+                # Each page is its own request, so each takes an in-flight slot
+                async with async_slots:
+                    try:
+                        page = await pages.__anext__()
+                    except StopAsyncIteration:
+                        break
+                check_and_update_usage("read")
+                state["pages"] += 1
+                mentions.extend(page.data or [])
+                oldest_id = page.meta.get("oldest_id", oldest_id)
+                has_more = "next_token" in page.meta
+        except tweepy.Unauthorized:
+            raise
+        except Exception:
+            state["resume_id"] = oldest_id or until_id
+            raise
+        state["resume_id"] = oldest_id if has_more else None
+    
+    try:
+        await with_identity_refresh_async(walk)
+    except Exception as e:
+        error_msg = f"Error retrieving mentions: {e}"
+        logger.error(error_msg)
+        print(error_msg)
+        return mentions, state["resume_id"], state["pages"]
+    
+    logger.info(f"Retrieved {len(mentions)} seekers calling upon KOIYU")
+    return mentions, state["resume_id"], state["pages"]
+
+async def ingest_mentions_async(page_budget=MENTION_PAGE_BUDGET):
+    """Async version of ingest_mentions (the queue and the mention cursor are read and written in worker threads)"""
+    fetched = []
+    gaps = []
+    for since_id, until_id, limit in await asyncio.to_thread(_mention_windows):
+        if page_budget <= 0:
+            if since_id or until_id:
+                gaps.append({"since_id": since_id, "until_id": until_id})
+            continue
+        mentions, resume_id, pages = await get_mentions_async(since_id, until_id, min(page_budget, limit or page_budget))
+        page_budget -= pages
+        fetched += mentions
+        if resume_id:
+            gaps.append({"since_id": since_id, "until_id": resume_id})
+    
+    return await asyncio.to_thread(mention_queue.ingest, _mention_rows(fetched), gaps)
+
+async def fetch_tweets_from_following_async():
+    """Async version of fetch_tweets_from_following (shares the same caches)"""
+    with cache_lock:
+        following_ids = following_cache.get("ids")
+    if following_ids is None:
+        from tweepy.asynchronous import AsyncPaginator
+        
+        async def walk(user_id):
+            users = []
+            pages = AsyncPaginator(
+                async_client.get_users_following,
+                id=user_id,
+                max_results=FOLLOWING_PAGE_SIZE,
+                limit=FOLLOWING_PAGE_BUDGET
+            ).__aiter__()
+            while True:
+                async with async_slots:
+                    try:
+                        page = await pages.__anext__()
+                    except StopAsyncIteration:
+                        break
+                check_and_update_usage("read")
+                users.extend(page.data or [])
+            return users
+        
+        following_ids = _store_following(await with_identity_refresh_async(walk))
+    
+    if not following_ids:
+        logger.info("No accounts found in following list")
+        return []
+    
+    selected_user_id = random.choice(following_ids)
+    fresh, since_id = _timeline_since_id(selected_user_id)
+    if fresh:
+        with cache_lock:
+            return list(timeline_cache[selected_user_id]["tweets"])
+    
+    check_and_update_usage("read")
+    async with async_slots:
+        response = await async_client.get_users_tweets(
+            id=selected_user_id,
+            max_results=10,
+            since_id=since_id,
+            exclude=['retweets', 'replies'],
+            tweet_fields=["id", "text", "created_at", "author_id"],
+            expansions=["author_id"],
+            user_fields=["username"]
+        )
+    
+    return list(_store_timeline(selected_user_id, response))
+
+async def fetch_tweets_by_keywords_async():
+    """Async version of fetch_tweets_by_keywords"""
+    keywords = ["HODL", "WAGMI", "DeFi", "Web3", "Crypto", 
+               "$IP", "StoryProtocol", "$SOL", "$ETH", "Ai Agent"]
+    keyword = random.choice(keywords)
+    logger.info(f"Falling back to keyword search for '{keyword}'...")
+    
+    async with async_slots:
+        tweets = await async_client.search_recent_tweets(
+            query=f"{keyword} -is:retweet -is:reply lang:en",
+            max_results=10,
+            tweet_fields=["id", "text", "created_at", "author_id"]
+        )
+    
+    return list(tweets.data or [])
+
+async def find_reply_candidates_async(count=5):
+    """Async version of find_reply_candidates"""
+    candidates = await asyncio.to_thread(take_candidates, count)
+    for fetch, source in ((fetch_tweets_from_following_async, "following"),
+                          (fetch_tweets_by_keywords_async, "keyword")):
+        if len(candidates) >= count:
+            break
+        try:
+            await asyncio.to_thread(candidate_pool.add, await fetch(), source)
+            candidates += await asyncio.to_thread(take_candidates, count - len(candidates))
+        except Exception as e:
+            logger.warning(f"Error fetching reply candidates: {e}")
+    
+    return candidates
+
+@with_rate_limit_handling
+async def scheduled_koiyu_wisdom_async():
+    """Async version of scheduled_koiyu_wisdom"""
+    if not await asyncio.to_thread(leads_daily_posts):
+        return False
+    handled, job = await asyncio.to_thread(existing_scheduled_post, daily_wisdom_key(), "Today's wisdom")
+    if handled:
+        return True
+    if job:
+        return await run_post_job_by_key_async(job["key"], "post", job["payload"])
+    
+    theme, claimed = await asyncio.to_thread(claim_buffered_wisdom)
+    if claimed:
+        _, wisdom = claimed
+        logger.info(f"Serving pre-generated wisdom about {theme}")
+    else:
+        theme = random.choice(account_themes())
+        logger.info(f"Attempting to generate and post KOIYU wisdom about {theme}...")
+        wisdom = await generate_koiyu_wisdom_async(wisdom_prompt(theme))
+    
+    if not wisdom:
+        logger.error("Failed to generate KOIYU's wisdom.")
+        return False
+    
+    logger.info(f"Generated wisdom: {wisdom}")
+    if await run_post_job_by_key_async(daily_wisdom_key(), "post", {"text": wisdom, "theme": theme}):
+        logger.info(f"KOIYU's daily wisdom has been shared with the world successfully!")
+        return True
+    
+    logger.error("Failed to post KOIYU's wisdom.")
+    return False
+
+@with_rate_limit_handling
+async def weekly_koiyu_story_async():
+    """Async version of weekly_koiyu_story"""
+    if not await asyncio.to_thread(leads_daily_posts):
+        return False
+    handled, job = await asyncio.to_thread(existing_scheduled_post, weekly_story_key(), "This week's story")
+    if handled:
+        return True
+    if job:
+        return await run_post_job_by_key_async(job["key"], "post", job["payload"])
+    
+    claimed = await asyncio.to_thread(claim_unique, "story")
+    story = claimed[1] if claimed else await generate_koiyu_wisdom_async(STORY_PROMPT, "story")
+    if not story:
+        logger.error("Failed to generate KOIYU's weekly story.")
+        return False
+    
+    if await run_post_job_by_key_async(weekly_story_key(), "post", {"text": story}):
+        logger.info("KOIYU's weekly story has been shared with the world!")
+        return True
+    logger.error("Failed to post KOIYU's weekly story.")
+    return False
+
+async def refill_content_buffer_async():
+    """Async version of refill_content_buffer; generates all missing posts concurrently"""
+    missing = []
+    for key, prompt, depth in buffer_targets():
+        missing += [(key, prompt)] * max(0, depth - await asyncio.to_thread(content_store.count, key))
+    if not missing:
+        return 0
+    
+    texts = await asyncio.gather(*(generate_koiyu_wisdom_async(prompt, content_type_for(key)) for key, prompt in missing))
+    generated = 0
+    for (key, _), text in zip(missing, texts):
+        if is_postable(text):
+            await asyncio.to_thread(content_store.put, key, text)
+            generated += 1
+    
+    logger.info(f"Pre-generated {generated} posts for the wisdom buffer")
+    return generated
+
+async def run_buffer_refiller_async():
+    """Async version of run_buffer_refiller"""
+    while True:
+        if not (coordinator.leader or serves_account()):
+            await asyncio.sleep(coordinator.ttl)
+            continue
+        
+        try:
+            if batch_runner:
+                await asyncio.to_thread(refill_content_buffer)
+            else:
+                await refill_content_buffer_async()
+        except Exception as e:
+            logger.error(f"Error refilling wisdom buffer: {e}")
+        await asyncio.sleep(BUFFER_REFILL_SECONDS)
+
+async def ensure_daily_wisdom_posted_async():
+    """Async version of ensure_daily_wisdom_posted"""
+    if await asyncio.to_thread(wisdom_posted_today):
+        logger.info("Daily wisdom already posted today. No action needed.")
+        return False
+    if not await asyncio.to_thread(leads_daily_posts):
+        return False
+    
+    logger.info("No daily wisdom detected for today. Creating one now as a backup.")
+    return await scheduled_koiyu_wisdom_async()
+
+@with_rate_limit_handling
+async def auto_reply_to_mentions_async(max_replies=None):
+    """Async version of auto_reply_to_mentions; replies are generated concurrently"""
+    try:
+        await ingest_mentions_async()
+        pending = await asyncio.to_thread(pending_mentions)
+        mentions = await asyncio.to_thread(unanswered_mentions, pending)
+        if not mentions:
+            logger.info(f"No new seekers of wisdom have called upon KOIYU.")
+            return False
+        
+        # Oldest first, optionally limited per run
+        selected = mentions[:max_replies] if max_replies is not None else mentions
+        queued = await asyncio.to_thread(queued_mention_replies, selected)
+        fresh = [mention for mention in selected if mention["id"] not in queued]
+        generated = await generate_koiyu_replies_async([mention["text"] for mention in fresh], "mention_reply")
+        queued.update((mention["id"], reply) for mention, reply in zip(fresh, generated))
+        
+        for mention in selected:
+            if monthly_post_limit_reached():
+                logger.warning("Monthly post limit reached; leaving mentions queued.")
+                break
+            wisdom_reply = queued.get(mention["id"])
+            if wisdom_reply and await run_post_job_by_key_async(
+                    f"mention:{mention['id']}", "mention", {"tweet_id": mention["id"], "text": wisdom_reply}):
+                logger.info("KOIYU has responded to the seeker with wisdom!")
+                await asyncio.to_thread(mark_mention_handled, mention["id"])
+            else:
+                await asyncio.to_thread(record_mention_attempt, mention["id"])
+    except UNAVAILABLE_ERRORS:
+        raise  # Skipped by with_rate_limit_handling; the mentions stay queued
+    except Exception as e:
+        error_msg = f"Error while KOIYU was communing with seekers: {e}"
+        logger.error(error_msg)
+        print(error_msg)
+        return False
+    
+    return True
+
+async def prepare_random_replies_async(count):
+    """Async version of prepare_random_replies"""
+    generated = await asyncio.to_thread(claim_buffered_replies, count)
+    tweets = await find_reply_candidates_async(count - len(generated)) if len(generated) < count else []
+    if not tweets and not generated:
+        logger.warning("No suitable tweets found via following list or keywords.")
+        return []
+    
+    if tweets:
+        generated += list(zip(tweets, await generate_koiyu_replies_async([tweet.text for tweet in tweets])))
+    return generated
+
+async def run_daily_job_async(name, time_str, job, weekday=None, **kwargs):
+    """Sleep until each run time of a job and start it without blocking other jobs.
+    
+    Runs missed while the process was down (per the scheduler's saved last run)
+    are caught up once, as CATCH_UP_ONCE does in the threaded scheduler.
+    """
+    run = first_run_at(time_str, await asyncio.to_thread(scheduler.last_run, name), weekday)
+    while True:
+        await asyncio.sleep(max(0, (run - datetime.now()).total_seconds()))
+        if datetime.now() - run > scheduler.grace:
+            logger.warning(f"Job {name} missed its run at {run:%Y-%m-%d %H:%M}; running it once now")
+        
+        # The latest run that is due now; the next one comes after it
+        while next_run_at(time_str, now=run, weekday=weekday) <= datetime.now():
+            run = next_run_at(time_str, now=run, weekday=weekday)
+        await asyncio.to_thread(scheduler.record_run, name, run)
+        run = next_run_at(time_str, now=run, weekday=weekday)
+        
+        logger.info(f"Running scheduled job {name}")
+        try:
+            # Plain functions (e.g. the analytics report) touch the ledger, so they run in a worker thread
+            result = job(**kwargs) if asyncio.iscoroutinefunction(job) else asyncio.to_thread(job, **kwargs)
+            # Run in the background so a slow batch never delays the next deadline
+            task = asyncio.create_task(result)
+            async_background_tasks.add(task)
+            task.add_done_callback(async_background_tasks.discard)
+        except Exception as e:
+            logger.error(f"Error in scheduled job {name}: {e}")
+
+async def queue_random_replies_async(count):
+    """Async version of queue_random_replies"""
+    queued = 0
+    for tweet, wisdom_reply in await prepare_random_replies_async(count):
+        if wisdom_reply:
+            key, payload = reply_job(tweet, wisdom_reply)
+            await asyncio.to_thread(job_queue.enqueue, key, "reply", payload)
+            queued += 1
+    return queued
+
+@with_rate_limit_handling
+async def post_planned_reply_async():
+    """Async version of post_planned_reply"""
+    await asyncio.to_thread(job_queue.prune, REPLY_JOB_MAX_AGE_HOURS * 3600, "reply")
+    job = await asyncio.to_thread(job_queue.claim, "reply")
+    if not job and await queue_random_replies_async(REPLY_PREFETCH):
+        job = await asyncio.to_thread(job_queue.claim, "reply")
+    return await run_post_job_async(job) if job else False
+
+async def run_reply_spreader_async():
+    """Async version of run_reply_spreader"""
+    while True:
+        if not serves_account():
+            await asyncio.sleep(coordinator.ttl)
+            continue
+        
+        reply_planner.share = coordinator.budget_share()
+        delay = reply_planner.next_delay(load_usage_stats())
+        logger.info(f"Next random reply in {delay / 60:.1f} minutes")
+        await asyncio.sleep(delay)
+        
+        if not reply_planner.remaining_today(load_usage_stats()):
+            continue
+        try:
+            ok = await post_planned_reply_async()
+        except Exception as e:
+            logger.error(f"Error in reply planner: {e}")
+            ok = False
+        if ok is not None:
+            reply_planner.record(ok)
+
+async def run_mention_responder_async():
+    """Async version of run_mention_responder"""
+    interval = MENTION_POLL_MIN_SECONDS
+    while True:
+        if not serves_account():
+            await asyncio.sleep(coordinator.ttl)
+            continue
+        
+        try:
+            active = await auto_reply_to_mentions_async()
+        except Exception as e:
+            logger.error(f"Error in mention responder: {e}")
+            active = False
+        
+        interval = next_mention_poll_interval(interval, active)
+        await asyncio.sleep(interval)
+
+async def periodic_status_update_async():
+    """Periodically log every account's usage from the event loop"""
+    while True:
+        for account in accounts:
+            with use_account(account):
+                usage = load_usage_stats()
+                logger.info(f"{account.name.upper()} remains vigilant. "
+                            f"Usage: {usage['posts_count']}/{monthly_post_limit()} posts this month.")
+        await asyncio.sleep(3600)
+
+async def start_account_async(account):
+    """Resume an account's unfinished work, make its initial post and start its jobs as tasks"""
+    # Tasks copy the current context, so everything started here acts for this account
+    with use_account(account):
+        # Also opens the account's ledger, usage counters and job queue off the event loop
+        await asyncio.to_thread(resume_jobs)
+        
+        logger.info(f"{account.name} prepares to share initial wisdom with the world...")
+        if await asyncio.to_thread(wisdom_posted_today):
+            logger.info("Today's wisdom has already been shared; no initial post needed.")
+        elif not coordinator.leader:
+            leader_id = await asyncio.to_thread(coordinator.leader_id)
+            logger.info(f"Node {leader_id} leads the daily posts; no initial post from this node.")
+        elif await scheduled_koiyu_wisdom_async():
+            logger.info("Initial wisdom shared successfully!")
+        else:
+            logger.warning("Could not share initial wisdom. Continuing with scheduled posts.")
+        
+        return [asyncio.create_task(job) for job in [
+            run_daily_job_async(f"{account.name}:daily_wisdom", DAILY_WISDOM_TIME, scheduled_koiyu_wisdom_async),
+            run_daily_job_async(f"{account.name}:wisdom_check", WISDOM_CHECK_TIME, ensure_daily_wisdom_posted_async),
+            run_daily_job_async(f"{account.name}:weekly_story", WEEKLY_STORY_TIME, weekly_koiyu_story_async,
+                                weekday=WEEKLY_STORY_DAY),
+            run_daily_job_async(f"{account.name}:analytics_report", ANALYTICS_REPORT_TIME, generate_analytics_report,
+                                weekday=ANALYTICS_REPORT_DAY),
+            run_mention_responder_async(),
+            run_reply_spreader_async(),
+            run_buffer_refiller_async(),
+        ]]
+
+async def run_async_mode():
+    """Run every account's full schedule on a single asyncio event loop"""
+    init_async_clients()
+    
+    jobs = [periodic_status_update_async()]
+    for account in accounts:
+        jobs += await start_account_async(account)
+    
+    logger.info(f"Async schedule activated for {len(accounts)} account(s) with 4 planned sharing events "
+                f"and up to {DAILY_REPLY_TARGET} spread replies a day each")
+    print(f"\n⚡ Async schedule activated for {len(accounts)} account(s) with 4 planned sharing events "
+          f"and up to {DAILY_REPLY_TARGET} spread replies a day each")
+    
+    tasks = [asyncio.ensure_future(job) for job in jobs]
+    
+    def cancel_tasks():
+        logger.info("SIGTERM received, stopping the async schedule...")
+        for task in tasks + list(async_background_tasks):
+            task.cancel()
+    
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, cancel_tasks)
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        await async_session.close()
+
+def close_ledgers():
+    """Close every account's ledger connections"""
+    for account_ledger in ledger.instances().values():
+        account_ledger.close()
 
 # Replace the main function auto mode section
 if __name__ == "__main__":
@@ -861,23 +2700,44 @@ if __name__ == "__main__":
             print("\nResetting usage statistics...")
             reset_usage_stats()
         
+        # Hand everything over to a single event loop in asyncio mode
+        if "--async" in sys.argv:
+            logger.info("KOIYU enters asyncio mode...")
+            print("\nKOIYU enters asyncio mode...")
+            try:
+                asyncio.run(run_async_mode())
+            except KeyboardInterrupt:
+                pass
+            coordinator.stop()
+            stop_usage_stores()
+            close_ledgers()
+            exit_msg = "KOIYU returns to silent contemplation. The schedule has been suspended."
+            logger.info(exit_msg)
+            print(f"\n{exit_msg}")
+            sys.exit(0)
+        
         # Create an initial post immediately upon startup
         logger.info("KOIYU prepares to share initial wisdom with the world...")
         print("\nKOIYU prepares to share initial wisdom with the world...")
         
-        # Post initial wisdom
-        initial_success = scheduled_koiyu_wisdom()
-        if initial_success:
-            logger.info("Initial wisdom shared successfully!")
-            print("\n✨ Initial wisdom shared successfully! ✨")
-        else:
-            logger.warning("Could not share initial wisdom. Continuing with scheduled posts.")
-            print("\n⚠️ Could not share initial wisdom. Continuing with scheduled posts.")
-        
-        # Create the initial post lock file to prevent duplicate posts on restart
-        if not os.path.exists("initial_post.lock"):
-            with open("initial_post.lock", "w") as f:
-                f.write(datetime.now().isoformat())
+        for account in accounts:
+            with use_account(account):
+                # Resume posts and replies a previous run generated but never finished
+                resume_jobs()
+                
+                # Post initial wisdom, unless today's has already gone out (e.g. before a restart)
+                if wisdom_posted_today():
+                    logger.info(f"{account.name}: today's wisdom has already been shared; no initial post needed.")
+                    print(f"\n✨ {account.name}: today's wisdom has already been shared; no initial post needed. ✨")
+                elif not coordinator.leader:
+                    logger.info(f"{account.name}: node {coordinator.leader_id()} leads the daily posts; no initial post from this node.")
+                    print(f"\n🛰️ {account.name}: node {coordinator.leader_id()} leads the daily posts; no initial post from this node.")
+                elif scheduled_koiyu_wisdom():
+                    logger.info(f"{account.name}: initial wisdom shared successfully!")
+                    print(f"\n✨ {account.name}: initial wisdom shared successfully! ✨")
+                else:
+                    logger.warning(f"{account.name}: could not share initial wisdom. Continuing with scheduled posts.")
+                    print(f"\n⚠️ {account.name}: could not share initial wisdom. Continuing with scheduled posts.")
         
         # Set up and start scheduler
         logger.info("Activating KOIYU's cosmic schedule...")
@@ -903,12 +2763,14 @@ if __name__ == "__main__":
             """Periodically show status and keep the main thread alive"""
             while not termination_event.is_set():
                 try:
-                    usage = load_usage_stats()
                     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    # Update to show 1500 instead of 100 for the monthly limit
-                    status_msg = f"KOIYU remains vigilant. Usage: {usage['posts_count']}/1500 posts this month."
-                    logger.info(status_msg)
-                    print(f"[{current_time}] {status_msg}")
+                    for account in accounts:
+                        with use_account(account):
+                            usage = load_usage_stats()
+                            status_msg = (f"{account.name.upper()} remains vigilant. "
+                                          f"Usage: {usage['posts_count']}/{monthly_post_limit()} posts this month.")
+                        logger.info(status_msg)
+                        print(f"[{current_time}] {status_msg}")
                     
                     # Sleep in small chunks to respond to termination quickly
                     for _ in range(60):  # 60 x 60 = 3600 seconds = 1 hour
@@ -923,6 +2785,22 @@ if __name__ == "__main__":
         status_thread = threading.Thread(target=periodic_status_update, daemon=True)
         status_thread.start()
         
+        for account in accounts:
+            # Answer mentions continuously on an adaptive polling interval
+            mention_thread = threading.Thread(target=bind(run_mention_responder, account), args=(termination_event,),
+                                              name=f"{account.name}-mentions", daemon=True)
+            mention_thread.start()
+            
+            # Spread random replies over the day within the post budget
+            reply_thread = threading.Thread(target=bind(run_reply_spreader, account), args=(termination_event,),
+                                            name=f"{account.name}-replies", daemon=True)
+            reply_thread.start()
+            
+            # Keep the wisdom buffer full so scheduled posts don't wait on OpenAI
+            buffer_thread = threading.Thread(target=bind(run_buffer_refiller, account), args=(termination_event,),
+                                             name=f"{account.name}-buffer", daemon=True)
+            buffer_thread.start()
+        
         try:
             # Let the main thread join the scheduler thread
             # This keeps the process alive but also responds properly
@@ -930,6 +2808,9 @@ if __name__ == "__main__":
             scheduler_thread.join()
         except KeyboardInterrupt:
             termination_event.set()
+            scheduler.stop()
+            coordinator.stop()
+            stop_usage_stores()
             exit_msg = "KOIYU returns to silent contemplation. The schedule has been suspended."
             logger.info(exit_msg)
             print(f"\n{exit_msg}")
@@ -0,0 +1,164 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from ledger import RANDOM_REPLY
+
+logger = logging.getLogger(__name__)
+
+def atomic_write_json(path, data):
+    """Write JSON to a temp file in the same directory, then atomically swap it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class UsageStore:
+    """Thread-safe, in-process API usage counters backed by the event ledger.
+
+    Counters live in memory and every thread mutates them under one lock.
+    Each recorded event is also queued and appended to the ledger in batches by
+    flush(), which runs on an interval and at exit. Counters are rebuilt from
+    the ledger at startup and whenever the month rolls over.
+    """
+
+    def __init__(self, ledger, flush_interval=10):
+        self.ledger = ledger
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.pending = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = self.ledger.usage_summary()
+
+    def _roll_month(self):
+        """Start fresh counters when a new month begins (called with the lock held)"""
+        current_month = datetime.now().strftime("%Y-%m")
+        if self.stats["last_reset"] != current_month:
+            self.stats = {
+                "last_reset": current_month,
+                "posts_count": 0,
+                "replies_count": 0,
+                "reads_count": 0,
+                "openai_calls": 0,
+                "daily_posts": {},
+                "daily_replies": {},
+                "daily_random_replies": {}
+            }
+
+    def snapshot(self):
+        """Return a copy of the current counters without touching disk"""
+        with self.lock:
+            self._roll_month()
+            return copy.deepcopy(self.stats)
+
+    def record(self, kind, **fields):
+        """Count an event and queue it for the ledger"""
+        event = self.ledger.make_event(kind, **fields)
+        with self.lock:
+            self._roll_month()
+            if kind == "post":
+                self.stats["posts_count"] += 1
+                self.stats["daily_posts"][event["day"]] = self.stats["daily_posts"].get(event["day"], 0) + 1
+            elif kind == "reply":
+                self.stats["replies_count"] += 1
+                self.stats["daily_replies"][event["day"]] = self.stats["daily_replies"].get(event["day"], 0) + 1
+                self.stats["posts_count"] += 1  # Replies also count as posts
+                if event["detail"] == RANDOM_REPLY:
+                    random_replies = self.stats.setdefault("daily_random_replies", {})
+                    random_replies[event["day"]] = random_replies.get(event["day"], 0) + 1
+            elif kind == "read":
+                self.stats["reads_count"] += 1
+            elif kind == "openai":
+                self.stats["openai_calls"] += 1
+            self.pending.append(event)
+
+    def reset(self):
+        """Zero this month's counters; history stays in the ledger"""
+        with self.lock:
+            self.flush()
+            self.ledger.record("reset")
+            self.stats = self.ledger.usage_summary()
+            return copy.deepcopy(self.stats)
+
+    def flush(self):
+        """Append queued events to the ledger in one transaction"""
+        with self.lock:
+            events, self.pending = self.pending, []
+        if not events:
+            return
+        try:
+            self.ledger.record_many(events)
+        except Exception as e:
+            logger.error(f"Failed to save usage events: {e}")
+            with self.lock:
+                self.pending = events + self.pending
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        """Start the background flusher and make sure events are saved on shutdown"""
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background flusher and write any pending events"""
+        self.stop_event.set()
+        self.flush()
+
+def dated_events(ledger, kind, total, daily, month_start):
+    """total migrated events of a kind, on the days in daily ({day: count}) and the rest on month_start"""
+    events = []
+    for day, count in sorted(daily.items()):
+        ts = datetime.strptime(day, "%Y-%m-%d").timestamp()
+        events += [ledger.make_event(kind, ts=ts, detail="migrated") for _ in range(count)]
+    events += [ledger.make_event(kind, ts=month_start, detail="migrated") for _ in range(max(0, total - len(events)))]
+    return events
+
+def migrate_usage_file(ledger, path):
+    """One-time import of the legacy JSON usage counters for the current month into the ledger.
+
+    Events keep their dates: posts and replies land on the days of the
+    daily_posts / daily_replies counters, and whatever the daily counters
+    don't cover lands on the first day of the month.
+    """
+    if ledger.get_cursor("migrated_usage_file") or not os.path.exists(path):
+        return False
+    try:
+        with open(path, "r") as f:
+            stats = json.load(f)
+        month = datetime.now().strftime("%Y-%m")
+        if stats.get("last_reset") == month:
+            month_start = datetime.strptime(month, "%Y-%m").timestamp()
+            daily = {field: {day: count for day, count in stats.get(field, {}).items() if day.startswith(month)}
+                     for field in ("daily_posts", "daily_replies")}
+            replies = stats.get("replies_count", 0)
+            events = dated_events(ledger, "reply", replies, daily["daily_replies"], month_start)
+            events += dated_events(ledger, "post", stats.get("posts_count", 0) - replies, daily["daily_posts"], month_start)
+            events += dated_events(ledger, "read", stats.get("reads_count", 0), {}, month_start)
+            ledger.record_many(events)
+        ledger.set_cursor("migrated_usage_file", time.time())
+        logger.info(f"Migrated usage counters from {path} into the ledger")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to migrate usage file: {e}")
+        return False